@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import argparse
+import json
+from typing import Iterator, Optional, Tuple
+
+# Compare deux rapports de benchmarks.run (ex. main vs branche) : une ligne par mesure, écart en %.
+# Plus haut = mieux pour les req/s, plus bas = mieux pour le reste.
+
+Row = Tuple[str, Optional[float], Optional[float], bool]  # (mesure, avant, après, plus haut = mieux)
+
+
+def _rows(before: dict, after: dict) -> Iterator[Row]:
+    yield "first_snapshot_ms", before.get("first_snapshot_ms"), after.get("first_snapshot_ms"), False
+
+    for name in sorted(set(before.get("endpoints", {})) | set(after.get("endpoints", {}))):
+        old = before.get("endpoints", {}).get(name, {})
+        new = after.get("endpoints", {}).get(name, {})
+        yield f"{name}.rps", old.get("rps"), new.get("rps"), True
+        for field in ("p50_ms", "p99_ms"):
+            yield f"{name}.{field}", old.get(field), new.get(field), False
+
+    for mode in ("full", "delta"):
+        old = before.get("refresh", {}).get(mode, {})
+        new = after.get("refresh", {}).get(mode, {})
+        yield f"refresh.{mode}.median_ms", old.get("median_ms"), new.get("median_ms"), False
+
+    for field in ("proxy_peak_rss_kb", "snapshot_build_peak_bytes", "snapshot_retained_bytes"):
+        yield f"memory.{field}", before.get("memory", {}).get(field), after.get("memory", {}).get(field), False
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare two benchmark reports")
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=10.0, help="flag changes worse than this percentage")
+    args = parser.parse_args()
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    for field in ("spec", "concurrency", "duration_seconds", "accept_encoding", "proxy_env", "cpu_count"):
+        if before["meta"].get(field) != after["meta"].get(field):
+            print(f"warning: reports differ in {field}, numbers may not be comparable")
+    print(f"before: {before['meta'].get('commit')}  after: {after['meta'].get('commit')}\n")
+
+    regressions = 0
+    print(f"{'metric':<34} {'before':>14} {'after':>14} {'change':>9}")
+    for name, old, new, higher_is_better in _rows(before, after):
+        if old is None or new is None:
+            print(f"{name:<34} {str(old):>14} {str(new):>14} {'':>9}")
+            continue
+        change = (new - old) / old * 100 if old else 0.0
+        worse = -change if higher_is_better else change
+        flag = " !" if worse > args.threshold else ""
+        regressions += bool(flag)
+        print(f"{name:<34} {old:>14,.3f} {new:>14,.3f} {change:>+8.1f}%{flag}")
+
+    if regressions:
+        print(f"\n{regressions} metric(s) worse by more than {args.threshold:.0f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import argparse
+import json
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from benchmarks.payload import PayloadSpec, encode_payload, generate_players, mutate_players
+
+# Upstream local : sert un /moss/players synthétique (corps pré-sérialisé, pour mesurer le proxy et pas le
+# faux plugin), quelques routes relayées telles quelles, et /_bench/mutate pour simuler l'activité.
+
+
+def create_app(spec: PayloadSpec) -> Starlette:
+    players = generate_players(spec)
+    by_uuid = {player["uuid"]: player for player in players}
+    state = {"body": encode_payload(players), "mutations": 0}
+
+    async def moss_players(request: Request) -> Response:
+        return Response(state["body"], media_type="application/json")
+
+    async def moss_player(request: Request) -> Response:
+        player = by_uuid.get(request.path_params["uuid"])
+        if player is None:
+            return JSONResponse({"error": "not found"}, status_code=404)
+        return Response(json.dumps(player, separators=(",", ":")), media_type="application/json")
+
+    async def server_info(request: Request) -> Response:
+        return JSONResponse({"players": len(players), "mutations": state["mutations"]})
+
+    async def mutate(request: Request) -> Response:
+        fraction = float(request.query_params.get("fraction", "0.05"))
+        state["mutations"] += 1
+        changed = mutate_players(players, fraction, seed=spec.seed + state["mutations"])
+        state["body"] = encode_payload(players)
+        return JSONResponse({"changed": changed, "bytes": len(state["body"])})
+
+    return Starlette(
+        routes=[
+            Route("/moss/players", moss_players),
+            Route("/moss/player/{uuid}", moss_player),
+            Route("/server/info", server_info),
+            Route("/_bench/mutate", mutate, methods=["POST"]),
+        ]
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local stand-in for the PlayerStats plugin API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2604)
+    parser.add_argument("--spec", default="{}", help="PayloadSpec fields as JSON")
+    args = parser.parse_args()
+
+    spec = PayloadSpec(**json.loads(args.spec))
+    uvicorn.run(create_app(spec), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
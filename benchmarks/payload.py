@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import json
+import random
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List
+
+# Sections vanilla (les suivantes sont synthétiques : bench:section_N)
+_VANILLA_SECTIONS = [
+    "minecraft:mined",
+    "minecraft:used",
+    "minecraft:custom",
+    "minecraft:killed",
+    "minecraft:picked_up",
+    "minecraft:dropped",
+    "minecraft:crafted",
+    "minecraft:broken",
+    "minecraft:killed_by",
+]
+
+_NAME_PREFIXES = ["Steve", "Alex", "xX_", "Notch", "Moss", "Creeper", "Blaze", "Dream", "Tech", "Red"]
+
+# Valeurs communes : crée des égalités dans les classements (tri par nom à valeur égale)
+_TIE_VALUES = [1, 2, 10, 64, 100, 1000]
+
+# Valeurs invalides vues en pratique (plugin, fichiers de stats abîmés) : ignorées ou ramenées à 0
+_MALFORMED_VALUES: List[Any] = ["12", "abc", 3.5, -7, None, True, [], {"nested": 1}, "", 10**30]
+
+
+@dataclass
+class PayloadSpec:
+    players: int = 2000
+    sections: int = 8
+    stat_keys: int = 60  # par section
+    seed: int = 1
+
+    # Part de stats à 0, part de valeurs prises dans _TIE_VALUES, part de valeurs invalides
+    zero_ratio: float = 0.15
+    tie_ratio: float = 0.1
+    malformed_ratio: float = 0.005
+
+    # Asymétrie des valeurs (lognormale) et de la popularité des clés (une clé rare n'est possédée que par peu de joueurs)
+    value_sigma: float = 2.0
+    key_skew: float = 1.1
+
+    # Joueurs sans nom / uuid en double (non listés, comme côté upstream)
+    anonymous_ratio: float = 0.002
+    duplicate_ratio: float = 0.001
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def section_names(count: int) -> List[str]:
+    names = _VANILLA_SECTIONS[:count]
+    names.extend(f"bench:section_{i}" for i in range(len(names), count))
+    return names
+
+
+def stat_key_names(count: int) -> List[str]:
+    return [f"minecraft:key_{i:03d}" for i in range(count)]
+
+
+def _value(rnd: random.Random, spec: PayloadSpec) -> Any:
+    draw = rnd.random()
+    if draw < spec.malformed_ratio:
+        return rnd.choice(_MALFORMED_VALUES)
+    draw -= spec.malformed_ratio
+    if draw < spec.zero_ratio:
+        return 0
+    draw -= spec.zero_ratio
+    if draw < spec.tie_ratio:
+        return rnd.choice(_TIE_VALUES)
+    return int(rnd.lognormvariate(3.0, spec.value_sigma))
+
+
+def _player_stats(rnd: random.Random, spec: PayloadSpec, sections: List[str], keys: List[str]) -> Dict[str, Any]:
+    stats: Dict[str, Any] = {}
+    for section in sections:
+        values: Dict[str, Any] = {}
+        for rank, key in enumerate(keys, start=1):
+            # Popularité en loi de puissance : la 1re clé chez presque tous, les dernières chez quelques-uns
+            if rnd.random() < rank ** -spec.key_skew * 4:
+                values[key] = _value(rnd, spec)
+        stats[section] = values
+    return stats
+
+
+def generate_players(spec: PayloadSpec) -> List[Dict[str, Any]]:
+    # Déterministe pour un même spec (même seed) : les rapports restent comparables d'un commit à l'autre
+    rnd = random.Random(spec.seed)
+    sections = section_names(spec.sections)
+    keys = stat_key_names(spec.stat_keys)
+
+    players: List[Dict[str, Any]] = []
+    for i in range(spec.players):
+        uuid = f"{rnd.getrandbits(128):032x}"
+        if players and rnd.random() < spec.duplicate_ratio:
+            uuid = rnd.choice(players)["uuid"]
+        name = f"{rnd.choice(_NAME_PREFIXES)}{i}"
+        if rnd.random() < spec.anonymous_ratio:
+            name = ""
+        players.append({"uuid": uuid, "name": name, "stats": {"stats": _player_stats(rnd, spec, sections, keys)}})
+    return players
+
+
+def mutate_players(players: List[Dict[str, Any]], fraction: float, seed: int) -> int:
+    # Simule l'activité entre deux refresh : une fraction des joueurs voit quelques stats augmenter
+    rnd = random.Random(seed)
+    count = int(len(players) * max(0.0, min(1.0, fraction)))
+    for player in rnd.sample(players, count):
+        sections = player["stats"]["stats"]
+        for section in rnd.sample(sorted(sections), min(2, len(sections))):
+            values = sections[section]
+            if not values:
+                continue
+            key = rnd.choice(sorted(values))
+            current = values[key] if isinstance(values[key], int) and not isinstance(values[key], bool) else 0
+            values[key] = max(0, current) + rnd.randint(1, 500)
+    return count
+
+
+def encode_payload(players: List[Dict[str, Any]]) -> bytes:
+    return json.dumps({"players": players}, separators=(",", ":")).encode("utf-8")
@@ -0,0 +1,340 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.payload import PayloadSpec, generate_players, section_names, stat_key_names
+
+# Depuis la racine du dépôt :
+#   python -m benchmarks.run --players 20000 --output before.json
+#   python -m benchmarks.run --players 20000 --env PSP_FAST_JSON_RESPONSES=true --output after.json
+#   python -m benchmarks.compare before.json after.json
+# Proxy et upstream synthétique tournent dans des processus séparés ; le générateur de charge partage la
+# machine : comparer des rapports produits sur la même machine, avec les mêmes paramètres.
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Lancé depuis un checkout sans installation : le paquet est pris dans src/ (et pour les sous-processus aussi)
+try:
+    import playerstats_proxy  # noqa: F401
+except ImportError:
+    sys.path.insert(0, str(ROOT / "src"))
+
+from playerstats_proxy.services.playerstats_client import PlayerStatsClient  # noqa: E402
+from playerstats_proxy.services.snapshot_store import SnapshotStore  # noqa: E402
+
+SCENARIOS = ["top", "top_section", "best", "stats", "players", "proxy"]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        out = subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def _proc_status_kb(pid: int, field: str) -> Optional[int]:
+    # VmHWM (pic) / VmRSS (actuel) du processus, Linux uniquement
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def _spawn(args: List[str], env: Dict[str, str], workdir: str, name: str) -> subprocess.Popen:
+    # Répertoire de travail à part : le proxy ne lit pas le .env du développeur, et ses logs restent hors du rapport
+    full_env = {**os.environ, **env}
+    full_env["PYTHONPATH"] = os.pathsep.join([str(ROOT / "src"), str(ROOT), full_env.get("PYTHONPATH", "")])
+    with open(os.path.join(workdir, f"{name}.log"), "wb") as log:
+        return subprocess.Popen([sys.executable, *args], env=full_env, cwd=workdir, stdout=log, stderr=subprocess.STDOUT)
+
+
+def _stop(process: subprocess.Popen) -> None:
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+async def _wait_ready(url: str, timeout_seconds: float) -> None:
+    deadline = time.monotonic() + timeout_seconds
+    async with httpx.AsyncClient(timeout=5.0) as client:
+        while True:
+            try:
+                if (await client.get(url)).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{url} not ready after {timeout_seconds:.0f}s")
+            await asyncio.sleep(0.1)
+
+
+def _scenario_urls(spec: PayloadSpec, uuids: List[str]) -> Dict[str, List[str]]:
+    # Plusieurs variantes par endpoint (clés, sections, joueurs) : mélange de cache de réponses chaud et froid
+    sections = section_names(spec.sections)
+    keys = stat_key_names(spec.stat_keys)
+    return {
+        "top": [f"/moss/top/{key}/{section}?limit=10" for section in sections for key in keys[:5]],
+        "top_section": [f"/moss/top/section/{section}?limit=10" for section in sections],
+        "best": [f"/moss/best/{uuid}" for uuid in uuids],
+        "stats": ["/moss/stats", "/moss/stats?limit_per_section=10"],
+        "players": ["/moss/players/basic?q=steve&limit=50", "/moss/players/basic?q=x&match=substring&limit=50"],
+        "proxy": [f"/moss/player/{uuid}" for uuid in uuids],
+    }
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def _load(client: httpx.AsyncClient, urls: List[str], duration: float, concurrency: int) -> dict:
+    # `concurrency` clients en boucle fermée pendant `duration` secondes, URLs servies à tour de rôle
+    latencies: List[float] = []
+    errors = 0
+    counter = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker() -> None:
+        nonlocal errors, counter
+        while time.perf_counter() < deadline:
+            url = urls[counter % len(urls)]
+            counter += 1
+            start = time.perf_counter()
+            try:
+                response = await client.get(url)
+                await response.aread()
+                ok = response.status_code < 500
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    ms = [latency * 1000 for latency in latencies]
+    return {
+        "requests": len(ms),
+        "errors": errors,
+        "rps": round(len(ms) / elapsed, 1) if elapsed > 0 else 0.0,
+        "mean_ms": round(statistics.fmean(ms), 3) if ms else 0.0,
+        "p50_ms": round(_percentile(ms, 0.50), 3),
+        "p90_ms": round(_percentile(ms, 0.90), 3),
+        "p99_ms": round(_percentile(ms, 0.99), 3),
+        "max_ms": round(ms[-1], 3) if ms else 0.0,
+    }
+
+
+async def bench_endpoints(base_url: str, urls: Dict[str, List[str]], args: argparse.Namespace) -> Dict[str, dict]:
+    results: Dict[str, dict] = {}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    headers = {"accept-encoding": args.accept_encoding} if args.accept_encoding else {}
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, headers=headers, timeout=30.0) as client:
+        for name in args.scenarios:
+            if args.warmup > 0:
+                await _load(client, urls[name], args.warmup, args.concurrency)
+            results[name] = await _load(client, urls[name], args.duration, args.concurrency)
+            print(f"  {name:<12} {results[name]['rps']:>9} req/s  p50 {results[name]['p50_ms']:>8} ms  p99 {results[name]['p99_ms']:>8} ms", flush=True)
+    return results
+
+
+def _timings(values: List[float]) -> dict:
+    ms = [value * 1000 for value in values]
+    return {
+        "runs": len(ms),
+        "median_ms": round(statistics.median(ms), 3),
+        "min_ms": round(min(ms), 3),
+        "max_ms": round(max(ms), 3),
+    }
+
+
+async def bench_refresh(upstream_url: str, args: argparse.Namespace) -> dict:
+    # Coût d'un refresh dans ce processus (même code que le proxy) : fetch + décodage + construction du snapshot
+    async with httpx.AsyncClient(timeout=120.0) as http:
+        client = PlayerStatsClient(http_client=http, base_url=upstream_url, players_path="/moss/players")
+        payload_bytes = len((await http.get(f"{upstream_url}/moss/players")).content)
+
+        full: List[float] = []
+        for _ in range(args.refresh_runs):
+            store = SnapshotStore(client=client, ttl_seconds=0, delta_refresh=False)
+            start = time.perf_counter()
+            await store.refresh()
+            full.append(time.perf_counter() - start)
+
+        # Refresh incrémental après modification d'une fraction des joueurs côté upstream
+        delta: List[float] = []
+        store = SnapshotStore(client=client, ttl_seconds=0, delta_refresh=True)
+        await store.refresh()
+        for _ in range(args.refresh_runs):
+            await http.post(f"{upstream_url}/_bench/mutate", params={"fraction": args.mutate_fraction})
+            start = time.perf_counter()
+            await store.refresh()
+            delta.append(time.perf_counter() - start)
+        del store
+
+        # Mémoire Python allouée pendant un refresh complet (pic) et gardée par le snapshot (retenue)
+        gc.collect()
+        tracemalloc.start()
+        store = SnapshotStore(client=client, ttl_seconds=0, delta_refresh=False)
+        await store.refresh()
+        gc.collect()
+        retained, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del store
+
+    return {
+        "payload_bytes": payload_bytes,
+        "mutate_fraction": args.mutate_fraction,
+        "full": _timings(full),
+        "delta": _timings(delta),
+        "build_peak_bytes": peak,
+        "snapshot_retained_bytes": retained,
+    }
+
+
+async def run(args: argparse.Namespace) -> dict:
+    spec = PayloadSpec(players=args.players, sections=args.sections, stat_keys=args.stat_keys, seed=args.seed)
+    players = generate_players(spec)
+    uuids = [player["uuid"] for player in players[:: max(1, len(players) // 50)] if player["name"]]
+    del players
+
+    upstream_port, proxy_port = _free_port(), _free_port()
+    upstream_url = f"http://127.0.0.1:{upstream_port}"
+    proxy_url = f"http://127.0.0.1:{proxy_port}"
+
+    workdir = tempfile.mkdtemp(prefix="psp-bench-")
+    print(f"logs: {workdir}", flush=True)
+    upstream = _spawn(
+        ["-m", "benchmarks.fake_upstream", "--port", str(upstream_port), "--spec", json.dumps(spec.as_dict())],
+        {},
+        workdir,
+        "upstream",
+    )
+    proxy_env = {
+        "PSP_UPSTREAM_BASE_URL": upstream_url,
+        # Pas de refresh pendant la mesure des endpoints : mesuré à part (bench_refresh)
+        "PSP_CACHE_TTL_SECONDS": "86400",
+        "PSP_BACKGROUND_REFRESH": "false",
+        **dict(item.split("=", 1) for item in args.env),
+    }
+    proxy = _spawn(
+        ["-m", "uvicorn", "playerstats_proxy.main:app", "--host", "127.0.0.1", "--port", str(proxy_port),
+         "--log-level", "warning", "--no-access-log"],
+        proxy_env,
+        workdir,
+        "proxy",
+    )
+    try:
+        await _wait_ready(f"{upstream_url}/server/info", args.startup_timeout)
+        await _wait_ready(f"{proxy_url}/health", args.startup_timeout)
+
+        # Premier snapshot (fetch upstream à froid vu par un client)
+        start = time.perf_counter()
+        async with httpx.AsyncClient(timeout=args.startup_timeout) as client:
+            (await client.get(f"{proxy_url}/moss/stats/sections")).raise_for_status()
+        first_snapshot_ms = round((time.perf_counter() - start) * 1000, 3)
+        print(f"first snapshot: {first_snapshot_ms} ms", flush=True)
+
+        print("endpoints:", flush=True)
+        endpoints = await bench_endpoints(proxy_url, _scenario_urls(spec, uuids), args)
+        memory = {
+            "proxy_peak_rss_kb": _proc_status_kb(proxy.pid, "VmHWM"),
+            "proxy_rss_kb": _proc_status_kb(proxy.pid, "VmRSS"),
+        }
+        _stop(proxy)
+
+        # Après les endpoints : le refresh incrémental modifie les données de l'upstream
+        print("refresh:", flush=True)
+        refresh = await bench_refresh(upstream_url, args)
+        print(f"  full {refresh['full']['median_ms']} ms, delta {refresh['delta']['median_ms']} ms", flush=True)
+    finally:
+        _stop(proxy)
+        _stop(upstream)
+
+    return {
+        "meta": {
+            "commit": _git("rev-parse", "HEAD"),
+            "dirty": bool(_git("status", "--porcelain", "--", "src")),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "spec": spec.as_dict(),
+            "duration_seconds": args.duration,
+            "concurrency": args.concurrency,
+            "accept_encoding": args.accept_encoding,
+            "proxy_env": {k: v for k, v in proxy_env.items() if k != "PSP_UPSTREAM_BASE_URL"},
+        },
+        "first_snapshot_ms": first_snapshot_ms,
+        "endpoints": endpoints,
+        "refresh": refresh,
+        "memory": {**memory, "snapshot_build_peak_bytes": refresh["build_peak_bytes"], "snapshot_retained_bytes": refresh["snapshot_retained_bytes"]},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark playerstats-proxy against a local synthetic upstream")
+    parser.add_argument("--players", type=int, default=2000)
+    parser.add_argument("--sections", type=int, default=8)
+    parser.add_argument("--stat-keys", type=int, default=60, help="stat keys per section")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds of load per scenario")
+    parser.add_argument("--warmup", type=float, default=1.0, help="seconds of unmeasured load per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--accept-encoding", default="", help='e.g. "gzip" to measure compressed responses')
+    parser.add_argument("--refresh-runs", type=int, default=3)
+    parser.add_argument("--mutate-fraction", type=float, default=0.05, help="share of players changed before each delta refresh")
+    parser.add_argument("--env", action="append", default=[], metavar="PSP_X=value", help="extra proxy setting (repeatable)")
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    parser.add_argument("--output", help="report path (default: benchmarks/results/<commit>.json)")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+
+    output = Path(args.output) if args.output else ROOT / "benchmarks" / "results" / f"{(report['meta']['commit'] or 'local')[:12]}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2) + "\n")
+    print(f"report: {output}")
+
+
+if __name__ == "__main__":
+    main()
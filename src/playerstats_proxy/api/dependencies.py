@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import logging
+import math
+
+import httpx
+from fastapi import Depends, HTTPException, Request, Response
+
+from playerstats_proxy.core.config import Settings
+from playerstats_proxy.services.circuit_breaker import CircuitOpenError
+from playerstats_proxy.services.shared_snapshot import SnapshotSource
+from playerstats_proxy.services.snapshot_store import Snapshot
+
+logger = logging.getLogger(__name__)
+
+
+def get_settings(request: Request) -> Settings:
+    return request.app.state.settings
+
+
+def get_snapshot_store(request: Request) -> SnapshotSource:
+    return request.app.state.snapshot_store
+
+
+async def get_snapshot(
+    response: Response,
+    store: SnapshotSource = Depends(get_snapshot_store),
+) -> Snapshot:
+    # Récupère le snapshot depuis le cache (ou upstream si rien d'exploitable), erreurs upstream -> 502
+    # (503 si le circuit est ouvert)
+    try:
+        snapshot = await store.get_snapshot()
+    except CircuitOpenError as e:
+        # Upstream coupé et aucun snapshot à servir : échec immédiat
+        logger.warning("Upstream circuit is open and no snapshot is available")
+        raise HTTPException(
+            status_code=503,
+            detail="Upstream unavailable",
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        ) from e
+    except httpx.HTTPError as e:
+        logger.exception("Upstream HTTP error while fetching players")
+        raise HTTPException(status_code=502, detail=f"Upstream HTTP error: {type(e).__name__}") from e
+    except ValueError as e:
+        logger.exception("Upstream payload error")
+        raise HTTPException(status_code=502, detail=str(e)) from e
+
+    # Âge du snapshot servi (peut dépasser le TTL si on sert du stale)
+    response.headers["X-Snapshot-Age"] = str(int(snapshot.age_seconds))
+    return snapshot
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import time
+from typing import Dict, Iterable, Tuple, Union
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from playerstats_proxy.services.shared_snapshot import SnapshotSource
+from playerstats_proxy.utils.lru_cache import LRUCache
+from playerstats_proxy.utils.metrics import REGISTRY, CallbackMetric, LabelValues
+from playerstats_proxy.utils.ttl_cache import TTLCache
+
+_REQUEST_SECONDS = REGISTRY.histogram(
+    "psp_http_request_duration_seconds",
+    "Time to serve a request until the end of its body, by route template.",
+    ("method", "route", "status"),
+)
+
+
+class RequestMetricsMiddleware:
+    # Middleware ASGI pur (pas de BaseHTTPMiddleware) : pas de copie du corps, réponses streamées intactes
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Gabarit de la route (ex. /moss/top/{stat_key}/{section}) : cardinalité bornée
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            _REQUEST_SECONDS.observe(time.perf_counter() - start, scope["method"], path, str(status))
+
+
+def register_state_metrics(source: SnapshotSource, caches: Dict[str, Union[TTLCache, LRUCache]]) -> None:
+    # Métriques lues sur l'état de l'app à chaque export : compteurs des caches et snapshot courant
+    def cache_samples(attribute: str) -> Iterable[Tuple[LabelValues, float]]:
+        for name, cache in caches.items():
+            value = getattr(cache, attribute, None)
+            if value is not None:
+                yield (name,), value
+
+    for attribute, documentation in (
+        ("hits", "Cache lookups that returned a fresh value."),
+        ("misses", "Cache lookups that found nothing usable (absent or expired)."),
+        ("expirations", "Cache lookups that found an expired value."),
+        ("stale_hits", "Expired snapshot served within the stale tolerance while refreshing."),
+        ("evictions", "Entries evicted to stay within the entry/byte budget."),
+        ("total_bytes", "Bytes currently cached."),
+    ):
+        kind = "gauge" if attribute == "total_bytes" else "counter"
+        name = "psp_cache_bytes" if attribute == "total_bytes" else f"psp_cache_{attribute}_total"
+        REGISTRY.register(
+            CallbackMetric(name, documentation, kind, lambda attribute=attribute: cache_samples(attribute), ("cache",))
+        )
+
+    def entries() -> Iterable[Tuple[LabelValues, float]]:
+        for name, cache in caches.items():
+            if isinstance(cache, LRUCache):
+                yield (name,), len(cache)
+
+    REGISTRY.register(CallbackMetric("psp_cache_entries", "Entries currently cached.", "gauge", entries, ("cache",)))
+
+    def snapshot_gauge(read):
+        def samples() -> Iterable[Tuple[LabelValues, float]]:
+            snapshot = source.current()
+            if snapshot is not None:
+                yield (), read(snapshot)
+
+        return samples
+
+    for name, documentation, read in (
+        ("psp_snapshot_age_seconds", "Age of the snapshot currently served.", lambda s: s.age_seconds),
+        ("psp_snapshot_version", "Version of the snapshot currently served.", lambda s: s.version),
+        ("psp_snapshot_players", "Players in the current snapshot.", lambda s: s.stats.player_count),
+        (
+            "psp_snapshot_stat_keys",
+            "Distinct (section, stat_key) columns in the current snapshot.",
+            lambda s: sum(len(keys) for keys in s.derived.catalogue.values()),
+        ),
+        ("psp_snapshot_leaderboards", "Leaderboards materialized for the current snapshot.", lambda s: len(s.stats.leaderboards)),
+    ):
+        REGISTRY.register(CallbackMetric(name, documentation, "gauge", snapshot_gauge(read)))
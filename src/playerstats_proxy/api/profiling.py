@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import asyncio
+import hmac
+import logging
+import os
+import random
+import re
+import time
+from typing import Optional, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from playerstats_proxy.utils.profiling import BACKEND, RequestProfile
+
+logger = logging.getLogger(__name__)
+
+# Demande de profil : en-tête (à privilégier, n'apparaît pas dans les logs d'accès) ou paramètre de requête,
+# valeur = jeton admin. Tous deux sont retirés avant la route (jamais relayés à l'upstream).
+PROFILE_HEADER = b"x-psp-profile"
+PROFILE_QUERY = b"psp_profile"
+
+_UNSAFE_CHARS = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+class RequestProfiler:
+    def __init__(self, token: str, sample_rate: float, directory: str, interval_seconds: float) -> None:
+        self._token = token.encode("utf-8")
+        self._sample_rate = max(0.0, min(1.0, float(sample_rate))) if directory else 0.0
+        self.directory = directory
+        self.interval_seconds = max(0.0001, float(interval_seconds))
+
+        # Un seul profil à la fois : cProfile ne supporte pas deux profils actifs, et un profil doit
+        # rester lisible (pas mélangé avec celui d'une autre requête)
+        self.busy = False
+
+    def requested(self, scope: Scope) -> Tuple[bool, Scope]:
+        # (jeton valide présent, scope sans l'en-tête ni le paramètre de profil)
+        if not self._token:
+            return False, scope
+
+        # En-tête retiré dans tous les cas : le jeton ne doit pas être relayé à l'upstream par le proxy
+        valid = False
+        headers = scope["headers"]
+        if any(name == PROFILE_HEADER for name, _ in headers):
+            kept_headers = []
+            for name, value in headers:
+                if name == PROFILE_HEADER:
+                    valid = valid or hmac.compare_digest(value, self._token)
+                else:
+                    kept_headers.append((name, value))
+            scope = {**scope, "headers": kept_headers}
+
+        query: bytes = scope.get("query_string", b"")
+        if PROFILE_QUERY in query:
+            kept = []
+            for part in query.split(b"&"):
+                name, _, value = part.partition(b"=")
+                if name == PROFILE_QUERY:
+                    valid = valid or hmac.compare_digest(value, self._token)
+                else:
+                    kept.append(part)
+            scope = {**scope, "query_string": b"&".join(kept)}
+        return valid, scope
+
+    def sampled(self) -> bool:
+        return self._sample_rate > 0 and random.random() < self._sample_rate
+
+    def profile_id(self, scope: Scope) -> str:
+        # Ex. 20261017T190812.512-GET-moss_best_0123abcd : triable par date, lisible dans un ls
+        now = time.time()
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime(now)) + f".{int(now * 1000) % 1000:03d}"
+        path = _UNSAFE_CHARS.sub("_", scope["path"].strip("/"))[:80] or "root"
+        return f"{stamp}-{scope['method']}-{path}"
+
+    def save(self, profile: RequestProfile, profile_id: str) -> str:
+        profile.save(os.path.join(self.directory, profile_id))
+        return f"{profile_id}.{profile.extension}"
+
+
+async def _send_plain(send: Send, status: int, body: bytes, headers: list) -> None:
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+class ProfilingMiddleware:
+    # Profilage à la demande d'une requête en production. Désactivé (pas de RequestProfiler dans l'état
+    # de l'app) : un simple test par requête, aucun profileur chargé ni démarré.
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        profiler: Optional[RequestProfiler] = None
+        if scope["type"] == "http":
+            profiler = getattr(scope["app"].state, "request_profiler", None)
+        if profiler is None:
+            await self.app(scope, receive, send)
+            return
+
+        requested, scope = profiler.requested(scope)
+        if not requested and not profiler.sampled():
+            await self.app(scope, receive, send)
+            return
+
+        if profiler.busy:
+            if requested:
+                await _send_plain(send, 409, b"Another request is being profiled, retry later.", [(b"content-type", b"text/plain")])
+            else:
+                await self.app(scope, receive, send)
+            return
+
+        # Requête demandée : la réponse normale est consommée et remplacée par le profil.
+        # Requête échantillonnée : réponse intacte, profil seulement écrit dans le répertoire.
+        status = 500
+
+        async def capture(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            if not requested:
+                await send(message)
+
+        profile = RequestProfile(profiler.interval_seconds)
+        profiler.busy = True
+        started = time.perf_counter()
+        try:
+            profile.start()
+            try:
+                await self.app(scope, receive, capture)
+            finally:
+                profile.stop()
+        finally:
+            profiler.busy = False
+        elapsed = time.perf_counter() - started
+
+        saved = None
+        if profiler.directory:
+            saved = await asyncio.to_thread(profiler.save, profile, profiler.profile_id(scope))
+        logger.info(
+            "Profiled %s %s (%s, %.1f ms, status %d)%s",
+            scope["method"],
+            scope["path"],
+            BACKEND,
+            elapsed * 1000,
+            status,
+            f" -> {saved}" if saved else "",
+        )
+        if not requested:
+            return
+
+        body, media_type = await asyncio.to_thread(profile.render)
+        headers = [
+            (b"content-type", media_type.encode("latin-1")),
+            (b"cache-control", b"no-store"),
+            (b"x-profile-backend", BACKEND.encode("latin-1")),
+            (b"x-profiled-status", str(status).encode("latin-1")),
+            (b"x-profiled-duration-ms", f"{elapsed * 1000:.1f}".encode("latin-1")),
+        ]
+        if saved:
+            headers.append((b"x-profile-id", saved.encode("latin-1")))
+        await _send_plain(send, 200, body, headers)
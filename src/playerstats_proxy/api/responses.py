@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import hashlib
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Hashable, Optional, Type
+
+from fastapi import Request
+from pydantic import BaseModel
+from starlette.responses import Response
+
+from playerstats_proxy.core.config import Settings
+from playerstats_proxy.services.snapshot_store import Snapshot
+from playerstats_proxy.utils.compression import ENCODINGS, compress, negotiate
+from playerstats_proxy.utils.fast_json import dumps
+from playerstats_proxy.utils.lru_cache import LRUCache
+from playerstats_proxy.utils.metrics import REGISTRY
+
+_SERIALIZE_SECONDS = REGISTRY.histogram(
+    "psp_response_serialize_seconds",
+    "Time to build and serialize a snapshot-derived response body (response cache misses only).",
+    ("model",),
+)
+_COMPRESS_SECONDS = REGISTRY.histogram(
+    "psp_response_compress_seconds",
+    "Time to compress a cached response body, per encoding (once per body and encoding).",
+    ("encoding",),
+)
+
+
+@dataclass
+class CachedBody:
+    version: int
+    body: bytes
+    etag: str
+
+    # Variantes compressées du même corps, calculées à la première demande de chaque encodage
+    encoded: Dict[str, bytes] = field(default_factory=dict)
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(data) for data in self.encoded.values())
+
+    def encoded_etag(self, encoding: Optional[str]) -> str:
+        # ETag fort propre à chaque représentation : "<hash>-gzip", "<hash>-br"...
+        if encoding is None:
+            return self.etag
+        return f'{self.etag[:-1]}-{encoding}"'
+
+
+def _serialize(model: Type[BaseModel], payload: dict, settings: Settings) -> bytes:
+    # Chemin rapide (opt-in) : données internes déjà fiables, sérialisées directement sans validation
+    # Pydantic ligne par ligne. Sinon : validation par le modèle de réponse, comme avant.
+    if settings.fast_json_responses:
+        return dumps(payload)
+    return model.model_validate(payload).model_dump_json().encode("utf-8")
+
+
+def _etag_matches(if_none_match: str, cached: CachedBody) -> bool:
+    # Comparaison faible (RFC 9110) : on ignore le préfixe W/ ; toutes les représentations du même
+    # corps se valent (un client qui change d'Accept-Encoding garde son cache)
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip().removeprefix("W/")
+        if candidate == "*" or candidate == cached.etag:
+            return True
+        if any(candidate == cached.encoded_etag(encoding) for encoding in ENCODINGS):
+            return True
+    return False
+
+
+def _encoding_for(request: Request, cached: CachedBody, settings: Settings) -> Optional[str]:
+    # Petits corps envoyés tels quels : le gain ne vaut pas l'en-tête ni le décodage côté client
+    if not settings.response_compression or len(cached.body) < settings.response_compression_min_bytes:
+        return None
+    return negotiate(request.headers.get("accept-encoding"))
+
+
+def snapshot_response(
+    request: Request,
+    key: Hashable,
+    model: Type[BaseModel],
+    build: Callable[[], dict],
+    settings: Settings,
+    snapshot: Snapshot,
+) -> Response:
+    # Corps sérialisé (et compressé) une seule fois par (requête normalisée, version de snapshot), puis réutilisé.
+    # Le response_model de la route reste inchangé pour le schéma OpenAPI.
+    cache: LRUCache[CachedBody] = request.app.state.response_cache
+
+    cached = cache.get(key)
+    if cached is None or cached.version != snapshot.version:
+        start = time.perf_counter()
+        body = _serialize(model, build(), settings)
+        _SERIALIZE_SECONDS.observe(time.perf_counter() - start, model.__name__)
+        etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        cached = CachedBody(version=snapshot.version, body=body, etag=etag)
+        cache.set(key, cached, size=cached.size)
+
+    encoding = _encoding_for(request, cached, settings)
+    headers = {
+        "ETag": cached.encoded_etag(encoding),
+        "X-Snapshot-Age": str(int(snapshot.age_seconds)),
+    }
+    if settings.response_compression:
+        headers["Vary"] = "Accept-Encoding"
+
+    # Client déjà à jour (scoreboards qui pollent) : 304 sans corps. GET/HEAD seulement : l'ETag ne couvre pas
+    # le corps d'une requête POST (/moss/top/batch), et 304 n'a pas de sens pour une autre méthode
+    if_none_match = request.headers.get("if-none-match")
+    if request.method in ("GET", "HEAD") and if_none_match and _etag_matches(if_none_match, cached):
+        return Response(status_code=304, headers=headers)
+
+    content = cached.body
+    if encoding is not None:
+        content = cached.encoded.get(encoding)
+        if content is None:
+            start = time.perf_counter()
+            content = cached.encoded[encoding] = compress(cached.body, encoding)
+            _COMPRESS_SECONDS.observe(time.perf_counter() - start, encoding)
+            # Nouvelle taille de l'entrée, pour le budget en octets du cache
+            cache.set(key, cached, size=cached.size)
+        headers["Content-Encoding"] = encoding
+    return Response(content=content, media_type="application/json", headers=headers)
@@ -1,5 +1,9 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
+
+from playerstats_proxy.api.dependencies import get_snapshot_store
 from playerstats_proxy.models.schemas import HealthResponse
+from playerstats_proxy.services.shared_snapshot import SnapshotSource
 
 router = APIRouter(tags=["health"])
 
@@ -7,3 +11,11 @@ router = APIRouter(tags=["health"])
 @router.get("/health", response_model=HealthResponse)
 async def health() -> HealthResponse:
     return HealthResponse(status="ok")
+
+
+@router.get("/health/ready", response_model=HealthResponse, responses={503: {"model": HealthResponse}})
+async def ready(store: SnapshotSource = Depends(get_snapshot_store)) -> HealthResponse | JSONResponse:
+    # Prêt seulement quand un snapshot est chargé (disque au démarrage ou premier fetch upstream)
+    if not store.is_ready():
+        return JSONResponse(status_code=503, content=HealthResponse(status="not_ready").model_dump())
+    return HealthResponse(status="ok")
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+
+from playerstats_proxy.api.dependencies import get_settings
+from playerstats_proxy.core.config import Settings
+from playerstats_proxy.models.schemas import WindowTopResponse
+from playerstats_proxy.services.history_service import build_window_top_payload
+from playerstats_proxy.services.history_store import KIND_SECTION, KIND_STAT, HistoryStore
+
+router = APIRouter(prefix="/moss/history", tags=["history"])
+
+Window = Literal["hour", "day", "week", "month"]
+
+_WINDOW_SECONDS = {
+    "hour": 3600,
+    "day": 24 * 3600,
+    "week": 7 * 24 * 3600,
+    "month": 30 * 24 * 3600,
+}
+
+
+def get_history_store(request: Request) -> HistoryStore:
+    history = request.app.state.history_store
+    if history is None:
+        raise HTTPException(status_code=404, detail="History is not enabled")
+    return history
+
+
+@router.get("/top/section/{section}", response_model=WindowTopResponse)
+async def window_top_by_section_total(
+    section: str,
+    window: Window = Query("day"),
+    limit: int = Query(10, ge=1),
+    settings: Settings = Depends(get_settings),
+    history: HistoryStore = Depends(get_history_store),
+) -> dict:
+    # Progression du total de la section sur la fenêtre (ex. top mineurs de la semaine)
+    limit = min(limit, settings.max_limit)
+    since, until, entries = await history.window_top((KIND_SECTION, section, ""), _WINDOW_SECONDS[window])
+    return build_window_top_payload(entries, section, None, window, since, until, limit)
+
+
+@router.get("/top/{stat_key}/{section}", response_model=WindowTopResponse)
+async def window_top_by_stat(
+    stat_key: str,
+    section: str,
+    window: Window = Query("day"),
+    limit: int = Query(10, ge=1),
+    settings: Settings = Depends(get_settings),
+    history: HistoryStore = Depends(get_history_store),
+) -> dict:
+    # Deltas calculés depuis les snapshots indexés de l'historique, pas depuis le JSON brut
+    limit = min(limit, settings.max_limit)
+    since, until, entries = await history.window_top((KIND_STAT, section, stat_key), _WINDOW_SECONDS[window])
+    return build_window_top_payload(entries, section, stat_key, window, since, until, limit)
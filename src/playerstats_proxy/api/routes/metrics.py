@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, HTTPException
+from starlette.responses import Response
+
+from playerstats_proxy.api.dependencies import get_settings
+from playerstats_proxy.core.config import Settings
+from playerstats_proxy.utils.metrics import CONTENT_TYPE, REGISTRY
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics(settings: Settings = Depends(get_settings)) -> Response:
+    # Format texte Prometheus, valeurs du worker qui répond (scraper chaque worker séparément en multi-workers)
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
@@ -1,64 +1,82 @@
 from __future__ import annotations
 
-import logging
-from datetime import datetime, timezone
+from typing import Literal, Optional
 
-import httpx
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 
+from playerstats_proxy.api.dependencies import get_settings, get_snapshot
+from playerstats_proxy.api.responses import snapshot_response
 from playerstats_proxy.core.config import Settings
-from playerstats_proxy.models.schemas import BasicPlayerEntry, BasicPlayersResponse
-from playerstats_proxy.services.playerstats_client import PlayerStatsClient
+from playerstats_proxy.models.schemas import BasicPlayersResponse
+from playerstats_proxy.services.player_search import build_player_search_payload, decode_search_cursor
+from playerstats_proxy.services.snapshot_store import Snapshot
 
-logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/moss", tags=["players"])
 
 
-def get_settings(request: Request) -> Settings:
-    return request.app.state.settings
-
-
-def get_playerstats_client(request: Request) -> PlayerStatsClient:
-    return request.app.state.playerstats_client
-
-
 @router.get("/players/basic", response_model=BasicPlayersResponse)
 async def players_basic(
     request: Request,
-    client: PlayerStatsClient = Depends(get_playerstats_client),
-) -> BasicPlayersResponse:
-    # Récupère les joueurs depuis le cache (ou upstream si cache vide)
-    cached_players = request.app.state.players_cache.get()
-    if cached_players is None:
-        try:
-            players = await client.fetch_players()
-        except httpx.HTTPError as e:
-            logger.exception("Upstream HTTP error while fetching players")
-            raise HTTPException(status_code=502, detail=f"Upstream HTTP error: {type(e).__name__}") from e
-        except ValueError as e:
-            logger.exception("Upstream payload error")
-            raise HTTPException(status_code=502, detail=str(e)) from e
+    q: str = Query(""),
+    match: Literal["prefix", "substring"] = Query("prefix"),
+    uuid_prefix: str = Query(""),
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = Query(None),
+    settings: Settings = Depends(get_settings),
+    snapshot: Snapshot = Depends(get_snapshot),
+) -> BasicPlayersResponse | Response:
+    # Recherche par nom (préfixe ou sous-chaîne, insensible à la casse) et/ou préfixe d'uuid
+    query = q.strip().lower()
+    uuid_query = uuid_prefix.strip().lower()
+    if query or uuid_query or limit is not None or cursor:
+        return _search(request, query, match, uuid_query, limit, cursor, settings, snapshot)
 
-        request.app.state.players_cache.set(players)
-        request.app.state.maxima_cache.clear()
-        request.app.state.aggregate_cache.clear()
-        cached_players = players
+    def build() -> dict:
+        # Table joueurs du snapshot courant
+        table = snapshot.stats
 
-    # Extrait uniquement les champs utiles pour une liste légère
-    result_players: list[BasicPlayerEntry] = []
-    for player in cached_players:
-        uuid = str(player.get("uuid") or "")
-        name = str(player.get("name") or "")
-        if not uuid or not name:
-            continue
+        # Extrait uniquement les champs utiles pour une liste légère, triée par nom (stable et lisible)
+        result_players = [{"uuid": table.uuids[row], "name": table.names[row]} for row in table.name_order]
 
-        result_players.append(BasicPlayerEntry(uuid=uuid, name=name))
+        return {
+            "count": len(result_players),
+            "updated_at": snapshot.updated_at,
+            "players": result_players,
+            "next_cursor": None,
+        }
+
+    return snapshot_response(request, ("players_basic",), BasicPlayersResponse, build, settings, snapshot)
+
+
+def _search(
+    request: Request,
+    query: str,
+    match: str,
+    uuid_prefix: str,
+    limit: Optional[int],
+    cursor: Optional[str],
+    settings: Settings,
+    snapshot: Snapshot,
+) -> Response:
+    # Recherche (search-as-you-type) : bisect dans les index triés du snapshot, puis une page de résultats
+    limit = min(limit or settings.max_player_search_limit, settings.max_player_search_limit)
+    after = None
+    if cursor:
+        try:
+            after = decode_search_cursor(snapshot.stats, cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor") from None
 
-    # Tri stable et lisible
-    result_players.sort(key=lambda p: p.name.lower())
+    def build() -> dict:
+        return build_player_search_payload(
+            table=snapshot.stats,
+            query=query,
+            substring=match == "substring",
+            uuid_prefix=uuid_prefix,
+            after=after,
+            limit=limit,
+            updated_at=snapshot.updated_at,
+        )
 
-    return BasicPlayersResponse(
-        count=len(result_players),
-        updated_at=datetime.now(timezone.utc),
-        players=result_players,
-    )
\ No newline at end of file
+    key = ("players_search", query, match, uuid_prefix, limit, after)
+    return snapshot_response(request, key, BasicPlayersResponse, build, settings, snapshot)
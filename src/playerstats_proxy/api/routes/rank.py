@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+
+from playerstats_proxy.api.dependencies import get_settings, get_snapshot
+from playerstats_proxy.api.responses import snapshot_response
+from playerstats_proxy.core.config import Settings
+from playerstats_proxy.models.schemas import RankResponse
+from playerstats_proxy.services.rank_service import build_rank_payload, build_section_rank_payload
+from playerstats_proxy.services.snapshot_store import Snapshot
+
+router = APIRouter(prefix="/moss", tags=["rank"])
+
+
+@router.get("/rank/{uuid}/section/{section}", response_model=RankResponse)
+async def rank_by_section_total(
+    request: Request,
+    uuid: str,
+    section: str,
+    neighbours: int = Query(2, ge=0),
+    settings: Settings = Depends(get_settings),
+    snapshot: Snapshot = Depends(get_snapshot),
+) -> RankResponse | Response:
+    neighbours = min(neighbours, settings.max_rank_neighbours)
+
+    def build() -> dict:
+        try:
+            return build_section_rank_payload(
+                table=snapshot.stats,
+                derived=snapshot.derived,
+                player_uuid=uuid,
+                section=section,
+                neighbours=neighbours,
+                updated_at=snapshot.updated_at,
+            )
+        except KeyError:
+            raise HTTPException(status_code=404, detail="Player not found")
+
+    key = ("rank_section", uuid, section, neighbours)
+    return snapshot_response(request, key, RankResponse, build, settings, snapshot)
+
+
+@router.get("/rank/{uuid}/{stat_key}/{section}", response_model=RankResponse)
+async def rank_by_stat(
+    request: Request,
+    uuid: str,
+    stat_key: str,
+    section: str,
+    neighbours: int = Query(2, ge=0),
+    settings: Settings = Depends(get_settings),
+    snapshot: Snapshot = Depends(get_snapshot),
+) -> RankResponse | Response:
+    neighbours = min(neighbours, settings.max_rank_neighbours)
+
+    def build() -> dict:
+        # Rang et voisins lus dans le classement pré-trié du snapshot (bisect, sans retrier)
+        try:
+            return build_rank_payload(
+                table=snapshot.stats,
+                derived=snapshot.derived,
+                player_uuid=uuid,
+                section=section,
+                stat_key=stat_key,
+                neighbours=neighbours,
+                updated_at=snapshot.updated_at,
+            )
+        except KeyError:
+            raise HTTPException(status_code=404, detail="Player not found")
+
+    key = ("rank", uuid, stat_key, section, neighbours)
+    return snapshot_response(request, key, RankResponse, build, settings, snapshot)
@@ -1,109 +1,62 @@
 from __future__ import annotations
 
-import logging
-from datetime import datetime, timezone
-
-import httpx
-from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 
+from playerstats_proxy.api.dependencies import get_settings, get_snapshot
+from playerstats_proxy.api.responses import snapshot_response
 from playerstats_proxy.core.config import Settings
 from playerstats_proxy.models.schemas import (
     AggregateStatsResponse,
     StatsSectionKeysResponse,
     StatsSectionsResponse,
 )
-from playerstats_proxy.services.aggregate_service import build_aggregate_response, compute_aggregate
-from playerstats_proxy.services.playerstats_client import PlayerStatsClient
+from playerstats_proxy.services.aggregate_service import build_aggregate_payload
+from playerstats_proxy.services.snapshot_store import Snapshot
 
-logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/moss", tags=["stats"])
 
 
-def get_settings(request: Request) -> Settings:
-    return request.app.state.settings
-
-
-def get_playerstats_client(request: Request) -> PlayerStatsClient:
-    return request.app.state.playerstats_client
-
 @router.get("/stats/sections", response_model=StatsSectionsResponse)
 async def stats_sections(
     request: Request,
-    client: PlayerStatsClient = Depends(get_playerstats_client),
-) -> StatsSectionsResponse:
-    # Récupère les joueurs depuis le cache (ou upstream si cache vide)
-    cached_players = request.app.state.players_cache.get()
-    if cached_players is None:
-        try:
-            players = await client.fetch_players()
-        except httpx.HTTPError as e:
-            logger.exception("Upstream HTTP error while fetching players")
-            raise HTTPException(status_code=502, detail=f"Upstream HTTP error: {type(e).__name__}") from e
-        except ValueError as e:
-            logger.exception("Upstream payload error")
-            raise HTTPException(status_code=502, detail=str(e)) from e
-
-        request.app.state.players_cache.set(players)
-        request.app.state.maxima_cache.clear()
-        request.app.state.aggregate_cache.clear()
-        cached_players = players
-
-    # Récupère l'agrégat depuis le cache (ou le calcule)
-    cached_aggregate = request.app.state.aggregate_cache.get()
-    if cached_aggregate is None:
-        cached_aggregate = compute_aggregate(cached_players)
-        request.app.state.aggregate_cache.set(cached_aggregate)
+    settings: Settings = Depends(get_settings),
+    snapshot: Snapshot = Depends(get_snapshot),
+) -> StatsSectionsResponse | Response:
+    def build() -> dict:
+        # Catalogue trié, calculé avec le snapshot
+        sections = list(snapshot.derived.catalogue)
 
-    sections = sorted(cached_aggregate.keys())
+        return {
+            "count": len(sections),
+            "updated_at": snapshot.updated_at,
+            "sections": sections,
+        }
 
-    return StatsSectionsResponse(
-        count=len(sections),
-        updated_at=datetime.now(timezone.utc),
-        sections=sections,
-    )
+    return snapshot_response(request, ("stats_sections",), StatsSectionsResponse, build, settings, snapshot)
 
 
 @router.get("/stats/{section}/keys", response_model=StatsSectionKeysResponse)
 async def stats_section_keys(
-    section: str,
     request: Request,
-    client: PlayerStatsClient = Depends(get_playerstats_client),
-) -> StatsSectionKeysResponse:
-    # Récupère les joueurs depuis le cache (ou upstream si cache vide)
-    cached_players = request.app.state.players_cache.get()
-    if cached_players is None:
-        try:
-            players = await client.fetch_players()
-        except httpx.HTTPError as e:
-            logger.exception("Upstream HTTP error while fetching players")
-            raise HTTPException(status_code=502, detail=f"Upstream HTTP error: {type(e).__name__}") from e
-        except ValueError as e:
-            logger.exception("Upstream payload error")
-            raise HTTPException(status_code=502, detail=str(e)) from e
-
-        request.app.state.players_cache.set(players)
-        request.app.state.maxima_cache.clear()
-        request.app.state.aggregate_cache.clear()
-        cached_players = players
-
-    # Récupère l'agrégat depuis le cache (ou le calcule)
-    cached_aggregate = request.app.state.aggregate_cache.get()
-    if cached_aggregate is None:
-        cached_aggregate = compute_aggregate(cached_players)
-        request.app.state.aggregate_cache.set(cached_aggregate)
-
-    section_map = cached_aggregate.get(section)
-    if section_map is None:
+    section: str,
+    settings: Settings = Depends(get_settings),
+    snapshot: Snapshot = Depends(get_snapshot),
+) -> StatsSectionKeysResponse | Response:
+    # Catalogue trié, calculé avec le snapshot
+    stat_keys = snapshot.derived.catalogue.get(section)
+    if stat_keys is None:
         raise HTTPException(status_code=404, detail="Section not found")
 
-    stat_keys = sorted(section_map.keys())
+    def build() -> dict:
+        return {
+            "section": section,
+            "count": len(stat_keys),
+            "updated_at": snapshot.updated_at,
+            "stat_keys": stat_keys,
+        }
 
-    return StatsSectionKeysResponse(
-        section=section,
-        count=len(stat_keys),
-        updated_at=datetime.now(timezone.utc),
-        stat_keys=stat_keys,
-    )
+    key = ("stats_keys", section)
+    return snapshot_response(request, key, StatsSectionKeysResponse, build, settings, snapshot)
 
 @router.get("/stats", response_model=AggregateStatsResponse)
 async def aggregated_stats(
@@ -111,38 +64,21 @@ async def aggregated_stats(
     min_value: int = Query(1, ge=0),
     limit_per_section: int = Query(0, ge=0),
     settings: Settings = Depends(get_settings),
-    client: PlayerStatsClient = Depends(get_playerstats_client),
-) -> AggregateStatsResponse:
+    snapshot: Snapshot = Depends(get_snapshot),
+) -> AggregateStatsResponse | Response:
     # Garde-fou si quelqu'un met un limit gigantesque
     if limit_per_section > 0:
         limit_per_section = min(limit_per_section, settings.max_limit)
 
-    # Cache joueurs
-    cached_players = request.app.state.players_cache.get()
-    if cached_players is None:
-        try:
-            players = await client.fetch_players()
-        except httpx.HTTPError as e:
-            logger.exception("Upstream HTTP error while fetching players")
-            raise HTTPException(status_code=502, detail=f"Upstream HTTP error: {type(e).__name__}") from e
-        except ValueError as e:
-            logger.exception("Upstream payload error")
-            raise HTTPException(status_code=502, detail=str(e)) from e
-
-        request.app.state.players_cache.set(players)
-        request.app.state.maxima_cache.clear()
-        request.app.state.aggregate_cache.clear()
-        cached_players = players
-
-    # Cache agrégat brut (sans filtres)
-    cached_aggregate = request.app.state.aggregate_cache.get()
-    if cached_aggregate is None:
-        cached_aggregate = compute_aggregate(cached_players)
-        request.app.state.aggregate_cache.set(cached_aggregate)
-
-    return build_aggregate_response(
-        aggregate=cached_aggregate,
-        players_count=len(cached_players),
-        min_value=min_value,
-        limit_per_section=limit_per_section,
-    )
+    def build() -> dict:
+        # Agrégat brut (sans filtres), calculé une seule fois par snapshot
+        return build_aggregate_payload(
+            aggregate=snapshot.derived.aggregate,
+            players_count=snapshot.stats.player_count,
+            min_value=min_value,
+            limit_per_section=limit_per_section,
+            updated_at=snapshot.updated_at,
+        )
+
+    key = ("stats", min_value, limit_per_section)
+    return snapshot_response(request, key, AggregateStatsResponse, build, settings, snapshot)
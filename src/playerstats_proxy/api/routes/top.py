@@ -1,119 +1,120 @@
 from __future__ import annotations
 
-import logging
+from typing import Optional
 
-import httpx
-from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 
+from playerstats_proxy.api.dependencies import get_settings, get_snapshot
+from playerstats_proxy.api.responses import snapshot_response
 from playerstats_proxy.core.config import Settings
 from playerstats_proxy.models.schemas import TopResponse
-from playerstats_proxy.services.aggregate_service import compute_aggregate
-from playerstats_proxy.services.playerstats_client import PlayerStatsClient
-from playerstats_proxy.services.top_service import build_top
+from playerstats_proxy.services.leaderboard import PageKey, decode_cursor
+from playerstats_proxy.services.snapshot_store import Snapshot
+from playerstats_proxy.services.top_service import build_top_payload
 from playerstats_proxy.models.schemas import SectionTopResponse
-from playerstats_proxy.services.top_service import build_section_top
+from playerstats_proxy.services.top_service import build_section_top_payload
+from playerstats_proxy.models.schemas import TopBatchRequest, TopBatchResponse
+from playerstats_proxy.services.top_service import build_top_batch_payload
 
-logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/moss", tags=["top"])
 
 
-def get_settings(request: Request) -> Settings:
-    return request.app.state.settings
-
-
-def get_playerstats_client(request: Request) -> PlayerStatsClient:
-    return request.app.state.playerstats_client
+def _page_key(snapshot: Snapshot, cursor: Optional[str]) -> Optional[PageKey]:
+    # Curseur renvoyé par la page précédente (next_cursor) -> position de reprise dans le classement
+    if not cursor:
+        return None
+    try:
+        return decode_cursor(snapshot.stats, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from None
 
 
 @router.get("/top/section/{section}", response_model=SectionTopResponse)
 async def top_by_section_total(
-    section: str,
     request: Request,
+    section: str,
     limit: int = Query(10, ge=1),
     include_zeros: bool = Query(False),
+    cursor: Optional[str] = Query(None),
     settings: Settings = Depends(get_settings),
-    client: PlayerStatsClient = Depends(get_playerstats_client),
-) -> SectionTopResponse:
+    snapshot: Snapshot = Depends(get_snapshot),
+) -> SectionTopResponse | Response:
     limit = min(limit, settings.max_limit)
-
-    cached_players = request.app.state.players_cache.get()
-    if cached_players is None:
-        try:
-            players = await client.fetch_players()
-        except httpx.HTTPError as e:
-            logger.exception("Upstream HTTP error while fetching players")
-            raise HTTPException(status_code=502, detail=f"Upstream HTTP error: {type(e).__name__}") from e
-        except ValueError as e:
-            logger.exception("Upstream payload error")
-            raise HTTPException(status_code=502, detail=str(e)) from e
-
-        request.app.state.players_cache.set(players)
-        request.app.state.maxima_cache.clear()
-        request.app.state.aggregate_cache.clear()
-        cached_players = players
-
-    cached_aggregate = request.app.state.aggregate_cache.get()
-    if cached_aggregate is None:
-        cached_aggregate = compute_aggregate(cached_players)
-        request.app.state.aggregate_cache.set(cached_aggregate)
-
-    # Total de la section = somme des totaux de tous ses stat_key
-    section_map = cached_aggregate.get(section) or {}
-    total_value = sum(int(v or 0) for v in section_map.values())
-
-    return build_section_top(
-        players=cached_players,
-        section=section,
-        limit=limit,
-        include_zeros=include_zeros,
-        total_value=max(0, int(total_value)),
+    after = _page_key(snapshot, cursor)
+
+    def build() -> dict:
+        # Total de la section = somme des totaux de tous ses stat_key (calculé avec le snapshot)
+        total_value = snapshot.derived.section_sums.get(section, 0)
+
+        return build_section_top_payload(
+            table=snapshot.stats,
+            derived=snapshot.derived,
+            section=section,
+            limit=limit,
+            include_zeros=include_zeros,
+            total_value=max(0, int(total_value)),
+            updated_at=snapshot.updated_at,
+            after=after,
+        )
+
+    key = ("top_section", section, limit, include_zeros, after)
+    return snapshot_response(request, key, SectionTopResponse, build, settings, snapshot)
+
+@router.post("/top/batch", response_model=TopBatchResponse)
+async def top_batch(
+    request: Request,
+    batch: TopBatchRequest,
+    settings: Settings = Depends(get_settings),
+    snapshot: Snapshot = Depends(get_snapshot),
+) -> TopBatchResponse | Response:
+    # Plusieurs classements (stat ou total de section) en une requête, tous sur le même snapshot
+    if len(batch.queries) > settings.max_batch_queries:
+        raise HTTPException(status_code=422, detail=f"Too many queries (max {settings.max_batch_queries})")
+
+    queries = tuple(
+        (query.section, query.stat_key, min(query.limit, settings.max_limit), query.include_zeros)
+        for query in batch.queries
     )
 
+    def build() -> dict:
+        return build_top_batch_payload(
+            table=snapshot.stats,
+            derived=snapshot.derived,
+            queries=list(queries),
+            updated_at=snapshot.updated_at,
+        )
+
+    key = ("top_batch", queries)
+    return snapshot_response(request, key, TopBatchResponse, build, settings, snapshot)
+
 @router.get("/top/{stat_key}/{section}", response_model=TopResponse)
 async def top_by_section(
+    request: Request,
     stat_key: str,
     section: str,
-    request: Request,
     limit: int = Query(10, ge=1),
     include_zeros: bool = Query(False),
+    cursor: Optional[str] = Query(None),
     settings: Settings = Depends(get_settings),
-    client: PlayerStatsClient = Depends(get_playerstats_client),
-) -> TopResponse:
+    snapshot: Snapshot = Depends(get_snapshot),
+) -> TopResponse | Response:
     limit = min(limit, settings.max_limit)
-
-    # Cache joueurs
-    cached_players = request.app.state.players_cache.get()
-    if cached_players is None:
-        try:
-            players = await client.fetch_players()
-        except httpx.HTTPError as e:
-            logger.exception("Upstream HTTP error while fetching players")
-            raise HTTPException(status_code=502, detail=f"Upstream HTTP error: {type(e).__name__}") from e
-        except ValueError as e:
-            logger.exception("Upstream payload error")
-            raise HTTPException(status_code=502, detail=str(e)) from e
-
-        request.app.state.players_cache.set(players)
-        request.app.state.maxima_cache.clear()
-        request.app.state.aggregate_cache.clear()
-        cached_players = players
-
-    # Cache agrégat
-    cached_aggregate = request.app.state.aggregate_cache.get()
-    if cached_aggregate is None:
-        cached_aggregate = compute_aggregate(cached_players)
-        request.app.state.aggregate_cache.set(cached_aggregate)
-
-    total_value = int((cached_aggregate.get(section) or {}).get(stat_key, 0) or 0)
-    total_value = max(0, total_value)
-
-    return build_top(
-        players=cached_players,
-        section=section,
-        stat_key=stat_key,
-        limit=limit,
-        include_zeros=include_zeros,
-        total_value=total_value,
-    )
-
-
+    after = _page_key(snapshot, cursor)
+
+    def build() -> dict:
+        # Total de la stat, issu du même snapshot que le classement
+        total_value = max(0, snapshot.derived.stat_total(section, stat_key))
+
+        return build_top_payload(
+            table=snapshot.stats,
+            section=section,
+            stat_key=stat_key,
+            limit=limit,
+            include_zeros=include_zeros,
+            total_value=total_value,
+            updated_at=snapshot.updated_at,
+            after=after,
+        )
+
+    key = ("top", stat_key, section, limit, include_zeros, after)
+    return snapshot_response(request, key, TopResponse, build, settings, snapshot)
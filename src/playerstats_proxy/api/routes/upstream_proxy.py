@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+import math
+
 import httpx
 from fastapi import APIRouter, HTTPException, Request
 
-from playerstats_proxy.services.reverse_proxy import ReverseProxy
+from playerstats_proxy.services.circuit_breaker import CircuitOpenError
+from playerstats_proxy.services.reverse_proxy import RequestBody, RequestBodyTooLarge, ReverseProxy
 
 
 router = APIRouter(tags=["upstream"], include_in_schema=False)
@@ -15,9 +18,18 @@ def get_reverse_proxy(request: Request) -> ReverseProxy:
     return request.app.state.reverse_proxy
 
 
-@router.api_route("/moss/{full_path:path}", methods=_ALL_METHODS)
-async def proxy_moss(full_path: str, request: Request) -> object:
-    # Forward tout /moss/* qui n'a pas matché une route custom
+def _request_body(request: Request) -> RequestBody:
+    # Sans Content-Length ni Transfer-Encoding, la requête n'a pas de corps (GET, HEAD...) ; sinon le corps
+    # est relayé au fil de sa réception, sans être bufferisé
+    content_length = request.headers.get("content-length")
+    if content_length is None and "transfer-encoding" not in request.headers:
+        return b""
+    if content_length == "0":
+        return b""
+    return request.stream()
+
+
+async def _forward(request: Request) -> object:
     proxy = get_reverse_proxy(request)
     try:
         return await proxy.forward(
@@ -25,23 +37,28 @@ async def proxy_moss(full_path: str, request: Request) -> object:
             path=request.url.path,
             query=request.url.query,
             headers=dict(request.headers),
-            body=await request.body(),
+            body=_request_body(request),
         )
+    except RequestBodyTooLarge:
+        raise HTTPException(status_code=413, detail="Request body too large") from None
+    except CircuitOpenError as e:
+        # Upstream en panne : réponse immédiate au lieu d'attendre son timeout
+        raise HTTPException(
+            status_code=503,
+            detail="Upstream unavailable",
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        ) from None
     except httpx.HTTPError as e:
         raise HTTPException(status_code=502, detail=f"Upstream proxy error: {type(e).__name__}") from e
 
 
+@router.api_route("/moss/{full_path:path}", methods=_ALL_METHODS)
+async def proxy_moss(full_path: str, request: Request) -> object:
+    # Forward tout /moss/* qui n'a pas matché une route custom
+    return await _forward(request)
+
+
 @router.api_route("/{full_path:path}", methods=_ALL_METHODS)
 async def proxy_everything_else(full_path: str, request: Request) -> object:
     # Forward absolument tout le reste (non /moss), sauf ce que FastAPI a déjà matché (health/docs/etc.)
-    proxy = get_reverse_proxy(request)
-    try:
-        return await proxy.forward(
-            method=request.method,
-            path=request.url.path,
-            query=request.url.query,
-            headers=dict(request.headers),
-            body=await request.body(),
-        )
-    except httpx.HTTPError as e:
-        raise HTTPException(status_code=502, detail=f"Upstream proxy error: {type(e).__name__}") from e
+    return await _forward(request)
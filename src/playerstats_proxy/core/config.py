@@ -9,15 +9,111 @@ class Settings(BaseSettings):
     # Cache local (TTL)
     cache_ttl_seconds: int = 20
 
+    # Rafraîchissement du snapshot en arrière-plan, un peu avant l'expiration du cache
+    background_refresh: bool = True
+    refresh_ahead_seconds: int = 5
+    refresh_retry_seconds: int = 5
+
+    # Durée max (après expiration) pendant laquelle on sert encore l'ancien snapshot
+    # si le rafraîchissement est en cours ou si l'upstream est en erreur (0 = désactivé)
+    max_stale_seconds: int = 300
+
+    # Refresh incrémental : seuls les joueurs dont le JSON a changé depuis le snapshot précédent sont recalculés
+    delta_refresh: bool = True
+
+    # Fichier où le dernier snapshot est écrit à chaque refresh, rechargé au démarrage (vide = désactivé)
+    snapshot_file: str = ""
+
+    # Historique SQLite pour /moss/history/top (vide = désactivé), ex. /app/data/history.sqlite3 :
+    # un snapshot toutes les interval_seconds (valeurs modifiées seulement), un par downsample_interval
+    # au-delà de downsample_after, supprimés après retention
+    history_db: str = ""
+    history_interval_seconds: int = 300
+    history_retention_seconds: int = 35 * 24 * 3600
+    history_downsample_after_seconds: int = 24 * 3600
+    history_downsample_interval_seconds: int = 3600
+
+    # Mode multi-workers (uvicorn --workers N) : dossier du snapshot partagé, idéalement sur tmpfs
+    # (ex. /dev/shm/playerstats-proxy). Vide = chaque worker garde son propre snapshot.
+    shared_snapshot_dir: str = ""
+    shared_snapshot_poll_seconds: float = 1.0
+
     # Réseau
     http_timeout_seconds: int = 10
 
+    # Pools de connexions vers l'upstream : un pour le refresh du snapshot, un pour le proxy (0 = illimité)
+    refresh_max_connections: int = 2
+    proxy_max_connections: int = 20
+    proxy_max_keepalive_connections: int = 10
+    http_keepalive_expiry_seconds: float = 30.0
+
+    # HTTP/2 vers l'upstream (nécessite l'extra "http2", sinon on reste en HTTP/1.1)
+    http2: bool = False
+
+    # Requêtes proxifiées simultanées max vers le plugin (0 = illimité) ; au-delà on attend. Le refresh a sa
+    # propre limite (refresh_max_connections) : un afflux de trafic proxifié ne retarde jamais le snapshot
+    upstream_max_in_flight: int = 16
+
+    # Disjoncteur : après N échecs consécutifs (timeouts, 502/503/504), les appels upstream échouent
+    # immédiatement (snapshot stale servi, 503 sur le proxy) pendant reset_seconds, puis une requête test
+    # (0 = désactivé)
+    circuit_breaker_failure_threshold: int = 5
+    circuit_breaker_reset_seconds: float = 15.0
+
+    # Nouvelles tentatives du fetch du snapshot sur erreur transitoire (backoff exponentiel avec jitter)
+    refresh_retries: int = 2
+    refresh_retry_backoff_seconds: float = 0.5
+
     # Garde-fou sur /top ?limit=
     max_limit: int = 200
 
+    # Garde-fou sur la recherche /players/basic?q=... (taille max d'une page ; sans paramètre : liste complète)
+    max_player_search_limit: int = 1000
+
+    # Garde-fou sur /rank ?neighbours= (joueurs affichés de part et d'autre)
+    max_rank_neighbours: int = 50
+
+    # Garde-fou sur POST /top/batch (nombre max de classements par requête)
+    max_batch_queries: int = 100
+
     # Garde-fou sur /best (nombre max de stats retournées)
     max_best_results: int = 5000
 
+    # Réponses calculées sérialisées directement (orjson si installé), sans validation Pydantic par ligne
+    fast_json_responses: bool = False
+
+    # Corps de réponse sérialisés gardés par (requête normalisée, version de snapshot) ; 0 = désactivé
+    response_cache_max_entries: int = 1024
+    response_cache_max_bytes: int = 64 * 1024 * 1024
+
+    # Compression des réponses calculées (br/zstd si l'extra "compression" est installé, sinon gzip),
+    # faite une fois par version de snapshot et gardée avec le corps en cache ; petits corps non compressés
+    response_compression: bool = True
+    response_compression_min_bytes: int = 1024
+
+    # Taille max d'un corps de requête relayé à l'upstream (0 = illimité) ; au-delà : 413
+    proxy_max_body_bytes: int = 10 * 1024 * 1024
+
+    # Cache des réponses proxifiées (GET/HEAD), opt-in par motif de chemin : "motif[=ttl],..."
+    # ex. "/moss/player/*=30,/server/info" (vide = désactivé). Le Cache-Control upstream reste prioritaire.
+    proxy_cache_rules: str = ""
+    proxy_cache_ttl_seconds: int = 10
+    proxy_cache_max_entries: int = 1024
+    proxy_cache_max_bytes: int = 32 * 1024 * 1024
+    proxy_cache_max_body_bytes: int = 1024 * 1024
+
+    # Endpoint /metrics (format Prometheus, par worker) : latences, tailles, caches, snapshot
+    metrics_enabled: bool = True
+
+    # Profilage à la demande : en-tête X-PSP-Profile (ou ?psp_profile=) égal au jeton -> profil renvoyé
+    # à la place de la réponse (vide = désactivé, aucun surcoût). pyinstrument si installé (extra "profiling"),
+    # sinon cProfile. Avec profiling_dir, profils aussi écrits sur disque, plus une part des requêtes
+    # profilée d'office (sample_rate, ex. 0.001)
+    profiling_token: str = ""
+    profiling_sample_rate: float = 0.0
+    profiling_dir: str = ""
+    profiling_interval_seconds: float = 0.001
+
     model_config = SettingsConfigDict(
         env_prefix="PSP_",
         env_file=".env",
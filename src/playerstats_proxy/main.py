@@ -1,21 +1,36 @@
 from __future__ import annotations
 
+import asyncio
+import os
 from contextlib import asynccontextmanager
 
 import httpx
 from fastapi import FastAPI
 
+from playerstats_proxy.api.metrics import RequestMetricsMiddleware, register_state_metrics
+from playerstats_proxy.api.profiling import ProfilingMiddleware, RequestProfiler
 from playerstats_proxy.api.routes.health import router as health_router
+from playerstats_proxy.api.routes.history import router as history_router
 from playerstats_proxy.api.routes.top import router as top_router
 from playerstats_proxy.api.routes.best import router as best_router
 from playerstats_proxy.api.routes.stats import router as stats_router
 from playerstats_proxy.api.routes.players import router as players_router
+from playerstats_proxy.api.routes.rank import router as rank_router
+from playerstats_proxy.api.routes.metrics import router as metrics_router
 from playerstats_proxy.api.routes.upstream_proxy import router as upstream_proxy_router
 from playerstats_proxy.core.config import Settings
 from playerstats_proxy.core.logging import setup_logging
+from playerstats_proxy.services.circuit_breaker import CircuitBreaker
+from playerstats_proxy.services.history_store import HistoryStore
 from playerstats_proxy.services.playerstats_client import PlayerStatsClient
+from playerstats_proxy.services.proxy_cache import ProxyCache, parse_cache_rules
 from playerstats_proxy.services.reverse_proxy import ReverseProxy
-from playerstats_proxy.utils.ttl_cache import TTLCache
+from playerstats_proxy.services.shared_snapshot import SharedSnapshotStore
+from playerstats_proxy.services.snapshot_files import SnapshotFileWriter, load_snapshot_file
+from playerstats_proxy.services.snapshot_refresher import SnapshotRefresher
+from playerstats_proxy.services.snapshot_store import SnapshotStore
+from playerstats_proxy.services.upstream_http import create_upstream_client
+from playerstats_proxy.utils.lru_cache import LRUCache
 
 
 @asynccontextmanager
@@ -25,25 +40,152 @@ async def lifespan(app: FastAPI):
     settings = Settings()
     timeout = httpx.Timeout(settings.http_timeout_seconds)
 
-    async with httpx.AsyncClient(timeout=timeout) as http_client:
+    # Plafonds de requêtes en cours vers le plugin, un par client : le proxy ne peut pas occuper toutes les
+    # places et faire attendre le refresh du snapshot
+    proxy_in_flight = asyncio.Semaphore(settings.upstream_max_in_flight) if settings.upstream_max_in_flight > 0 else None
+    refresh_in_flight = asyncio.Semaphore(settings.refresh_max_connections) if settings.refresh_max_connections > 0 else None
+
+    # Disjoncteur partagé : refresh et proxy parlent au même plugin
+    breaker = CircuitBreaker(
+        failure_threshold=settings.circuit_breaker_failure_threshold,
+        reset_seconds=settings.circuit_breaker_reset_seconds,
+    )
+
+    # Pools séparés : un afflux de trafic proxifié ne peut pas priver le refresh du snapshot de connexions
+    refresh_client = create_upstream_client(
+        timeout=timeout,
+        max_connections=settings.refresh_max_connections,
+        max_keepalive_connections=settings.refresh_max_connections,
+        keepalive_expiry_seconds=settings.http_keepalive_expiry_seconds,
+        http2=settings.http2,
+        semaphore=refresh_in_flight,
+        breaker=breaker,
+    )
+    proxy_client = create_upstream_client(
+        timeout=timeout,
+        max_connections=settings.proxy_max_connections,
+        max_keepalive_connections=settings.proxy_max_keepalive_connections,
+        keepalive_expiry_seconds=settings.http_keepalive_expiry_seconds,
+        http2=settings.http2,
+        semaphore=proxy_in_flight,
+        breaker=breaker,
+    )
+
+    async with refresh_client, proxy_client:
         app.state.settings = settings
-        app.state.players_cache = TTLCache(ttl_seconds=settings.cache_ttl_seconds)
-        app.state.maxima_cache = TTLCache(ttl_seconds=settings.cache_ttl_seconds)
-        app.state.aggregate_cache = TTLCache(ttl_seconds=settings.cache_ttl_seconds)
 
         app.state.playerstats_client = PlayerStatsClient(
-            http_client=http_client,
+            http_client=refresh_client,
             base_url=settings.upstream_base_url,
             players_path=settings.upstream_players_path,
         )
 
-        # Proxy générique vers l'upstream (ton plugin)
+        # Cache joueurs + dérivés (agrégat, maxima), fetch/calculs dédoublonnés entre requêtes
+        snapshot_store = app.state.snapshot_store = SnapshotStore(
+            client=app.state.playerstats_client,
+            ttl_seconds=settings.cache_ttl_seconds,
+            max_stale_seconds=settings.max_stale_seconds,
+            delta_refresh=settings.delta_refresh,
+            retries=settings.refresh_retries,
+            retry_backoff_seconds=settings.refresh_retry_backoff_seconds,
+        )
+
+        # Redémarrage à chaud : dernier snapshot écrit sur disque, servi avant le premier fetch upstream
+        if settings.snapshot_file:
+            os.makedirs(os.path.dirname(settings.snapshot_file) or ".", exist_ok=True)
+            snapshot_writer = SnapshotFileWriter(settings.snapshot_file)
+            persisted = await asyncio.to_thread(load_snapshot_file, settings.snapshot_file)
+            if persisted is not None:
+                app.state.snapshot_store.seed(persisted)
+                snapshot_writer.mark_written(persisted.version)
+            app.state.snapshot_store.add_listener(snapshot_writer.schedule)
+
+        # Historique local (SQLite) pour les classements de progression sur une fenêtre
+        history = None
+        if settings.history_db:
+            os.makedirs(os.path.dirname(settings.history_db) or ".", exist_ok=True)
+            history = HistoryStore(
+                path=settings.history_db,
+                interval_seconds=settings.history_interval_seconds,
+                retention_seconds=settings.history_retention_seconds,
+                downsample_after_seconds=settings.history_downsample_after_seconds,
+                downsample_interval_seconds=settings.history_downsample_interval_seconds,
+            )
+            await asyncio.to_thread(history.open)
+            app.state.snapshot_store.add_listener(history.schedule)
+        app.state.history_store = history
+
+        # Multi-workers : un seul worker interroge l'upstream, les autres mappent son snapshot
+        shared_store = None
+        if settings.shared_snapshot_dir:
+            os.makedirs(settings.shared_snapshot_dir, exist_ok=True)
+            shared_store = SharedSnapshotStore(
+                store=app.state.snapshot_store,
+                directory=settings.shared_snapshot_dir,
+                ttl_seconds=settings.cache_ttl_seconds,
+                poll_seconds=settings.shared_snapshot_poll_seconds,
+                wait_seconds=settings.http_timeout_seconds,
+            )
+            app.state.snapshot_store = shared_store
+
+        # Corps JSON + ETag par requête normalisée, invalidés au changement de version du snapshot
+        app.state.response_cache = LRUCache(
+            max_entries=settings.response_cache_max_entries,
+            max_bytes=settings.response_cache_max_bytes,
+        )
+
+        # Proxy générique vers l'upstream (ton plugin), avec cache opt-in des GET par motif de chemin
+        proxy_cache = ProxyCache(
+            rules=parse_cache_rules(settings.proxy_cache_rules, settings.proxy_cache_ttl_seconds),
+            max_entries=settings.proxy_cache_max_entries,
+            max_bytes=settings.proxy_cache_max_bytes,
+            max_body_bytes=settings.proxy_cache_max_body_bytes,
+        )
         app.state.reverse_proxy = ReverseProxy(
-            http_client=http_client,
+            http_client=proxy_client,
             base_url=settings.upstream_base_url,
+            cache=proxy_cache,
+            max_body_bytes=settings.proxy_max_body_bytes,
+        )
+
+        # /metrics : caches et snapshot courant lus à chaque export
+        caches = {"snapshot": snapshot_store.snapshot_cache, "response": app.state.response_cache}
+        if proxy_cache.enabled:
+            caches["proxy"] = proxy_cache.entries
+        if history is not None:
+            caches["history_window"] = history.window_cache
+        register_state_metrics(app.state.snapshot_store, caches)
+
+        # Profilage à la demande / échantillonné (None = désactivé : le middleware laisse tout passer)
+        request_profiler = None
+        if settings.profiling_token or (settings.profiling_dir and settings.profiling_sample_rate > 0):
+            if settings.profiling_dir:
+                os.makedirs(settings.profiling_dir, exist_ok=True)
+            request_profiler = RequestProfiler(
+                token=settings.profiling_token,
+                sample_rate=settings.profiling_sample_rate,
+                directory=settings.profiling_dir,
+                interval_seconds=settings.profiling_interval_seconds,
+            )
+        app.state.request_profiler = request_profiler
+
+        # Rafraîchit le snapshot avant expiration (stale-while-revalidate)
+        refresher = SnapshotRefresher(
+            store=app.state.snapshot_store,
+            refresh_ahead_seconds=settings.refresh_ahead_seconds,
+            retry_seconds=settings.refresh_retry_seconds,
         )
+        if settings.background_refresh:
+            refresher.start()
 
-        yield
+        try:
+            yield
+        finally:
+            await refresher.stop()
+            if shared_store is not None:
+                shared_store.close()
+            if history is not None:
+                history.close()
 
 
 app = FastAPI(
@@ -52,11 +194,20 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# Profilage d'une requête (inactif sans jeton ni échantillonnage configuré)
+app.add_middleware(ProfilingMiddleware)
+
+# Latence par gabarit de route, exportée sur /metrics (ajouté en dernier : middleware le plus externe)
+app.add_middleware(RequestMetricsMiddleware)
+
 app.include_router(health_router)
 app.include_router(top_router)
 app.include_router(best_router)
 app.include_router(stats_router)
 app.include_router(players_router)
+app.include_router(rank_router)
+app.include_router(history_router)
+app.include_router(metrics_router)
 
 # IMPORTANT : à la fin, pour que tes routes custom aient priorité
 app.include_router(upstream_proxy_router)
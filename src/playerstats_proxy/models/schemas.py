@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Dict
+from typing import Dict, Optional, Union
 from pydantic import BaseModel, Field
 
 
@@ -30,6 +30,9 @@ class TopResponse(BaseModel):
     total_value: int = Field(ge=0)
     results: list[TopEntry]
 
+    # À passer en ?cursor= pour la page suivante (None = fin du classement)
+    next_cursor: Optional[str] = None
+
 
 class BestStatEntry(BaseModel):
     section: str
@@ -78,6 +81,9 @@ class SectionTopResponse(BaseModel):
     total_value: int = Field(ge=0)
     results: list[SectionTopEntry]
 
+    # À passer en ?cursor= pour la page suivante (None = fin du classement)
+    next_cursor: Optional[str] = None
+
 
 class StatsSectionsResponse(BaseModel):
     count: int = Field(ge=0)
@@ -100,4 +106,78 @@ class BasicPlayerEntry(BaseModel):
 class BasicPlayersResponse(BaseModel):
     count: int = Field(ge=0)
     updated_at: datetime
-    players: list[BasicPlayerEntry]
\ No newline at end of file
+    players: list[BasicPlayerEntry]
+
+    # Recherche paginée : à passer en ?cursor= pour la page suivante (None = plus de résultats)
+    next_cursor: Optional[str] = None
+
+
+class TopBatchQuery(BaseModel):
+    section: str
+    # Absent = classement sur le total de la section (comme /top/section/{section})
+    stat_key: Optional[str] = None
+    limit: int = Field(10, ge=1)
+    include_zeros: bool = False
+
+
+class TopBatchRequest(BaseModel):
+    queries: list[TopBatchQuery] = Field(min_length=1)
+
+
+class TopBatchResponse(BaseModel):
+    count: int = Field(ge=0)
+    updated_at: datetime
+    # Un résultat par requête, dans le même ordre
+    results: list[Union[TopResponse, SectionTopResponse]]
+
+
+class RankEntry(BaseModel):
+    rank: int = Field(ge=1)
+    uuid: str
+    name: str
+    value: int = Field(ge=0)
+
+
+class RankResponse(BaseModel):
+    uuid: str
+    name: str
+    section: str
+    # None pour un classement sur le total de la section
+    stat_key: Optional[str] = None
+    value: int = Field(ge=0)
+
+    # Position dans le classement (même ordre que /top), None si le joueur n'y figure pas (valeur 0)
+    rank: Optional[int] = Field(default=None, ge=1)
+    ranked_players: int = Field(ge=0)
+    updated_at: datetime
+
+    total_value: int = Field(ge=0)
+    percent_of_total: float = Field(ge=0, le=100)
+
+    # Joueurs autour du joueur demandé (lui compris), dans l'ordre du classement
+    neighbours: list[RankEntry]
+
+
+class WindowTopEntry(BaseModel):
+    uuid: str
+    name: str
+    # Progression sur la fenêtre (valeur au dernier snapshot d'historique - valeur au début de la fenêtre)
+    value: int = Field(ge=0)
+    section: str
+    stat_key: Optional[str] = None
+
+
+class WindowTopResponse(BaseModel):
+    section: str
+    # None pour un classement sur le total de la section
+    stat_key: Optional[str] = None
+    window: str
+
+    # Snapshots d'historique réellement comparés (None si l'historique est encore vide)
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    limit: int = Field(ge=1)
+
+    # Nombre de joueurs ayant progressé sur la fenêtre
+    players: int = Field(ge=0)
+    results: list[WindowTopEntry]
@@ -1,141 +1,87 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
-from typing import Dict, Tuple
+from datetime import datetime
 
-from playerstats_proxy.models.schemas import BestStatEntry, BestStatsResponse
+from playerstats_proxy.services.derived_stats import DerivedStats
+from playerstats_proxy.services.stats_table import StatsTable
+from playerstats_proxy.utils.percent import compute_percent
 
 
-MaxInfo = Tuple[int, int]  # (max_value, winners_count)
-MaxMap = Dict[Tuple[str, str], MaxInfo]  # (section, stat_key) -> MaxInfo
-AggMap = Dict[str, Dict[str, int]]  # section -> stat_key -> total
-
-
-def _coerce_non_negative_int(value: object) -> int:
-    # Convertit en int >= 0, sinon 0
-    try:
-        v = int(value)  # type: ignore[arg-type]
-    except (TypeError, ValueError):
-        return 0
-    return v if v > 0 else 0
-
-
-def _get_stats_root(player: dict) -> dict:
-    # Accède au dict "stats" vanilla: player["stats"]["stats"]
-    stats_wrapper = player.get("stats") or {}
-    stats_root = stats_wrapper.get("stats") or {}
-    return stats_root if isinstance(stats_root, dict) else {}
-
-
-def compute_maxima(players: list[dict]) -> MaxMap:
-    maxima: MaxMap = {}
-
-    for p in players:
-        stats_root = _get_stats_root(p)
-
-        for section, section_map in stats_root.items():
-            if not isinstance(section_map, dict):
-                continue
-
-            for stat_key, raw_value in section_map.items():
-                value = _coerce_non_negative_int(raw_value)
-                key = (str(section), str(stat_key))
-
-                current = maxima.get(key)
-                if current is None:
-                    maxima[key] = (value, 1)
-                    continue
-
-                current_max, winners_count = current
-                if value > current_max:
-                    maxima[key] = (value, 1)
-                elif value == current_max:
-                    maxima[key] = (current_max, winners_count + 1)
-
-    return maxima
-
-
-def _find_player_by_uuid(players: list[dict], player_uuid: str) -> dict | None:
-    # Recherche par UUID (case-insensitive par sécurité)
-    needle = player_uuid.strip().lower()
-    for p in players:
-        uuid = str(p.get("uuid") or "").strip().lower()
-        if uuid == needle:
-            return p
-    return None
-
-
-def _compute_percent(value: int, total_value: int) -> float:
-    # Calcule un pourcentage sur le total (0 si total=0)
-    if total_value <= 0:
-        return 0.0
-    return round((value / total_value) * 100.0, 6)
-
-
-def build_best_stats(
-    players: list[dict],
-    maxima: MaxMap,
-    aggregate: AggMap,
+def build_best_stats_payload(
+    table: StatsTable,
+    derived: DerivedStats,
     player_uuid: str,
     min_value: int,
     include_zeros: bool,
     max_results: int,
-) -> BestStatsResponse:
-    target = _find_player_by_uuid(players, player_uuid)
-    if target is None:
+    updated_at: datetime,
+) -> dict:
+    # Records du joueur (schéma BestStatsResponse)
+    row = table.find_row(player_uuid)
+    if row is None:
         raise KeyError(f"Player not found: {player_uuid}")
 
-    uuid = str(target.get("uuid") or "")
-    name = str(target.get("name") or "")
-
-    stats_root = _get_stats_root(target)
-
-    results: list[BestStatEntry] = []
-
-    for section, section_map in stats_root.items():
-        if not isinstance(section_map, dict):
-            continue
-
-        section_str = str(section)
-
-        for stat_key, raw_value in section_map.items():
-            stat_key_str = str(stat_key)
-            value = _coerce_non_negative_int(raw_value)
-
-            if not include_zeros and value == 0:
+    uuid = table.uuids[row]
+    name = table.names[row]
+
+    maxima = derived.maxima
+    results: list[dict] = []
+
+    # Records > 0 du joueur, déjà triés par valeur desc : on s'arrête dès que possible
+    for section_str, stat_key_str in derived.records.by_row.get(row, ()):
+        if len(results) >= max_results:
+            break
+
+        max_value, winners_count = maxima[(section_str, stat_key_str)]
+        if max_value < min_value:
+            break
+
+        # Total cumulé de tout le monde pour ce couple (section, stat_key)
+        total_value = max(0, derived.stat_total(section_str, stat_key_str))
+
+        results.append(
+            {
+                "section": section_str,
+                "stat_key": stat_key_str,
+                "value": max_value,
+                "max_value": max_value,
+                "winners_count": winners_count,
+                "tied": winners_count > 1,
+                "total_value": total_value,
+                "percent_of_total": compute_percent(max_value, total_value),
+            }
+        )
+
+    # Stats à 0 partout : le joueur en est co-détenteur s'il possède la clé
+    if include_zeros and min_value <= 0:
+        for section_str, stat_key_str in derived.records.zero_max_keys:
+            if len(results) >= max_results:
+                break
+
+            column = table.column(section_str, stat_key_str)
+            if column is None or column.get(row) is None:
                 continue
-            if value < min_value:
-                continue
-
-            max_value, winners_count = maxima.get((section_str, stat_key_str), (0, 1))
-
-            # Total cumulé de tout le monde pour ce couple (section, stat_key)
-            total_value = int((aggregate.get(section_str) or {}).get(stat_key_str, 0) or 0)
-            total_value = max(0, total_value)
-
-            if value == max_value and (include_zeros or max_value > 0):
-                results.append(
-                    BestStatEntry(
-                        section=section_str,
-                        stat_key=stat_key_str,
-                        value=value,
-                        max_value=max_value,
-                        winners_count=winners_count,
-                        tied=(winners_count > 1),
-                        total_value=total_value,
-                        percent_of_total=_compute_percent(value, total_value),
-                    )
-                )
-
-    results.sort(key=lambda r: (-r.value, r.section, r.stat_key))
-    limited = results[:max_results]
 
-    return BestStatsResponse(
-        uuid=uuid,
-        name=name,
-        min_value=min_value,
-        include_zeros=include_zeros,
-        max_results=max_results,
-        updated_at=datetime.now(timezone.utc),
-        results=limited,
-    )
+            winners_count = maxima[(section_str, stat_key_str)][1]
+            results.append(
+                {
+                    "section": section_str,
+                    "stat_key": stat_key_str,
+                    "value": 0,
+                    "max_value": 0,
+                    "winners_count": winners_count,
+                    "tied": winners_count > 1,
+                    "total_value": 0,
+                    "percent_of_total": 0.0,
+                }
+            )
+
+    return {
+        "uuid": uuid,
+        "name": name,
+        "min_value": min_value,
+        "include_zeros": include_zeros,
+        "max_results": max_results,
+        "updated_at": updated_at,
+        "results": results,
+    }
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import logging
+import time
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Réponses de l'upstream qui signalent un plugin indisponible ou surchargé (serveur Minecraft qui lag...)
+UNAVAILABLE_STATUSES = {502, 503, 504}
+
+
+class CircuitOpenError(httpx.TransportError):
+    # Requête refusée sans contacter l'upstream : le circuit est ouvert
+    def __init__(self, retry_after: float) -> None:
+        super().__init__("Upstream circuit is open")
+        self.retry_after = retry_after
+
+
+def is_upstream_failure(exc: BaseException) -> bool:
+    # Erreur qui traduit un upstream en difficulté (timeout, connexion refusée, 502/503/504),
+    # par opposition à un refus local (circuit ouvert, file d'attente pleine) ou à une réponse applicative
+    if isinstance(exc, (CircuitOpenError, httpx.PoolTimeout)):
+        return False
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in UNAVAILABLE_STATUSES
+    return isinstance(exc, httpx.TransportError)
+
+
+class CircuitBreaker:
+    # closed : tout passe ; open : échec immédiat pendant reset_seconds ;
+    # half_open : une seule requête test, qui referme le circuit si elle réussit ou le rouvre sinon
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_seconds: float) -> None:
+        # failure_threshold : échecs consécutifs avant ouverture (0 = circuit désactivé)
+        self._failure_threshold = max(0, int(failure_threshold))
+        self._reset_seconds = max(0.0, float(reset_seconds))
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    def retry_after(self) -> float:
+        # Secondes avant la prochaine requête test (0 si le circuit n'est pas ouvert)
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self._opened_at + self._reset_seconds - time.monotonic())
+
+    def check(self) -> None:
+        # À appeler avant chaque requête upstream : CircuitOpenError si elle doit échouer tout de suite
+        if self._failure_threshold <= 0 or self.state == self.CLOSED:
+            return
+        if self.state == self.OPEN:
+            retry_after = self.retry_after()
+            if retry_after > 0:
+                raise CircuitOpenError(retry_after)
+            self.state = self.HALF_OPEN
+            self._probing = False
+        if self._probing:
+            raise CircuitOpenError(self._reset_seconds)
+        self._probing = True
+
+    def record_success(self) -> None:
+        if self.state != self.CLOSED:
+            logger.info("Upstream recovered, closing circuit")
+        self.state = self.CLOSED
+        self._failures = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self._probing = False
+        if self._failure_threshold <= 0:
+            return
+        if self.state == self.HALF_OPEN:
+            self._open()
+            return
+        self._failures += 1
+        if self.state == self.CLOSED and self._failures >= self._failure_threshold:
+            self._open()
+
+    def release(self) -> None:
+        # Requête abandonnée sans verdict sur l'upstream (annulée, file d'attente pleine) : libère la place
+        # de requête test sans changer l'état
+        self._probing = False
+
+    def _open(self) -> None:
+        logger.warning("Upstream failing, opening circuit for %.0fs", self._reset_seconds)
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._failures = 0
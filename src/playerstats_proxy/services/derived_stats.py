@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from playerstats_proxy.services.stats_table import StatColumn, StatKey
+
+
+MaxInfo = Tuple[int, int]  # (max_value, winners_count)
+MaxMap = Dict[StatKey, MaxInfo]  # (section, stat_key) -> MaxInfo
+AggMap = Dict[str, Dict[str, int]]  # section -> stat_key -> total
+
+
+@dataclass
+class RecordIndex:
+    # Index inversé : ligne joueur -> stats dont il détient le max (> 0), triées (max desc, section, stat_key)
+    by_row: Dict[int, List[StatKey]] = field(default_factory=dict)
+
+    # Stats dont le max vaut 0 (seulement utiles avec include_zeros), triées (section, stat_key)
+    zero_max_keys: List[StatKey] = field(default_factory=list)
+
+    # Sens inverse : stat (max > 0) -> lignes détentrices, triées (sert au refresh incrémental)
+    holders: Dict[StatKey, List[int]] = field(default_factory=dict)
+
+
+@dataclass
+class DerivedStats:
+    # Tout ce qui est dérivé d'un snapshot, calculé ensemble en une seule passe (voir snapshot_builder)
+    version: int
+
+    aggregate: AggMap
+    maxima: MaxMap
+    records: RecordIndex
+
+    # section -> total par joueur (colonne creuse) et total global de la section
+    section_totals: Dict[str, StatColumn]
+    section_sums: Dict[str, int]
+
+    # Catalogue trié : section -> stat_keys
+    catalogue: Dict[str, List[str]]
+
+    def stat_total(self, section: str, stat_key: str) -> int:
+        return (self.aggregate.get(section) or {}).get(stat_key, 0)
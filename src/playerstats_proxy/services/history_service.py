@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from playerstats_proxy.services.history_store import WindowEntry
+
+
+def _as_datetime(timestamp: Optional[float]) -> Optional[datetime]:
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, timezone.utc)
+
+
+def build_window_top_payload(
+    entries: List[WindowEntry],
+    section: str,
+    stat_key: Optional[str],
+    window: str,
+    since: Optional[float],
+    until: Optional[float],
+    limit: int,
+) -> dict:
+    # Classement de progression sur la fenêtre, déjà trié par l'historique (schéma WindowTopResponse)
+    results: list[dict] = []
+    for delta, uuid, name in entries[: max(1, limit)]:
+        results.append(
+            {
+                "uuid": uuid,
+                "name": name,
+                "value": delta,
+                "section": section,
+                "stat_key": stat_key,
+            }
+        )
+
+    return {
+        "section": section,
+        "stat_key": stat_key,
+        "window": window,
+        "since": _as_datetime(since),
+        "until": _as_datetime(until),
+        "limit": max(1, limit),
+        "players": len(entries),
+        "results": results,
+    }
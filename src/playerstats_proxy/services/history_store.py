@@ -0,0 +1,328 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+from playerstats_proxy.services.snapshot_store import Snapshot
+from playerstats_proxy.services.stats_table import StatColumn, StatsTable
+from playerstats_proxy.utils.lru_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Type de série : stat d'une section, ou total de la section (stat_key vide)
+KIND_STAT = "stat"
+KIND_SECTION = "section"
+
+StatId = Tuple[str, str, str]  # (kind, section, stat_key)
+WindowEntry = Tuple[int, str, str]  # (delta, uuid, nom)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    taken_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_snapshots_taken_at ON snapshots (taken_at);
+
+CREATE TABLE IF NOT EXISTS players (
+    id INTEGER PRIMARY KEY,
+    uuid TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS stats (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    section TEXT NOT NULL,
+    stat_key TEXT NOT NULL,
+    UNIQUE (kind, section, stat_key)
+);
+
+-- Une ligne seulement quand la valeur d'un joueur change : la valeur à une date donnée est celle
+-- de la dernière ligne du joueur à ou avant ce snapshot
+CREATE TABLE IF NOT EXISTS stat_values (
+    stat_id INTEGER NOT NULL,
+    player_id INTEGER NOT NULL,
+    snapshot_id INTEGER NOT NULL,
+    value INTEGER NOT NULL,
+    PRIMARY KEY (stat_id, player_id, snapshot_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_stat_values_window ON stat_values (stat_id, snapshot_id);
+CREATE INDEX IF NOT EXISTS ix_stat_values_snapshot ON stat_values (snapshot_id);
+"""
+
+# Deltas d'une série sur une fenêtre : joueurs ayant changé après le snapshot de base,
+# valeur finale (dernière ligne) moins valeur de base (dernière ligne à ou avant la base, 0 si aucune)
+_WINDOW_QUERY = """
+WITH changed AS (
+    SELECT player_id, MAX(snapshot_id) AS last_id
+    FROM stat_values
+    WHERE stat_id = :stat AND snapshot_id > :base AND snapshot_id <= :end
+    GROUP BY player_id
+)
+SELECT p.uuid, p.name, e.value - COALESCE((
+    SELECT b.value FROM stat_values b
+    WHERE b.stat_id = :stat AND b.player_id = c.player_id AND b.snapshot_id <= :base
+    ORDER BY b.snapshot_id DESC LIMIT 1
+), 0) AS delta
+FROM changed c
+JOIN stat_values e ON e.stat_id = :stat AND e.player_id = c.player_id AND e.snapshot_id = c.last_id
+JOIN players p ON p.id = c.player_id
+"""
+
+
+class HistoryStore:
+    # Historique local (SQLite) : un snapshot compact toutes les interval_seconds (seules les valeurs
+    # modifiées sont écrites), sous-échantillonné au-delà de downsample_after_seconds, purgé après
+    # retention_seconds. Sert les classements de progression sur une fenêtre (dernière heure, jour...).
+    def __init__(
+        self,
+        path: str,
+        interval_seconds: float,
+        retention_seconds: float,
+        downsample_after_seconds: float,
+        downsample_interval_seconds: float,
+        cache_entries: int = 256,
+    ) -> None:
+        self._path = path
+        self._interval_seconds = max(0.0, float(interval_seconds))
+        self._retention_seconds = max(0.0, float(retention_seconds))
+        self._downsample_after_seconds = max(0.0, float(downsample_after_seconds))
+        self._downsample_interval_seconds = max(0.0, float(downsample_interval_seconds))
+
+        # Écriture et lecture sur deux connexions (WAL : les lectures ne bloquent pas l'écriture)
+        self._writer: Optional[sqlite3.Connection] = None
+        self._reader: Optional[sqlite3.Connection] = None
+        self._write_lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        self._record_lock = asyncio.Lock()
+        self._background: Set[asyncio.Task] = set()
+
+        # État côté écriture : ids connus et dernières valeurs écrites (base des différences)
+        self._player_ids: Dict[str, int] = {}
+        self._player_names: Dict[int, str] = {}
+        self._stat_ids: Dict[StatId, int] = {}
+        self._last_values: Dict[int, Dict[int, int]] = {}
+        self._last_snapshot_id: Optional[int] = None
+        self._last_taken_at = 0.0
+
+        # Classements par (série, snapshot de base, snapshot de fin) : inchangés tant qu'aucun snapshot n'est ajouté
+        self.window_cache: LRUCache[List[WindowEntry]] = LRUCache(max_entries=cache_entries)
+
+    def open(self) -> None:
+        self._writer = self._connect()
+        self._writer.executescript(_SCHEMA)
+        self._reader = self._connect()
+        row = self._writer.execute("SELECT id, taken_at FROM snapshots ORDER BY id DESC LIMIT 1").fetchone()
+        if row is not None:
+            self._last_taken_at = row[1]
+
+    def close(self) -> None:
+        # Attend la fin d'un enregistrement ou d'une lecture en cours dans un thread
+        with self._write_lock, self._read_lock:
+            for connection in (self._writer, self._reader):
+                if connection is not None:
+                    connection.close()
+            self._writer = self._reader = None
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self._path, check_same_thread=False, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA busy_timeout=5000")
+        return connection
+
+    # --- Écriture -------------------------------------------------------------------------------------
+
+    def schedule(self, snapshot: Snapshot) -> None:
+        # Listener du SnapshotStore : au plus un snapshot d'historique par intervalle
+        if snapshot.fetched_at - self._last_taken_at < self._interval_seconds:
+            return
+        task = asyncio.ensure_future(self.record(snapshot))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def record(self, snapshot: Snapshot) -> None:
+        async with self._record_lock:
+            if snapshot.fetched_at - self._last_taken_at < self._interval_seconds:
+                return
+            try:
+                await asyncio.to_thread(self._record, snapshot)
+            except sqlite3.Error:
+                logger.warning("Could not record history snapshot in %s", self._path, exc_info=True)
+
+    def _record(self, snapshot: Snapshot) -> None:
+        assert self._writer is not None
+        with self._write_lock:
+            db = self._writer
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                self._sync_state(db)
+                snapshot_id = db.execute("INSERT INTO snapshots (taken_at) VALUES (?)", (snapshot.fetched_at,)).lastrowid
+                player_of_row = self._player_rows(db, snapshot.stats)
+
+                rows: List[Tuple[int, int, int, int]] = []
+                for (section, stat_key), column in snapshot.stats.columns():
+                    self._diff(db, (KIND_STAT, section, stat_key), column, player_of_row, snapshot_id, rows)
+                for section, column in snapshot.derived.section_totals.items():
+                    self._diff(db, (KIND_SECTION, section, ""), column, player_of_row, snapshot_id, rows)
+                db.executemany("INSERT INTO stat_values (stat_id, player_id, snapshot_id, value) VALUES (?, ?, ?, ?)", rows)
+
+                self._compact(db, snapshot.fetched_at)
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                # État mémoire peut-être en avance sur la base : rechargé au prochain enregistrement
+                self._last_snapshot_id = None
+                raise
+
+            self._last_snapshot_id = snapshot_id
+            self._last_taken_at = snapshot.fetched_at
+            logger.info("Recorded history snapshot %d (%d changed values)", snapshot_id, len(rows))
+
+    def _sync_state(self, db: sqlite3.Connection) -> None:
+        # Dernières valeurs écrites : gardées en mémoire, rechargées si un autre processus (ancien leader
+        # multi-workers, redémarrage) a écrit entre-temps
+        row = db.execute("SELECT MAX(id) FROM snapshots").fetchone()
+        if row[0] == self._last_snapshot_id and self._last_snapshot_id is not None:
+            return
+
+        self._player_ids = {uuid: player_id for player_id, uuid in db.execute("SELECT id, uuid FROM players")}
+        self._player_names = dict(db.execute("SELECT id, name FROM players"))
+        self._stat_ids = {
+            (kind, section, stat_key): stat_id
+            for stat_id, kind, section, stat_key in db.execute("SELECT id, kind, section, stat_key FROM stats")
+        }
+        self._last_values = {}
+        latest = db.execute(
+            "SELECT v.stat_id, v.player_id, v.value FROM stat_values v "
+            "JOIN (SELECT stat_id, player_id, MAX(snapshot_id) AS last_id FROM stat_values GROUP BY stat_id, player_id) l "
+            "ON v.stat_id = l.stat_id AND v.player_id = l.player_id AND v.snapshot_id = l.last_id"
+        )
+        for stat_id, player_id, value in latest:
+            self._last_values.setdefault(stat_id, {})[player_id] = value
+        self._last_snapshot_id = row[0]
+
+    def _player_rows(self, db: sqlite3.Connection, table: StatsTable) -> List[int]:
+        # Ligne de la table -> id joueur (0 = ignorée : sans uuid/nom, ou uuid en double)
+        player_of_row = [0] * table.player_count
+        seen: Set[int] = set()
+        for row in table.listed_rows():
+            uuid = table.uuids[row].strip().lower()
+            name = table.names[row]
+            player_id = self._player_ids.get(uuid)
+            if player_id is None:
+                player_id = db.execute("INSERT INTO players (uuid, name) VALUES (?, ?)", (uuid, name)).lastrowid
+                self._player_ids[uuid] = player_id
+                self._player_names[player_id] = name
+            elif self._player_names.get(player_id) != name:
+                db.execute("UPDATE players SET name = ? WHERE id = ?", (name, player_id))
+                self._player_names[player_id] = name
+            if player_id in seen:
+                continue
+            seen.add(player_id)
+            player_of_row[row] = player_id
+        return player_of_row
+
+    def _diff(
+        self,
+        db: sqlite3.Connection,
+        stat: StatId,
+        column: StatColumn,
+        player_of_row: List[int],
+        snapshot_id: int,
+        out: List[Tuple[int, int, int, int]],
+    ) -> None:
+        # Valeurs différentes de la dernière écrite pour ce joueur. Un joueur absent du snapshot garde
+        # sa dernière valeur (pas de remise à 0 : les deltas ne comptent que la progression).
+        stat_id = self._stat_ids.get(stat)
+        if stat_id is None:
+            stat_id = db.execute("INSERT INTO stats (kind, section, stat_key) VALUES (?, ?, ?)", stat).lastrowid
+            self._stat_ids[stat] = stat_id
+        last = self._last_values.setdefault(stat_id, {})
+        for row, value in column.items():
+            player_id = player_of_row[row]
+            if player_id and last.get(player_id) != value:
+                last[player_id] = value
+                out.append((stat_id, player_id, snapshot_id, value))
+
+    def _compact(self, db: sqlite3.Connection, now: float) -> None:
+        # Rétention puis sous-échantillonnage : un snapshot retiré est fusionné dans le suivant, qui
+        # reprend ses valeurs non remplacées (la valeur à chaque date restante est inchangée)
+        snapshots = db.execute("SELECT id, taken_at FROM snapshots ORDER BY id").fetchall()
+        removed: Set[int] = set()
+
+        if self._retention_seconds:
+            cutoff = now - self._retention_seconds
+            for (snapshot_id, taken_at), (next_id, _) in zip(snapshots, snapshots[1:]):
+                if taken_at >= cutoff:
+                    break
+                self._merge(db, snapshot_id, next_id)
+                removed.add(snapshot_id)
+
+        if self._downsample_after_seconds and self._downsample_interval_seconds:
+            # Au-delà de downsample_after_seconds : un seul snapshot (le dernier) par tranche d'intervalle
+            horizon = now - self._downsample_after_seconds
+            step = self._downsample_interval_seconds
+            remaining = [snap for snap in snapshots if snap[0] not in removed]
+            for (snapshot_id, taken_at), (next_id, next_taken_at) in zip(remaining, remaining[1:]):
+                if next_taken_at >= horizon:
+                    break
+                if int(taken_at // step) == int(next_taken_at // step):
+                    self._merge(db, snapshot_id, next_id)
+
+    def _merge(self, db: sqlite3.Connection, snapshot_id: int, into_id: int) -> None:
+        db.execute(
+            "DELETE FROM stat_values WHERE snapshot_id = :old AND EXISTS ("
+            "SELECT 1 FROM stat_values n WHERE n.stat_id = stat_values.stat_id "
+            "AND n.player_id = stat_values.player_id AND n.snapshot_id = :new)",
+            {"old": snapshot_id, "new": into_id},
+        )
+        db.execute("UPDATE stat_values SET snapshot_id = ? WHERE snapshot_id = ?", (into_id, snapshot_id))
+        db.execute("DELETE FROM snapshots WHERE id = ?", (snapshot_id,))
+
+    # --- Lecture --------------------------------------------------------------------------------------
+
+    async def window_top(self, stat: StatId, window_seconds: float) -> Tuple[Optional[float], Optional[float], List[WindowEntry]]:
+        # (date du snapshot de base, date du dernier snapshot, classement des deltas > 0 : delta desc, nom)
+        bounds = await asyncio.to_thread(self._bounds, stat, window_seconds)
+        if bounds is None:
+            return None, None, []
+        stat_id, base_id, base_at, end_id, end_at = bounds
+
+        key = (stat_id, base_id, end_id)
+        entries = self.window_cache.get(key)
+        if entries is None:
+            entries = await asyncio.to_thread(self._window, stat_id, base_id, end_id)
+            self.window_cache.set(key, entries)
+        return base_at, end_at, entries
+
+    def _bounds(self, stat: StatId, window_seconds: float) -> Optional[Tuple[Optional[int], int, float, int, float]]:
+        assert self._reader is not None
+        with self._read_lock:
+            db = self._reader
+            end = db.execute("SELECT id, taken_at FROM snapshots ORDER BY id DESC LIMIT 1").fetchone()
+            if end is None:
+                return None
+            # Fenêtre comptée depuis le dernier snapshot (date des données) ; base : dernier snapshot
+            # au début de la fenêtre, ou le plus ancien si l'historique est plus court
+            base = db.execute(
+                "SELECT id, taken_at FROM snapshots WHERE taken_at <= ? ORDER BY taken_at DESC LIMIT 1",
+                (end[1] - window_seconds,),
+            ).fetchone()
+            if base is None:
+                base = db.execute("SELECT id, taken_at FROM snapshots ORDER BY id LIMIT 1").fetchone()
+            row = db.execute("SELECT id FROM stats WHERE kind = ? AND section = ? AND stat_key = ?", stat).fetchone()
+        return (row[0] if row is not None else None), base[0], base[1], end[0], end[1]
+
+    def _window(self, stat_id: Optional[int], base_id: int, end_id: int) -> List[WindowEntry]:
+        if stat_id is None or base_id >= end_id:
+            return []
+        assert self._reader is not None
+        with self._read_lock:
+            rows = self._reader.execute(_WINDOW_QUERY, {"stat": stat_id, "base": base_id, "end": end_id}).fetchall()
+        entries = [(delta, uuid, name) for uuid, name, delta in rows if delta > 0]
+        entries.sort(key=lambda entry: (-entry[0], entry[2].lower()))
+        return entries
@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import base64
+import json
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import FrozenSet, Iterable, Optional, Sequence, Tuple
+
+from playerstats_proxy.services.derived_stats import DerivedStats
+from playerstats_proxy.services.stats_table import StatsTable
+from playerstats_proxy.utils.metrics import REGISTRY
+
+_BUILD_SECONDS = REGISTRY.histogram(
+    "psp_leaderboard_build_seconds",
+    "Time to sort a leaderboard (full build on first request, or patch during a delta refresh).",
+    ("mode",),
+)
+
+Change = Tuple[int, Optional[int], Optional[int]]  # (ligne, ancienne valeur, nouvelle valeur), None = absente
+PageKey = Tuple[int, str, int]  # (valeur, nom en minuscules, ligne) du dernier joueur d'une page
+
+
+def _rank_key(rows: Sequence[int], values: Sequence[int], names: Sequence[str]):
+    # Clé de tri d'un classement (valeur desc, nom, puis ordre upstream), par indice, pour bisect
+    def rank_key(i: int) -> Tuple[int, str, int]:
+        return -values[i], names[rows[i]].lower(), rows[i]
+
+    return rank_key
+
+
+class Leaderboard:
+    # Classement figé pour un snapshot : joueurs listés avec valeur > 0, triés (valeur desc, nom)
+    __slots__ = ("rows", "values", "total", "_ranked")
+
+    def __init__(self, rows: array, values: array, total: int) -> None:
+        self.rows = rows
+        self.values = values
+
+        # Total de tous les joueurs (y compris ceux absents du classement : sans nom/uuid)
+        self.total = total
+
+        # Ensemble des lignes classées, construit seulement si on pagine dans les joueurs à 0
+        self._ranked: Optional[FrozenSet[int]] = None
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @classmethod
+    def build(cls, table: StatsTable, pairs: Iterable[Tuple[int, int]]) -> "Leaderboard":
+        # pairs = (ligne, valeur) dans l'ordre de la table : le tri stable garde l'ordre upstream à égalité
+        start = time.perf_counter()
+        names = table.names
+        total = 0
+        ranked: list[Tuple[int, int]] = []
+        for row, value in pairs:
+            total += value
+            if value > 0 and table.is_listed(row):
+                ranked.append((row, value))
+
+        ranked.sort(key=lambda rv: (-rv[1], names[rv[0]].lower()))
+        board = cls(array("I", (row for row, _ in ranked)), array("q", (value for _, value in ranked)), total)
+        _BUILD_SECONDS.observe(time.perf_counter() - start, "build")
+        return board
+
+    def patched(self, table: StatsTable, changes: Iterable[Change], total: int) -> "Leaderboard":
+        # Copie du classement où seules les lignes modifiées sont retirées puis réinsérées à leur rang
+        # (même ordre que build : valeur desc, nom, puis ordre upstream)
+        start = time.perf_counter()
+        rows = self.rows[:]
+        values = self.values[:]
+        names = table.names
+        rank_key = _rank_key(rows, values, names)
+
+        for row, old, new in changes:
+            if not table.is_listed(row):
+                continue
+            name = names[row].lower()
+            if old:
+                i = bisect_left(range(len(rows)), (-old, name, row), key=rank_key)
+                del rows[i]
+                del values[i]
+            if new:
+                i = bisect_left(range(len(rows)), (-new, name, row), key=rank_key)
+                rows.insert(i, row)
+                values.insert(i, new)
+
+        _BUILD_SECONDS.observe(time.perf_counter() - start, "patch")
+        return Leaderboard(rows, values, total)
+
+    def position(self, table: StatsTable, row: int, value: int) -> Optional[int]:
+        # Indice (0 = premier) du joueur dans le classement, en O(log N) ; None s'il n'y figure pas (valeur 0...)
+        if value <= 0 or not table.is_listed(row):
+            return None
+        i = bisect_left(
+            range(len(self.rows)),
+            (-value, table.names[row].lower(), row),
+            key=_rank_key(self.rows, self.values, table.names),
+        )
+        if i < len(self.rows) and self.rows[i] == row:
+            return i
+        return None
+
+    def page(self, table: StatsTable, after: Optional[PageKey], limit: int, include_zeros: bool) -> list[Tuple[int, int]]:
+        # Page de `limit` (ligne, valeur) qui suit `after` : reprise par bisect dans le classement déjà trié,
+        # sans décalage si le snapshot a changé entre deux pages
+        if after is None:
+            return self.head(table, limit, include_zeros)
+
+        limit = max(1, limit)
+        value, name, row = after
+        out: list[Tuple[int, int]] = []
+        zero_start = 0
+        if value > 0:
+            start = bisect_right(
+                range(len(self.rows)),
+                (-value, name, row),
+                key=_rank_key(self.rows, self.values, table.names),
+            )
+            out = list(zip(self.rows[start : start + limit], self.values[start : start + limit]))
+            if not include_zeros or len(out) >= limit:
+                return out
+        elif include_zeros:
+            # Déjà dans les joueurs à 0 (triés par nom, comme dans head)
+            name_order = table.name_order
+            names = table.names
+            zero_start = bisect_right(
+                range(len(name_order)),
+                (name, row),
+                key=lambda i: (names[name_order[i]].lower(), name_order[i]),
+            )
+        else:
+            return out
+
+        if self._ranked is None:
+            self._ranked = frozenset(self.rows)
+        name_order = table.name_order
+        for i in range(zero_start, len(name_order)):
+            zero_row = name_order[i]
+            if zero_row in self._ranked:
+                continue
+            out.append((zero_row, 0))
+            if len(out) >= limit:
+                break
+        return out
+
+    def head(self, table: StatsTable, limit: int, include_zeros: bool) -> list[Tuple[int, int]]:
+        # Les `limit` premiers (ligne, valeur), complétés par les joueurs à 0 (triés par nom) si demandé
+        limit = max(1, limit)
+        out = list(zip(self.rows[:limit], self.values[:limit]))
+        if not include_zeros or len(out) >= limit:
+            return out
+
+        # Ici le classement entier tient dans `limit` : l'ensemble des lignes non nulles reste petit
+        ranked = set(self.rows)
+        for row in table.name_order:
+            if row in ranked:
+                continue
+            out.append((row, 0))
+            if len(out) >= limit:
+                break
+        return out
+
+
+def encode_cursor(table: StatsTable, row: int, value: int) -> str:
+    # Curseur opaque de pagination : position du dernier joueur renvoyé (uuid plutôt que ligne,
+    # pour rester valable après un refresh du snapshot)
+    raw = json.dumps([value, table.names[row].lower(), table.uuids[row]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(table: StatsTable, cursor: str) -> PageKey:
+    # ValueError si le curseur est invalide
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, name, uuid = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(value, int) or not isinstance(name, str) or not isinstance(uuid, str):
+        raise ValueError("Invalid cursor")
+
+    # Joueur disparu depuis : on reprend avant tous ceux de même valeur et même nom
+    row = table.find_row(uuid)
+    return value, name, row if row is not None else -1
+
+
+_EMPTY = Leaderboard(array("I"), array("q"), 0)
+
+
+def stat_leaderboard(table: StatsTable, section: str, stat_key: str) -> Leaderboard:
+    # Matérialisé à la première demande, puis réutilisé pendant toute la vie du snapshot
+    key = ("stat", section, stat_key)
+    board = table.leaderboards.get(key)
+    if board is not None:
+        return board
+
+    column = table.column(section, stat_key)
+    if column is None:
+        # Pas de mise en cache pour une clé inconnue (évite de grossir avec des clés arbitraires)
+        return _EMPTY
+
+    board = table.leaderboards[key] = Leaderboard.build(table, column.items())
+    return board
+
+
+def section_leaderboard(table: StatsTable, derived: DerivedStats, section: str) -> Leaderboard:
+    # Classement sur le total de section par joueur : trié seulement pour les sections réellement demandées
+    key = ("section", section)
+    board = table.leaderboards.get(key)
+    if board is not None:
+        return board
+
+    section_column = derived.section_totals.get(section)
+    if section_column is None:
+        return _EMPTY
+
+    board = table.leaderboards[key] = Leaderboard.build(table, section_column.items())
+    return board
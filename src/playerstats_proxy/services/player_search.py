@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import base64
+import json
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
+
+from playerstats_proxy.services.stats_table import StatsTable
+
+
+SearchKey = Tuple[str, int]  # (clé de tri : nom ou uuid en minuscules, ligne) du dernier joueur d'une page
+
+# Plus grand caractère possible : borne haute des clés qui commencent par un préfixe donné
+_MAX_CHAR = chr(0x10FFFF)
+
+
+def _prefix_range(keys: Sequence[str], prefix: str) -> Tuple[int, int]:
+    if not prefix:
+        return 0, len(keys)
+    return bisect_left(keys, prefix), bisect_left(keys, prefix + _MAX_CHAR)
+
+
+def encode_search_cursor(key: str, uuid: str) -> str:
+    # Curseur opaque : clé de tri et uuid du dernier joueur renvoyé (valable après un refresh du snapshot)
+    raw = json.dumps([key, uuid], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).rstrip(b"=").decode("ascii")
+
+
+def decode_search_cursor(table: StatsTable, cursor: str) -> SearchKey:
+    # ValueError si le curseur est invalide
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key, uuid = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(key, str) or not isinstance(uuid, str):
+        raise ValueError("Invalid cursor")
+
+    # Joueur disparu depuis : on reprend avant tous ceux de même clé
+    row = table.find_row(uuid)
+    return key, row if row is not None else -1
+
+
+def _find_substring(table: StatsTable, query: str, start: int, count: int) -> list[int]:
+    # Indices (dans name_order) des `count` premiers noms contenant query, à partir de start
+    if "\0" in query:
+        return []
+    blob, starts = table.name_blob
+    found: list[int] = []
+    if start >= len(starts):
+        return found
+    pos = blob.find(query, starts[start])
+    while pos != -1 and len(found) < count:
+        i = bisect_right(starts, pos) - 1
+        found.append(i)
+        if i + 1 >= len(starts):
+            break
+        pos = blob.find(query, starts[i + 1])
+    return found
+
+
+def _filter_names(
+    table: StatsTable,
+    order: Sequence[int],
+    lo: int,
+    hi: int,
+    query: str,
+    substring: bool,
+    count: int,
+) -> list[int]:
+    # Préfixe d'uuid + recherche sur le nom : parcours de la tranche d'uuid, filtrée sur le nom
+    names = table.names
+    found: list[int] = []
+    for i in range(lo, hi):
+        name = names[order[i]].lower()
+        if query in name if substring else name.startswith(query):
+            found.append(i)
+            if len(found) >= count:
+                break
+    return found
+
+
+def build_player_search_payload(
+    table: StatsTable,
+    query: str,
+    substring: bool,
+    uuid_prefix: str,
+    after: Optional[SearchKey],
+    limit: int,
+    updated_at: datetime,
+) -> dict:
+    # Recherche dans les index triés du snapshot (schéma BasicPlayersResponse) :
+    # - préfixe de nom ou d'uuid : bisect puis tranche de `limit` joueurs
+    # - sous-chaîne de nom : str.find sur le bloc des noms, arrêté dès que la page est pleine
+    # query et uuid_prefix sont déjà normalisés (minuscules)
+    if uuid_prefix:
+        order, keys = table.uuid_order, table.uuid_keys
+        lo, hi = _prefix_range(keys, uuid_prefix)
+    else:
+        order, keys = table.name_order, table.name_keys
+        lo, hi = _prefix_range(keys, "" if substring else query)
+
+    if after is not None:
+        lo = max(lo, bisect_right(range(len(order)), after, key=lambda i: (keys[i], order[i])))
+
+    # Un joueur de plus que la page : next_cursor seulement s'il reste vraiment des résultats
+    if substring and query and not uuid_prefix:
+        matches = _find_substring(table, query, lo, limit + 1)
+    elif query and uuid_prefix:
+        matches = _filter_names(table, order, lo, hi, query, substring, limit + 1)
+    else:
+        matches = list(range(lo, min(hi, lo + limit + 1)))
+
+    page = matches[:limit]
+    next_cursor = None
+    if len(matches) > limit:
+        last = page[-1]
+        next_cursor = encode_search_cursor(keys[last], table.uuids[order[last]])
+
+    players = [{"uuid": table.uuids[order[i]], "name": table.names[order[i]]} for i in page]
+    return {
+        "count": len(players),
+        "updated_at": updated_at,
+        "players": players,
+        "next_cursor": next_cursor,
+    }
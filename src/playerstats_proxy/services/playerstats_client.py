@@ -1,7 +1,23 @@
 from __future__ import annotations
 
+import time
+from typing import AsyncIterator
+
 import httpx
 
+from playerstats_proxy.utils.json_stream import JsonArrayStreamParser
+from playerstats_proxy.utils.metrics import REGISTRY, SIZE_BUCKETS
+
+_PAYLOAD_BYTES = REGISTRY.histogram(
+    "psp_upstream_payload_bytes",
+    "Decoded size of the upstream players body, per fetch.",
+    buckets=SIZE_BUCKETS,
+)
+_DECODE_SECONDS = REGISTRY.histogram(
+    "psp_upstream_decode_seconds",
+    "Time spent decoding the upstream players JSON, per fetch (excludes network waits).",
+)
+
 
 class PlayerStatsClient:
     def __init__(self, http_client: httpx.AsyncClient, base_url: str, players_path: str) -> None:
@@ -9,19 +25,36 @@ class PlayerStatsClient:
         self._base_url = base_url.rstrip("/")
         self._players_path = players_path if players_path.startswith("/") else f"/{players_path}"
 
-    async def fetch_players(self) -> list[dict]:
-        # Récupère la liste complète des joueurs via /moss/players
+    async def stream_players(self, fingerprints: bool = False) -> AsyncIterator[list]:
+        # Récupère /moss/players en streaming : les joueurs sont rendus par lots, au fil des chunks reçus,
+        # sans garder le corps complet ni l'arbre JSON complet en mémoire.
+        # Avec fingerprints=True, chaque joueur est rendu en (empreinte du JSON brut, joueur).
         url = f"{self._base_url}{self._players_path}"
-        resp = await self._client.get(url)
-        resp.raise_for_status()
-        data = resp.json()
+        parser = JsonArrayStreamParser("players", fingerprints=fingerprints)
+        size = 0
+        decode_seconds = 0.0
 
-        # Vérifie que la réponse est bien un objet contenant la clé "players"
-        if not isinstance(data, dict):
-            raise ValueError("Upstream returned unexpected payload (expected object).")
+        async with self._client.stream("GET", url) as resp:
+            resp.raise_for_status()
+            async for chunk in resp.aiter_bytes():
+                size += len(chunk)
+                start = time.perf_counter()
+                players = parser.feed(chunk)
+                decode_seconds += time.perf_counter() - start
+                if players:
+                    yield players
 
-        players = data.get("players")
-        if not isinstance(players, list):
-            raise ValueError("Upstream returned unexpected payload (expected 'players' list).")
+        # Vérifie que la réponse est bien un objet contenant la liste "players" (ValueError sinon)
+        start = time.perf_counter()
+        players = parser.close()
+        _DECODE_SECONDS.observe(decode_seconds + time.perf_counter() - start)
+        _PAYLOAD_BYTES.observe(size)
+        if players:
+            yield players
 
+    async def fetch_players(self) -> list[dict]:
+        # Récupère la liste complète des joueurs via /moss/players
+        players: list[dict] = []
+        async for batch in self.stream_players():
+            players.extend(batch)
         return players
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from fnmatch import fnmatchcase
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from playerstats_proxy.utils.lru_cache import LRUCache
+
+
+# Réponse upstream jamais mise en cache si elle porte une de ces directives
+_NO_STORE_DIRECTIVES = {"no-store", "no-cache", "private"}
+
+
+@dataclass
+class ProxyCacheRule:
+    # Motif de chemin (fnmatch, ex. "/moss/player/*") et TTL par défaut si l'upstream n'en donne pas
+    pattern: str
+    ttl_seconds: float
+
+
+@dataclass
+class CachedResponse:
+    status_code: int
+    headers: Dict[str, str]
+    body: bytes
+    stored_at: float = field(default_factory=time.time)
+
+
+def parse_cache_rules(spec: str, default_ttl_seconds: float) -> List[ProxyCacheRule]:
+    # "motif[=ttl],motif[=ttl],..." ex. "/moss/player/*=30,/server/info"
+    rules: List[ProxyCacheRule] = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        pattern, _, ttl = item.partition("=")
+        rules.append(
+            ProxyCacheRule(
+                pattern=pattern.strip(),
+                ttl_seconds=float(ttl) if ttl.strip() else float(default_ttl_seconds),
+            )
+        )
+    return rules
+
+
+def _cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    directives: Dict[str, Optional[str]] = {}
+    for part in (value or "").split(","):
+        name, _, arg = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip().strip('"') or None
+    return directives
+
+
+def _seconds(value: Optional[str]) -> Optional[float]:
+    try:
+        return max(0.0, float(value))  # type: ignore[arg-type]
+    except (TypeError, ValueError):
+        return None
+
+
+class ProxyCache:
+    # Cache des réponses GET proxifiées, seulement pour les chemins listés (opt-in), dans la limite de
+    # l'upstream (Cache-Control) ; HEAD est servi depuis l'entrée GET correspondante
+    def __init__(self, rules: List[ProxyCacheRule], max_entries: int, max_bytes: int, max_body_bytes: int) -> None:
+        self._rules = rules
+        self.max_body_bytes = max(0, int(max_body_bytes))
+        self._entries: LRUCache[CachedResponse] = LRUCache(max_entries=max_entries, max_bytes=max_bytes)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._rules)
+
+    def rule_ttl(self, path: str) -> Optional[float]:
+        # TTL de la première règle qui correspond au chemin (None = chemin non mis en cache)
+        for rule in self._rules:
+            if fnmatchcase(path, rule.pattern):
+                return rule.ttl_seconds
+        return None
+
+    def key(self, path: str, query: str, headers: Mapping[str, str]) -> Tuple[str, str, str]:
+        # Le corps renvoyé dépend de l'encodage accepté par le client
+        return path, query, headers.get("accept-encoding", "")
+
+    def bypass(self, headers: Mapping[str, str]) -> bool:
+        # Requête authentifiée ou client qui exige une réponse fraîche : pas de cache
+        if "authorization" in headers or "cookie" in headers:
+            return True
+        directives = _cache_control(headers.get("cache-control"))
+        return "no-cache" in directives or "no-store" in directives
+
+    def response_ttl(self, status_code: int, headers: Mapping[str, str], rule_ttl: float) -> Optional[float]:
+        # Durée de mise en cache autorisée par l'upstream (None = non cacheable)
+        if status_code != 200 or "set-cookie" in headers:
+            return None
+        # Seule la variante par Accept-Encoding est gérée (incluse dans la clé)
+        vary = {name.strip().lower() for name in headers.get("vary", "").split(",") if name.strip()}
+        if vary - {"accept-encoding"}:
+            return None
+
+        directives = _cache_control(headers.get("cache-control"))
+        if _NO_STORE_DIRECTIVES & directives.keys():
+            return None
+
+        # s-maxage (caches partagés) prioritaire sur max-age ; sinon TTL de la règle
+        for name in ("s-maxage", "max-age"):
+            if name in directives:
+                ttl = _seconds(directives[name])
+                if ttl is not None:
+                    return ttl or None
+        return rule_ttl or None
+
+    @property
+    def entries(self) -> LRUCache[CachedResponse]:
+        return self._entries
+
+    def get(self, key: Tuple[str, str, str]) -> Optional[CachedResponse]:
+        return self._entries.get(key)
+
+    def store(self, key: Tuple[str, str, str], response: CachedResponse, ttl_seconds: float) -> None:
+        self._entries.set(key, response, size=len(response.body), ttl_seconds=ttl_seconds)
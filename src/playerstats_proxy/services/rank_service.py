@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from playerstats_proxy.services.derived_stats import DerivedStats
+from playerstats_proxy.services.leaderboard import Leaderboard, section_leaderboard, stat_leaderboard
+from playerstats_proxy.services.stats_table import StatsTable
+from playerstats_proxy.utils.percent import compute_percent
+
+
+def _rank_payload(
+    table: StatsTable,
+    board: Leaderboard,
+    row: int,
+    value: int,
+    section: str,
+    stat_key: Optional[str],
+    neighbours: int,
+    total_value: int,
+    updated_at: datetime,
+) -> dict:
+    # Rang trouvé par bisect dans le classement pré-trié du snapshot, puis fenêtre de voisins autour
+    position = board.position(table, row, value)
+
+    window: list[dict] = []
+    if position is not None:
+        start = max(0, position - neighbours)
+        end = min(len(board), position + neighbours + 1)
+        for i in range(start, end):
+            neighbour_row = board.rows[i]
+            window.append(
+                {
+                    "rank": i + 1,
+                    "uuid": table.uuids[neighbour_row],
+                    "name": table.names[neighbour_row],
+                    "value": board.values[i],
+                }
+            )
+
+    return {
+        "uuid": table.uuids[row],
+        "name": table.names[row],
+        "section": section,
+        "stat_key": stat_key,
+        "value": value,
+        "rank": position + 1 if position is not None else None,
+        "ranked_players": len(board),
+        "updated_at": updated_at,
+        "total_value": total_value,
+        "percent_of_total": compute_percent(value, total_value),
+        "neighbours": window,
+    }
+
+
+def build_rank_payload(
+    table: StatsTable,
+    derived: DerivedStats,
+    player_uuid: str,
+    section: str,
+    stat_key: str,
+    neighbours: int,
+    updated_at: datetime,
+) -> dict:
+    # Rang du joueur sur une stat (schéma RankResponse) ; KeyError si le joueur est inconnu
+    row = table.find_row(player_uuid)
+    if row is None:
+        raise KeyError(player_uuid)
+
+    column = table.column(section, stat_key)
+    value = column.get(row) if column is not None else None
+    return _rank_payload(
+        table=table,
+        board=stat_leaderboard(table, section, stat_key),
+        row=row,
+        value=max(0, value or 0),
+        section=section,
+        stat_key=stat_key,
+        neighbours=neighbours,
+        total_value=max(0, derived.stat_total(section, stat_key)),
+        updated_at=updated_at,
+    )
+
+
+def build_section_rank_payload(
+    table: StatsTable,
+    derived: DerivedStats,
+    player_uuid: str,
+    section: str,
+    neighbours: int,
+    updated_at: datetime,
+) -> dict:
+    # Rang du joueur sur le total de la section (schéma RankResponse) ; KeyError si le joueur est inconnu
+    row = table.find_row(player_uuid)
+    if row is None:
+        raise KeyError(player_uuid)
+
+    section_column = derived.section_totals.get(section)
+    value = section_column.get(row) if section_column is not None else None
+    return _rank_payload(
+        table=table,
+        board=section_leaderboard(table, derived, section),
+        row=row,
+        value=max(0, value or 0),
+        section=section,
+        stat_key=None,
+        neighbours=neighbours,
+        total_value=max(0, int(derived.section_sums.get(section, 0))),
+        updated_at=updated_at,
+    )
@@ -1,9 +1,14 @@
 from __future__ import annotations
 
+import time
+from typing import AsyncIterator, Iterable, Optional, Union
+
 import httpx
 from starlette.background import BackgroundTask
 from starlette.responses import Response, StreamingResponse
 
+from playerstats_proxy.services.proxy_cache import CachedResponse, ProxyCache
+
 
 _HOP_BY_HOP_HEADERS = {
     "connection",
@@ -17,7 +22,14 @@ _HOP_BY_HOP_HEADERS = {
 }
 
 
-def _filter_request_headers(headers: dict[str, str]) -> dict[str, str]:
+RequestBody = Union[bytes, AsyncIterator[bytes]]
+
+
+class RequestBodyTooLarge(Exception):
+    pass
+
+
+def _filter_request_headers(headers: dict[str, str], keep_content_length: bool = False) -> dict[str, str]:
     # Supprime les headers problématiques pour un proxy
     out: dict[str, str] = {}
     for k, v in headers.items():
@@ -26,12 +38,32 @@ def _filter_request_headers(headers: dict[str, str]) -> dict[str, str]:
             continue
         if lk == "host":
             continue
-        if lk == "content-length":
+        if lk == "content-length" and not keep_content_length:
             continue
         out[k] = v
     return out
 
 
+def _content_length(headers: dict[str, str]) -> Optional[int]:
+    for k, v in headers.items():
+        if k.lower() == "content-length":
+            try:
+                return max(0, int(v))
+            except ValueError:
+                return None
+    return None
+
+
+async def _limited(body: AsyncIterator[bytes], max_bytes: int) -> AsyncIterator[bytes]:
+    # Corps sans Content-Length (chunked) : on coupe dès que la limite est dépassée
+    size = 0
+    async for chunk in body:
+        size += len(chunk)
+        if size > max_bytes:
+            raise RequestBodyTooLarge()
+        yield chunk
+
+
 def _filter_response_headers(headers: httpx.Headers) -> dict[str, str]:
     # Supprime les headers hop-by-hop dans la réponse
     out: dict[str, str] = {}
@@ -45,29 +77,116 @@ def _filter_response_headers(headers: httpx.Headers) -> dict[str, str]:
     return out
 
 
+async def _chain(head: Iterable[bytes], tail: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    for chunk in head:
+        yield chunk
+    async for chunk in tail:
+        yield chunk
+
+
+def _cached_response(cached: CachedResponse, hit: bool) -> Response:
+    headers = dict(cached.headers)
+    headers["X-Cache"] = "HIT" if hit else "MISS"
+    if hit:
+        headers["Age"] = str(int(time.time() - cached.stored_at))
+    return Response(content=cached.body, status_code=cached.status_code, headers=headers)
+
+
 class ReverseProxy:
-    def __init__(self, http_client: httpx.AsyncClient, base_url: str) -> None:
+    def __init__(
+        self,
+        http_client: httpx.AsyncClient,
+        base_url: str,
+        cache: Optional[ProxyCache] = None,
+        max_body_bytes: int = 0,
+    ) -> None:
         self._client = http_client
         self._base_url = base_url.rstrip("/")
 
-    async def forward(self, method: str, path: str, query: str, headers: dict[str, str], body: bytes) -> Response:
+        # Taille max des corps de requête relayés (0 = illimité)
+        self._max_body_bytes = max(0, int(max_body_bytes))
+
+        # Cache opt-in des GET/HEAD, par motif de chemin (None ou sans règle = tout est relayé tel quel)
+        self._cache = cache if cache is not None and cache.enabled else None
+
+    def check_body_size(self, headers: dict[str, str]) -> None:
+        # Rejet immédiat, avant tout contact avec l'upstream, si le Content-Length annoncé dépasse la limite
+        content_length = _content_length(headers)
+        if self._max_body_bytes and content_length is not None and content_length > self._max_body_bytes:
+            raise RequestBodyTooLarge()
+
+    async def forward(self, method: str, path: str, query: str, headers: dict[str, str], body: RequestBody) -> Response:
+        # body : octets, ou flux du corps entrant relayé au fil de l'eau vers l'upstream
+        self.check_body_size(headers)
+
+        rule_ttl = None
+        if self._cache is not None and method in ("GET", "HEAD") and not self._cache.bypass(headers):
+            rule_ttl = self._cache.rule_ttl(path)
+        if rule_ttl is None:
+            return self._stream(await self._send(method, path, query, headers, body))
+
+        key = self._cache.key(path, query, headers)
+        cached = self._cache.get(key)
+        if cached is not None:
+            # HEAD : mêmes headers que le GET en cache (le serveur n'envoie pas le corps)
+            return _cached_response(cached, hit=True)
+
+        upstream_resp = await self._send(method, path, query, headers, body)
+        ttl = self._cache.response_ttl(upstream_resp.status_code, upstream_resp.headers, rule_ttl)
+        if method == "HEAD" or ttl is None:
+            return self._stream(upstream_resp)
+
+        # Corps lu en mémoire pour le cache, sauf s'il dépasse la taille max : on repasse alors en streaming
+        chunks: list[bytes] = []
+        size = 0
+        body_iter = upstream_resp.aiter_raw()
+        try:
+            async for chunk in body_iter:
+                chunks.append(chunk)
+                size += len(chunk)
+                if size > self._cache.max_body_bytes:
+                    return self._stream(upstream_resp, _chain(chunks, body_iter))
+        finally:
+            if size <= self._cache.max_body_bytes:
+                await upstream_resp.aclose()
+
+        cached = CachedResponse(
+            status_code=upstream_resp.status_code,
+            headers=_filter_response_headers(upstream_resp.headers),
+            body=b"".join(chunks),
+        )
+        self._cache.store(key, cached, ttl)
+        return _cached_response(cached, hit=False)
+
+    async def _send(self, method: str, path: str, query: str, headers: dict[str, str], body: RequestBody) -> httpx.Response:
         # Construit l'URL cible
         target_url = f"{self._base_url}{path}"
         if query:
             target_url = f"{target_url}?{query}"
 
-        req_headers = _filter_request_headers(headers)
+        # Corps en flux : le Content-Length du client est conservé (sinon httpx passe en chunked)
+        streamed = not isinstance(body, bytes)
+        req_headers = _filter_request_headers(headers, keep_content_length=streamed)
+
+        # Corps relayé brut (non décodé) : sans Accept-Encoding du client, httpx ajouterait le sien
+        # (gzip, deflate) et le client recevrait un corps compressé qu'il n'a pas demandé
+        if not any(k.lower() == "accept-encoding" for k in req_headers):
+            req_headers["accept-encoding"] = "identity"
+        if streamed and self._max_body_bytes and _content_length(headers) is None:
+            body = _limited(body, self._max_body_bytes)  # type: ignore[arg-type]
 
         # Envoi en streaming pour éviter de charger de gros JSON en RAM
         req = self._client.build_request(method=method, url=target_url, headers=req_headers, content=body)
-        upstream_resp = await self._client.send(req, stream=True)
+        return await self._client.send(req, stream=True)
 
+    def _stream(self, upstream_resp: httpx.Response, content: Optional[AsyncIterator[bytes]] = None) -> Response:
         resp_headers = _filter_response_headers(upstream_resp.headers)
         media_type = upstream_resp.headers.get("content-type")
 
+        # Octets bruts : un corps compressé par l'upstream est relayé tel quel, avec son Content-Encoding.
         # On ferme la réponse upstream à la fin du streaming
         return StreamingResponse(
-            upstream_resp.aiter_bytes(),
+            content if content is not None else upstream_resp.aiter_raw(),
             status_code=upstream_resp.status_code,
             headers=resp_headers,
             media_type=media_type,
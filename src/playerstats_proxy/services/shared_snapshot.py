@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from typing import Optional, Tuple, Union
+
+from playerstats_proxy.services.snapshot_codec import read_snapshot
+from playerstats_proxy.services.snapshot_files import SnapshotFileWriter
+from playerstats_proxy.services.snapshot_store import Snapshot, SnapshotStore
+from playerstats_proxy.utils.single_flight import SingleFlight
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - verrou POSIX uniquement
+    fcntl = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+_NOT_AVAILABLE = "Shared snapshot is not available yet."
+
+# Intervalle entre deux vérifications pendant l'attente d'un premier snapshot
+_WAIT_STEP_SECONDS = 0.1
+
+
+class SharedSnapshotStore:
+    # Mode multi-workers : le worker qui obtient le verrou (leader) interroge l'upstream et publie chaque
+    # snapshot dans un fichier partagé ; les autres le mappent en lecture seule et suivent ses versions.
+    # Si le leader disparaît, le verrou est libéré par l'OS et un autre worker prend le relais.
+    def __init__(
+        self,
+        store: SnapshotStore,
+        directory: str,
+        ttl_seconds: int,
+        poll_seconds: float,
+        wait_seconds: float,
+    ) -> None:
+        if fcntl is None:
+            raise RuntimeError("Shared snapshot mode requires a POSIX system (fcntl).")
+
+        self._store = store
+        self._path = os.path.join(directory, "snapshot.bin")
+        self._lock_path = os.path.join(directory, "leader.lock")
+        self._ttl_seconds = max(0, int(ttl_seconds))
+        self._poll_seconds = max(0.0, float(poll_seconds))
+        self._wait_seconds = max(0.0, float(wait_seconds))
+
+        self._lock_fd: Optional[int] = None
+        self._publisher = SnapshotFileWriter(self._path)
+
+        # Côté follower : dernier snapshot mappé et identité du fichier correspondant
+        self._current: Optional[Snapshot] = None
+        self._file_id: Optional[Tuple[int, int]] = None
+        self._checked_at = 0.0
+        self._flights: SingleFlight = SingleFlight()
+
+    @property
+    def is_leader(self) -> bool:
+        return self._lock_fd is not None
+
+    async def get_snapshot(self) -> Snapshot:
+        if self.is_leader:
+            return await self._store.get_snapshot()
+
+        if time.monotonic() - self._checked_at >= self._poll_seconds:
+            await self._poll()
+            if self.is_leader:
+                return await self._store.get_snapshot()
+
+        if self._current is not None:
+            return self._current
+        return await self._wait_for_snapshot()
+
+    async def refresh(self) -> Snapshot:
+        # Le leader n'a rien à relire : le fichier partagé est sa propre publication
+        if self.is_leader:
+            return await self._store.refresh()
+
+        await self._poll()
+        if self.is_leader:
+            return await self._store.refresh()
+        if self._current is not None:
+            return self._current
+        return await self._wait_for_snapshot()
+
+    def is_ready(self) -> bool:
+        if self.is_leader:
+            return self._store.is_ready()
+        return self._current is not None
+
+    def expires_in(self) -> Optional[float]:
+        if self.is_leader:
+            return self._store.expires_in()
+        if self._current is None:
+            return None
+        return self._current.fetched_at + self._ttl_seconds - time.time()
+
+    def current(self) -> Optional[Snapshot]:
+        if self.is_leader:
+            return self._store.current()
+        return self._current
+
+    def close(self) -> None:
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    async def _wait_for_snapshot(self) -> Snapshot:
+        # Aucun snapshot publié pour l'instant : on attend le leader (dans la limite du timeout upstream)
+        deadline = time.monotonic() + self._wait_seconds
+        while time.monotonic() < deadline:
+            await asyncio.sleep(_WAIT_STEP_SECONDS)
+            await self._poll()
+            if self.is_leader:
+                return await self._store.get_snapshot()
+            if self._current is not None:
+                return self._current
+        raise ValueError(_NOT_AVAILABLE)
+
+    async def _poll(self) -> None:
+        # Une seule vérification à la fois (verrou + fichier), partagée par les requêtes concurrentes
+        await self._flights.do("poll", self._check)
+
+    async def _check(self) -> None:
+        # Recharge d'abord : un worker qui devient leader repart ainsi du dernier snapshot publié
+        self._checked_at = time.monotonic()
+        if self._lock_fd is not None:
+            return
+        await self._reload()
+        self._try_lead()
+
+    def _try_lead(self) -> bool:
+        fd = os.open(self._lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+
+        self._lock_fd = fd
+        logger.info("Worker %d is now the snapshot leader", os.getpid())
+
+        # Reprise : on sert le dernier snapshot publié en attendant le prochain refresh
+        if self._current is not None:
+            self._store.seed(self._current)
+            self._publisher.mark_written(self._current.version)
+            self._current = None
+        self._store.add_listener(self._publisher.schedule)
+        return True
+
+    async def _reload(self) -> None:
+        try:
+            stat = os.stat(self._path)
+        except FileNotFoundError:
+            return
+
+        file_id = (stat.st_ino, stat.st_mtime_ns)
+        if file_id == self._file_id:
+            return
+
+        try:
+            snapshot = await asyncio.to_thread(read_snapshot, self._path)
+        except (OSError, ValueError):
+            logger.warning("Could not load shared snapshot %s", self._path, exc_info=True)
+            return
+
+        # os.replace côté leader : un nouveau fichier est toujours une publication plus récente
+        self._file_id = file_id
+        self._current = snapshot
+
+
+SnapshotSource = Union[SnapshotStore, SharedSnapshotStore]
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+from array import array
+from typing import Dict, Iterable, List, Tuple
+
+from playerstats_proxy.services.derived_stats import AggMap, DerivedStats, MaxMap, RecordIndex
+from playerstats_proxy.services.stats_table import StatColumn, StatsTable, coerce_non_negative_int, get_stats_root
+
+
+class _ColumnAcc:
+    # Accumulateur d'une (section, stat_key) pendant la passe unique
+    __slots__ = ("column", "total", "max_value", "winners", "holders")
+
+    def __init__(self) -> None:
+        self.column = StatColumn()
+        self.total = 0
+        self.max_value = -1
+        self.winners = 0
+
+        # Lignes à égalité sur le max courant (seulement si max > 0)
+        self.holders: List[int] = []
+
+
+class SnapshotBuilder:
+    def __init__(self) -> None:
+        self._uuids: List[str] = []
+        self._names: List[str] = []
+        self._fingerprints = array("q")
+        self._sections: Dict[str, Dict[str, _ColumnAcc]] = {}
+        self._section_totals: Dict[str, StatColumn] = {}
+
+    def add_player(self, player: dict, fingerprint: int = 0) -> None:
+        # Une seule passe sur le JSON brut : colonnes, totaux, maxima, détenteurs et sommes par section
+        row = len(self._uuids)
+        self._uuids.append(str(player.get("uuid") or ""))
+        self._names.append(str(player.get("name") or ""))
+        self._fingerprints.append(fingerprint)
+
+        for section, section_map in get_stats_root(player).items():
+            if not isinstance(section_map, dict) or not section_map:
+                continue
+
+            section_str = str(section)
+            keys = self._sections.get(section_str)
+            if keys is None:
+                keys = self._sections[section_str] = {}
+
+            section_sum = 0
+            for stat_key, raw_value in section_map.items():
+                acc = keys.get(str(stat_key))
+                if acc is None:
+                    acc = keys[str(stat_key)] = _ColumnAcc()
+
+                value = coerce_non_negative_int(raw_value)
+                acc.column.rows.append(row)
+                acc.column.values.append(value)
+                acc.total += value
+                section_sum += value
+
+                if value > acc.max_value:
+                    acc.max_value = value
+                    acc.winners = 1
+                    acc.holders = [row] if value > 0 else []
+                elif value == acc.max_value:
+                    acc.winners += 1
+                    if value > 0:
+                        acc.holders.append(row)
+
+            section_column = self._section_totals.get(section_str)
+            if section_column is None:
+                section_column = self._section_totals[section_str] = StatColumn()
+            section_column.rows.append(row)
+            # Somme bornée comme chaque valeur (int64) : quelques valeurs énormes ne doivent pas faire échouer le refresh
+            section_column.values.append(coerce_non_negative_int(section_sum))
+
+    def build(self, version: int) -> Tuple[StatsTable, DerivedStats]:
+        sections: Dict[str, Dict[str, StatColumn]] = {}
+        aggregate: AggMap = {}
+        maxima: MaxMap = {}
+        records = RecordIndex()
+
+        for section, keys in self._sections.items():
+            sections[section] = {stat_key: acc.column for stat_key, acc in keys.items()}
+            # Totaux bornés comme les valeurs (int64) : JSON rapide, fichier de snapshot et SQLite les acceptent
+            aggregate[section] = {stat_key: coerce_non_negative_int(acc.total) for stat_key, acc in keys.items()}
+
+            for stat_key, acc in keys.items():
+                key = (section, stat_key)
+                maxima[key] = (acc.max_value, acc.winners)
+
+                if acc.max_value == 0:
+                    # Tout détenteur vaut 0 : inutile d'indexer chaque joueur, on vérifie à la demande
+                    records.zero_max_keys.append(key)
+                    continue
+                records.holders[key] = acc.holders
+                for row in acc.holders:
+                    records.by_row.setdefault(row, []).append(key)
+
+        for held in records.by_row.values():
+            held.sort(key=lambda k: (-maxima[k][0], k[0], k[1]))
+        records.zero_max_keys.sort()
+
+        derived = DerivedStats(
+            version=version,
+            aggregate=aggregate,
+            maxima=maxima,
+            records=records,
+            section_totals=self._section_totals,
+            section_sums={section: coerce_non_negative_int(sum(totals.values())) for section, totals in aggregate.items()},
+            catalogue={section: sorted(aggregate[section]) for section in sorted(aggregate)},
+        )
+        table = StatsTable(uuids=self._uuids, names=self._names, sections=sections, fingerprints=self._fingerprints)
+        return table, derived
+
+
+def build_snapshot_data(players: Iterable[dict], version: int) -> Tuple[StatsTable, DerivedStats]:
+    builder = SnapshotBuilder()
+    for player in players:
+        if isinstance(player, dict):
+            builder.add_player(player)
+    return builder.build(version)
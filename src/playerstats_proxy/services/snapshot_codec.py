@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+from typing import Dict, List, Tuple
+
+from playerstats_proxy.services.derived_stats import DerivedStats, RecordIndex
+from playerstats_proxy.services.snapshot_store import Snapshot
+from playerstats_proxy.services.stats_table import StatColumn, StatKey, StatsTable
+
+# Format : MAGIC | longueur de l'en-tête (u64) | en-tête JSON | padding | colonnes binaires (alignées sur 8)
+_MAGIC = b"PSPSNAP1"
+_PREFIX = struct.Struct("<8sQ")
+_ALIGN = 8
+
+_INVALID = "Snapshot file is invalid."
+
+
+def _padding(size: int) -> int:
+    return -size % _ALIGN
+
+
+def temp_path(path: str) -> str:
+    # Fichier temporaire de write_snapshot (même dossier : os.replace reste atomique)
+    return f"{path}.{os.getpid()}.tmp"
+
+
+def write_snapshot(path: str, snapshot: Snapshot) -> None:
+    # Écrit dans un fichier temporaire du même dossier puis remplace atomiquement : un lecteur voit soit
+    # l'ancien fichier complet, soit le nouveau
+    table, derived = snapshot.stats, snapshot.derived
+    chunks: List[memoryview] = []
+    offset = 0
+
+    def add(column: StatColumn) -> List[int]:
+        # values (int64) d'abord puis rows (uint32) : les deux restent alignés
+        nonlocal offset
+        values, rows = memoryview(column.values), memoryview(column.rows)
+        start = offset
+        chunks.extend((values, rows))
+        offset += values.nbytes + rows.nbytes
+        pad = _padding(offset)
+        if pad:
+            chunks.append(memoryview(bytes(pad)))
+            offset += pad
+        return [start, len(column)]
+
+    header = {
+        "version": snapshot.version,
+        "fetched_at": snapshot.fetched_at,
+        "uuids": table.uuids,
+        "names": table.names,
+        "sections": [
+            [section, [[stat_key, *add(column)] for stat_key, column in keys.items()]]
+            for section, keys in table.sections.items()
+        ],
+        "section_totals": [[section, *add(column)] for section, column in derived.section_totals.items()],
+        "aggregate": derived.aggregate,
+        "maxima": [[section, stat_key, max_value, winners] for (section, stat_key), (max_value, winners) in derived.maxima.items()],
+        "by_row": [[row, keys] for row, keys in derived.records.by_row.items()],
+        "zero_max_keys": derived.records.zero_max_keys,
+        "section_sums": derived.section_sums,
+        "catalogue": derived.catalogue,
+    }
+    # json de la stdlib (pas orjson) : entiers de taille quelconque, même décodeur qu'à la lecture
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+
+    tmp_path = temp_path(path)
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(_PREFIX.pack(_MAGIC, len(header_bytes)))
+            f.write(header_bytes)
+            f.write(bytes(_padding(_PREFIX.size + len(header_bytes))))
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def read_snapshot(path: str) -> Snapshot:
+    # Les colonnes restent dans le fichier mappé en lecture seule (partagé entre processus par le page cache) ;
+    # seuls l'en-tête (joueurs, agrégats, records) est décodé en objets Python
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    buf = memoryview(mapped)
+    try:
+        magic, header_len = _PREFIX.unpack_from(buf)
+        if magic != _MAGIC:
+            raise ValueError(_INVALID)
+        header_end = _PREFIX.size + header_len
+        header = json.loads(bytes(buf[_PREFIX.size : header_end]))
+    except (struct.error, json.JSONDecodeError, UnicodeDecodeError):
+        raise ValueError(_INVALID) from None
+    data = header_end + _padding(header_end)
+
+    def column(start: int, count: int) -> StatColumn:
+        values_at = data + start
+        rows_at = values_at + count * 8
+        out = StatColumn()
+        out.values = buf[values_at:rows_at].cast("q")
+        out.rows = buf[rows_at : rows_at + count * 4].cast("I")
+        return out
+
+    sections: Dict[str, Dict[str, StatColumn]] = {
+        section: {stat_key: column(start, count) for stat_key, start, count in keys}
+        for section, keys in header["sections"]
+    }
+    section_totals = {section: column(start, count) for section, start, count in header["section_totals"]}
+
+    by_row: Dict[int, List[StatKey]] = {row: [(s, k) for s, k in keys] for row, keys in header["by_row"]}
+    holders: Dict[StatKey, List[int]] = {}
+    for row in sorted(by_row):
+        for key in by_row[row]:
+            holders.setdefault(key, []).append(row)
+
+    maxima: Dict[StatKey, Tuple[int, int]] = {
+        (section, stat_key): (max_value, winners) for section, stat_key, max_value, winners in header["maxima"]
+    }
+
+    derived = DerivedStats(
+        version=header["version"],
+        aggregate=header["aggregate"],
+        maxima=maxima,
+        records=RecordIndex(
+            by_row=by_row,
+            zero_max_keys=[(s, k) for s, k in header["zero_max_keys"]],
+            holders=holders,
+        ),
+        section_totals=section_totals,
+        section_sums=header["section_sums"],
+        catalogue=header["catalogue"],
+    )
+
+    # Pas d'empreintes : le prochain refresh à partir de ce snapshot sera complet
+    table = StatsTable(uuids=header["uuids"], names=header["names"], sections=sections)
+    return Snapshot(stats=table, derived=derived, fetched_at=header["fetched_at"])
@@ -0,0 +1,380 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from playerstats_proxy.services.derived_stats import DerivedStats, MaxInfo, RecordIndex
+from playerstats_proxy.services.leaderboard import Change
+from playerstats_proxy.services.snapshot_builder import SnapshotBuilder
+from playerstats_proxy.services.stats_table import (
+    MAX_VALUE,
+    StatColumn,
+    StatKey,
+    StatsTable,
+    coerce_non_negative_int,
+    get_stats_root,
+)
+
+
+class _Rebuild(Exception):
+    # Delta non applicable (colonne vidée, etc.) : reconstruction complète
+    pass
+
+
+def _player_stats(player: dict) -> Dict[str, Dict[str, int]]:
+    # Mêmes règles que SnapshotBuilder.add_player : sections non vides uniquement, valeurs bornées
+    out: Dict[str, Dict[str, int]] = {}
+    for section, section_map in get_stats_root(player).items():
+        if not isinstance(section_map, dict) or not section_map:
+            continue
+        keys = out.setdefault(str(section), {})
+        for stat_key, raw_value in section_map.items():
+            keys[str(stat_key)] = coerce_non_negative_int(raw_value)
+    return out
+
+
+def _table_players(table: StatsTable, upto: int) -> List[dict]:
+    # Rejoue les lignes [0, upto) de la table sous forme de joueurs (seulement pour une reconstruction complète)
+    stats: List[Dict[str, Dict[str, int]]] = [{} for _ in range(upto)]
+    for (section, stat_key), column in table.columns():
+        end = bisect_left(column.rows, upto)
+        for row, value in zip(column.rows[:end], column.values[:end]):
+            stats[row].setdefault(section, {})[stat_key] = value
+    return [
+        {"uuid": table.uuids[row], "name": table.names[row], "stats": {"stats": stats[row]}}
+        for row in range(upto)
+    ]
+
+
+def _patched_column(column: Optional[StatColumn], changes: List[Change]) -> StatColumn:
+    # Copie de la colonne avec les changements appliqués (lignes toujours croissantes)
+    out = StatColumn()
+    if column is not None:
+        out.rows = column.rows[:]
+        out.values = column.values[:]
+
+    for row, old, new in changes:
+        i = bisect_left(out.rows, row)
+        if new is None:
+            del out.rows[i]
+            del out.values[i]
+        elif old is None:
+            out.rows.insert(i, row)
+            out.values.insert(i, new)
+        else:
+            out.values[i] = new
+
+    if not out:
+        raise _Rebuild()
+    return out
+
+
+def _patched_total(total: int, column: StatColumn, changes: List[Change]) -> int:
+    # Total borné comme la construction complète ; une fois saturé la vraie somme est perdue : on la recalcule
+    if total >= MAX_VALUE:
+        return coerce_non_negative_int(sum(column.values))
+    return coerce_non_negative_int(total + sum((new or 0) - (old or 0) for _, old, new in changes))
+
+
+def _scan_max(column: StatColumn) -> Tuple[MaxInfo, List[int]]:
+    # Recalcul du max sur la seule colonne concernée (en C : max/count/index sur l'array)
+    values = column.values
+    max_value = max(values)
+    holders: List[int] = []
+    if max_value > 0:
+        i = values.index(max_value)
+        while True:
+            holders.append(column.rows[i])
+            try:
+                i = values.index(max_value, i + 1)
+            except ValueError:
+                break
+    return (max_value, values.count(max_value)), holders
+
+
+def _patched_max(
+    info: MaxInfo,
+    holders: List[int],
+    column: StatColumn,
+    changes: List[Change],
+) -> Tuple[MaxInfo, List[int]]:
+    max_value, winners = info
+
+    # Un détenteur du max a baissé ou disparu : le nouveau max peut être n'importe où dans la colonne
+    if any(old == max_value and (new is None or new < max_value) for _, old, new in changes):
+        return _scan_max(column)
+
+    top = max((new for _, _, new in changes if new is not None), default=-1)
+    if top > max_value:
+        rows = [row for row, _, new in changes if new == top]
+        return (top, len(rows)), (rows if top > 0 else [])
+
+    gained = [row for row, old, new in changes if new == max_value and old != max_value]
+    if not gained:
+        return info, holders
+    return (max_value, winners + len(gained)), (sorted(holders + gained) if max_value > 0 else [])
+
+
+class DeltaBuilder:
+    # Refresh incrémental : chaque joueur reçu est comparé à la même ligne du snapshot précédent (empreinte du
+    # JSON brut) ; seuls les joueurs modifiés sont décodés en deltas, appliqués aux colonnes, totaux, maxima,
+    # records et classements déjà matérialisés. Même interface que SnapshotBuilder.
+    def __init__(self, table: StatsTable, derived: DerivedStats) -> None:
+        self._table = table
+        self._derived = derived
+
+        self._count = 0
+        self._changed: Dict[int, Tuple[int, dict]] = {}  # ligne -> (empreinte, joueur)
+        self._appended: List[Tuple[int, dict]] = []  # nouveaux joueurs, en fin de liste
+
+        # Ordre des joueurs changé (ou renommage) : on bascule sur une construction complète
+        self._fallback: Optional[SnapshotBuilder] = None
+
+    def add_player(self, player: dict, fingerprint: int = 0) -> None:
+        row = self._count
+        self._count += 1
+
+        if self._fallback is not None:
+            self._fallback.add_player(player, fingerprint)
+            return
+
+        table = self._table
+        if row >= table.player_count:
+            self._appended.append((fingerprint, player))
+            return
+
+        if table.fingerprints[row] == fingerprint:
+            return
+
+        uuid = str(player.get("uuid") or "")
+        name = str(player.get("name") or "")
+        if uuid != table.uuids[row] or name != table.names[row]:
+            self._fallback = self._replay(row)
+            self._fallback.add_player(player, fingerprint)
+            return
+
+        self._changed[row] = (fingerprint, player)
+
+    def build(self, version: int) -> Tuple[StatsTable, DerivedStats]:
+        builder = self._fallback
+        if builder is None:
+            old_count = self._table.player_count
+            if self._count >= old_count:
+                try:
+                    return self._apply(version)
+                except _Rebuild:
+                    pass
+
+            # Joueurs retirés, ou delta non applicable
+            builder = self._replay(min(self._count, old_count))
+            for fingerprint, player in self._appended:
+                builder.add_player(player, fingerprint)
+
+        return builder.build(version)
+
+    def _replay(self, upto: int) -> SnapshotBuilder:
+        # Construction complète des lignes [0, upto) : joueurs modifiés tels que reçus, les autres depuis la table
+        builder = SnapshotBuilder()
+        players = _table_players(self._table, upto)
+        fingerprints = self._table.fingerprints
+        for row in range(upto):
+            changed = self._changed.get(row)
+            if changed is not None:
+                builder.add_player(changed[1], changed[0])
+            else:
+                builder.add_player(players[row], fingerprints[row])
+        return builder
+
+    def _collect(self) -> Tuple[Dict[StatKey, List[Change]], Dict[str, List[Change]]]:
+        # Changements par colonne (section, stat_key) et par total de section, triés par ligne
+        table, derived = self._table, self._derived
+        col_changes: Dict[StatKey, List[Change]] = {}
+        sec_changes: Dict[str, List[Change]] = {}
+
+        rows = sorted(self._changed)
+        new_stats = {row: _player_stats(self._changed[row][1]) for row in rows}
+        first_new = table.player_count
+        for i, (_, player) in enumerate(self._appended):
+            rows.append(first_new + i)
+            new_stats[first_new + i] = _player_stats(player)
+
+        # Valeurs existantes des joueurs modifiés (les nouveaux joueurs n'en ont pas)
+        changed_rows = rows[: len(self._changed)]
+        for (section, stat_key), column in table.columns():
+            for row in changed_rows:
+                old = column.get(row)
+                if old is None:
+                    continue
+                new = new_stats[row].get(section, {}).get(stat_key)
+                if new != old:
+                    col_changes.setdefault((section, stat_key), []).append((row, old, new))
+
+        for row in rows:
+            for section, keys in new_stats[row].items():
+                column_map = table.sections.get(section) or {}
+                for stat_key, new in keys.items():
+                    column = column_map.get(stat_key)
+                    if column is None or column.get(row) is None:
+                        col_changes.setdefault((section, stat_key), []).append((row, None, new))
+
+        for row in rows:
+            old_sums: Dict[str, int] = {}
+            if row < first_new:
+                for section, column in derived.section_totals.items():
+                    value = column.get(row)
+                    if value is not None:
+                        old_sums[section] = value
+
+            new_sections = new_stats[row]
+            for section in old_sums.keys() | new_sections.keys():
+                old = old_sums.get(section)
+                new = coerce_non_negative_int(sum(new_sections[section].values())) if section in new_sections else None
+                if new != old:
+                    sec_changes.setdefault(section, []).append((row, old, new))
+
+        for changes in col_changes.values():
+            changes.sort(key=lambda change: change[0])
+        return col_changes, sec_changes
+
+    def _apply(self, version: int) -> Tuple[StatsTable, DerivedStats]:
+        table, derived = self._table, self._derived
+        col_changes, sec_changes = self._collect()
+
+        # Copie sur écriture : le snapshot précédent reste servi tel quel pendant le calcul
+        sections = dict(table.sections)
+        aggregate = dict(derived.aggregate)
+        maxima = dict(derived.maxima)
+        holders = dict(derived.records.holders)
+        section_totals = dict(derived.section_totals)
+        section_sums = dict(derived.section_sums)
+
+        copied_sections = set()
+        new_keys = False
+        moved: Dict[StatKey, Tuple[List[int], List[int]]] = {}  # stat -> (anciens, nouveaux détenteurs)
+
+        for key, changes in col_changes.items():
+            section, stat_key = key
+            old_column = table.column(section, stat_key)
+            column = _patched_column(old_column, changes)
+            new_keys = new_keys or old_column is None
+
+            if section not in copied_sections:
+                copied_sections.add(section)
+                sections[section] = dict(sections.get(section) or {})
+                aggregate[section] = dict(aggregate.get(section) or {})
+            sections[section][stat_key] = column
+            aggregate[section][stat_key] = _patched_total(aggregate[section].get(stat_key, 0), column, changes)
+
+            old_info = maxima.get(key, (-1, 0))
+            old_holders = holders.get(key, [])
+            info, key_holders = _patched_max(old_info, old_holders, column, changes)
+            maxima[key] = info
+            if key_holders:
+                holders[key] = key_holders
+            else:
+                holders.pop(key, None)
+            if info[0] != old_info[0] or key_holders != old_holders:
+                moved[key] = (old_holders, key_holders)
+
+        # Somme des agrégats bornés de la section, comme la construction complète
+        for section in copied_sections:
+            section_sums[section] = coerce_non_negative_int(sum(aggregate[section].values()))
+
+        for section, changes in sec_changes.items():
+            old_column = section_totals.get(section)
+            section_totals[section] = _patched_column(old_column, changes)
+
+        records = self._patched_records(maxima, holders, moved)
+        catalogue = derived.catalogue
+        if new_keys:
+            catalogue = {section: sorted(aggregate[section]) for section in sorted(aggregate)}
+
+        new_derived = DerivedStats(
+            version=version,
+            aggregate=aggregate,
+            maxima=maxima,
+            records=records,
+            section_totals=section_totals,
+            section_sums=section_sums,
+            catalogue=catalogue,
+        )
+        return self._patched_table(sections, new_derived, col_changes, sec_changes), new_derived
+
+    def _patched_records(
+        self,
+        maxima: Dict[StatKey, MaxInfo],
+        holders: Dict[StatKey, List[int]],
+        moved: Dict[StatKey, Tuple[List[int], List[int]]],
+    ) -> RecordIndex:
+        old = self._derived.records
+        if not moved:
+            return RecordIndex(by_row=old.by_row, zero_max_keys=old.zero_max_keys, holders=holders)
+
+        # Seules les lignes qui gagnent, perdent ou gardent un record dont le max a bougé sont retriées
+        by_row = dict(old.by_row)
+        touched: Dict[int, set] = {}
+        for key, (old_holders, new_holders) in moved.items():
+            for row in old_holders:
+                touched.setdefault(row, set())
+            for row in new_holders:
+                touched.setdefault(row, set()).add(key)
+
+        for row, gained in touched.items():
+            held = [key for key in by_row.get(row, ()) if key not in moved]
+            held.extend(gained)
+            if held:
+                held.sort(key=lambda k: (-maxima[k][0], k[0], k[1]))
+                by_row[row] = held
+            else:
+                by_row.pop(row, None)
+
+        zero_max_keys = old.zero_max_keys
+        zero_keys = set(zero_max_keys)
+        if any((maxima[key][0] == 0) != (key in zero_keys) for key in moved):
+            for key in moved:
+                if maxima[key][0] == 0:
+                    zero_keys.add(key)
+                else:
+                    zero_keys.discard(key)
+            zero_max_keys = sorted(zero_keys)
+        return RecordIndex(by_row=by_row, zero_max_keys=zero_max_keys, holders=holders)
+
+    def _patched_table(
+        self,
+        sections: Dict[str, Dict[str, StatColumn]],
+        derived: DerivedStats,
+        col_changes: Dict[StatKey, List[Change]],
+        sec_changes: Dict[str, List[Change]],
+    ) -> StatsTable:
+        old = self._table
+        uuids, names = old.uuids, old.names
+        fingerprints = old.fingerprints[:]
+        for row, (fingerprint, _) in self._changed.items():
+            fingerprints[row] = fingerprint
+        if self._appended:
+            uuids = uuids + [str(player.get("uuid") or "") for _, player in self._appended]
+            names = names + [str(player.get("name") or "") for _, player in self._appended]
+            fingerprints.extend(fingerprint for fingerprint, _ in self._appended)
+
+        table = StatsTable(uuids=uuids, names=names, sections=sections, fingerprints=fingerprints)
+
+        # Index et ordre par nom inchangés tant qu'aucun joueur n'a été ajouté
+        if not self._appended:
+            for attr in ("uuid_index", "name_order"):
+                if attr in old.__dict__:
+                    table.__dict__[attr] = old.__dict__[attr]
+
+        # Classements déjà matérialisés : recopiés, ou corrigés pour les seules lignes modifiées
+        for board_key, board in dict(old.leaderboards).items():
+            if board_key[0] == "stat":
+                _, section, stat_key = board_key
+                changes = col_changes.get((section, stat_key))
+                if changes is not None:
+                    board = board.patched(table, changes, derived.stat_total(section, stat_key))
+            else:
+                _, section = board_key
+                changes = sec_changes.get(section)
+                if changes is not None:
+                    board = board.patched(table, changes, derived.section_sums.get(section, 0))
+            table.leaderboards[board_key] = board
+        return table
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from typing import Optional, Set
+
+from playerstats_proxy.services.snapshot_codec import read_snapshot, temp_path, write_snapshot
+from playerstats_proxy.services.snapshot_store import Snapshot
+
+logger = logging.getLogger(__name__)
+
+
+def load_snapshot_file(path: str) -> Optional[Snapshot]:
+    # Snapshot écrit par un précédent processus (None si absent ou illisible : démarrage à froid)
+    try:
+        return read_snapshot(path)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError):
+        logger.warning("Could not load snapshot file %s, starting cold", path, exc_info=True)
+        return None
+
+
+class SnapshotFileWriter:
+    # Écrit chaque nouveau snapshot dans un fichier, en arrière-plan (thread) et dans l'ordre des versions
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._written_version = 0
+        self._lock = asyncio.Lock()
+        self._background: Set[asyncio.Task] = set()
+
+    def mark_written(self, version: int) -> None:
+        # Version déjà présente dans le fichier (inutile de la réécrire)
+        self._written_version = max(self._written_version, version)
+
+    def schedule(self, snapshot: Snapshot) -> None:
+        task = asyncio.ensure_future(self.write(snapshot))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def write(self, snapshot: Snapshot) -> None:
+        async with self._lock:
+            if snapshot.version <= self._written_version:
+                return
+            try:
+                await asyncio.to_thread(write_snapshot, self._path, snapshot)
+            except Exception:
+                # Tâche en arrière-plan : toute erreur est journalisée ici (sinon "Task exception was never
+                # retrieved"), le fichier précédent reste en place et le prochain snapshot réessaie
+                logger.exception("Could not write snapshot file %s", self._path)
+                self._remove_temp()
+                return
+            self._written_version = snapshot.version
+
+    def _remove_temp(self) -> None:
+        try:
+            os.unlink(temp_path(self._path))
+        except FileNotFoundError:
+            pass
+        except OSError:
+            logger.warning("Could not remove temporary snapshot file for %s", self._path, exc_info=True)
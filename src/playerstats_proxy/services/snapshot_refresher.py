@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+from typing import Optional
+
+import httpx
+
+from playerstats_proxy.services.circuit_breaker import CircuitOpenError
+from playerstats_proxy.services.shared_snapshot import SnapshotSource
+
+logger = logging.getLogger(__name__)
+
+# Évite de boucler en continu si le TTL est nul ou très court
+_MIN_INTERVAL_SECONDS = 1.0
+
+
+class SnapshotRefresher:
+    def __init__(self, store: SnapshotSource, refresh_ahead_seconds: int, retry_seconds: int) -> None:
+        self._store = store
+        self._refresh_ahead_seconds = max(0, int(refresh_ahead_seconds))
+        self._retry_seconds = max(_MIN_INTERVAL_SECONDS, float(retry_seconds))
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="snapshot-refresher")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            # Rafraîchit un peu avant l'expiration, pour qu'aucune requête ne paie le fetch upstream
+            expires_in = self._store.expires_in()
+            if expires_in is not None and expires_in > self._refresh_ahead_seconds:
+                await asyncio.sleep(expires_in - self._refresh_ahead_seconds)
+                continue
+
+            try:
+                await self._store.refresh()
+            except CircuitOpenError as e:
+                # Upstream coupé : on revient pile pour la requête test du circuit
+                delay = max(_MIN_INTERVAL_SECONDS, e.retry_after)
+                logger.warning("Snapshot refresh skipped, upstream circuit is open, retrying in %.0fs", delay)
+                await asyncio.sleep(delay)
+                continue
+            except (httpx.HTTPError, ValueError):
+                # On garde l'ancien snapshot (servi en stale) et on réessaie plus tard
+                logger.warning("Snapshot refresh failed, retrying in %.0fs", self._retry_seconds, exc_info=True)
+                await asyncio.sleep(self._retry_seconds)
+                continue
+
+            await asyncio.sleep(_MIN_INTERVAL_SECONDS)
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, List, Optional, Set, Union
+
+import httpx
+
+from playerstats_proxy.services.circuit_breaker import CircuitOpenError, is_upstream_failure
+from playerstats_proxy.services.derived_stats import DerivedStats
+from playerstats_proxy.services.playerstats_client import PlayerStatsClient
+from playerstats_proxy.services.snapshot_builder import SnapshotBuilder
+from playerstats_proxy.services.snapshot_delta import DeltaBuilder
+from playerstats_proxy.services.stats_table import StatsTable
+from playerstats_proxy.utils.metrics import REGISTRY
+from playerstats_proxy.utils.single_flight import SingleFlight
+from playerstats_proxy.utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+_FETCH_SECONDS = REGISTRY.histogram(
+    "psp_upstream_fetch_seconds",
+    "Time to stream and decode the full upstream players list (one snapshot fetch attempt).",
+)
+_BUILD_SECONDS = REGISTRY.histogram(
+    "psp_snapshot_build_seconds",
+    "Time to finalize a snapshot: columns, aggregate, maxima, records (full build or delta patch).",
+    ("mode",),
+)
+_REFRESHES = REGISTRY.counter(
+    "psp_snapshot_refreshes_total",
+    "Snapshot fetch attempts against the upstream, by outcome.",
+    ("result",),
+)
+
+
+@dataclass
+class Snapshot:
+    # Table colonnaire construite une seule fois par refresh (le JSON brut n'est pas conservé)
+    stats: StatsTable
+
+    # Agrégat, maxima, records, totaux de section et catalogue : même passe, même version
+    derived: DerivedStats
+    fetched_at: float
+
+    @property
+    def version(self) -> int:
+        return self.derived.version
+
+    @property
+    def updated_at(self) -> datetime:
+        # Date des données (et non de la requête) : un même snapshot donne toujours le même corps
+        return datetime.fromtimestamp(self.fetched_at, timezone.utc)
+
+    @property
+    def age_seconds(self) -> float:
+        return max(0.0, time.time() - self.fetched_at)
+
+
+class SnapshotStore:
+    def __init__(
+        self,
+        client: PlayerStatsClient,
+        ttl_seconds: int,
+        max_stale_seconds: int = 0,
+        delta_refresh: bool = True,
+        retries: int = 0,
+        retry_backoff_seconds: float = 0.5,
+    ) -> None:
+        self._client = client
+        self._max_stale_seconds = max(0, int(max_stale_seconds))
+        self._delta_refresh = delta_refresh
+
+        # Nouvelles tentatives du fetch (idempotent) sur erreur upstream transitoire, avec backoff + jitter
+        self._retries = max(0, int(retries))
+        self._retry_backoff_seconds = max(0.0, float(retry_backoff_seconds))
+        self.snapshot_cache: TTLCache[Snapshot] = TTLCache(ttl_seconds=ttl_seconds)
+
+        self._flights: SingleFlight = SingleFlight()
+        self._version = 0
+        self._background: Set[asyncio.Task] = set()
+
+        # Appelés à chaque nouveau snapshot (ex. publication vers les autres workers)
+        self._listeners: List[Callable[[Snapshot], None]] = []
+
+    async def get_snapshot(self) -> Snapshot:
+        # Snapshot frais depuis le cache
+        cached = self.snapshot_cache.get()
+        if cached is not None:
+            return cached
+
+        # Expiré mais encore dans la tolérance : on le sert et on rafraîchit en arrière-plan
+        stale = self.snapshot_cache.get_stale(self._max_stale_seconds)
+        if stale is not None:
+            self._schedule_refresh()
+            return stale
+
+        # Rien d'exploitable : un seul fetch upstream partagé par tous les appelants
+        try:
+            return await self.refresh()
+        except CircuitOpenError:
+            # Upstream coupé : le dernier snapshot connu, même trop vieux, plutôt qu'une erreur
+            last = self.snapshot_cache.peek()
+            if last is None:
+                raise
+            return last
+
+    async def refresh(self) -> Snapshot:
+        return await self._flights.do("players", self._fetch_snapshot)
+
+    def is_ready(self) -> bool:
+        # Un snapshot exploitable (frais ou encore dans la tolérance stale) est disponible
+        return self.snapshot_cache.get_stale(self._max_stale_seconds) is not None
+
+    def expires_in(self) -> Optional[float]:
+        return self.snapshot_cache.expires_in()
+
+    def current(self) -> Optional[Snapshot]:
+        # Dernier snapshot chargé, sans fetch (None si aucun)
+        return self.snapshot_cache.peek()
+
+    def add_listener(self, listener: Callable[[Snapshot], None]) -> None:
+        self._listeners.append(listener)
+
+    def seed(self, snapshot: Snapshot) -> None:
+        # Snapshot construit ailleurs (autre worker, disque) : servi selon son âge réel si le cache est vide,
+        # et les versions suivantes reprennent après la sienne
+        self._version = max(self._version, snapshot.version)
+        if self.snapshot_cache.peek() is None:
+            self.snapshot_cache.set(snapshot, stored_at=snapshot.fetched_at)
+
+    async def _fetch_snapshot(self) -> Snapshot:
+        attempt = 0
+        while True:
+            try:
+                snapshot = await self._fetch_once()
+                _REFRESHES.inc("ok")
+                return snapshot
+            except httpx.HTTPError as e:
+                _REFRESHES.inc("error")
+                # Circuit ouvert, erreur applicative... : inutile d'insister
+                if attempt >= self._retries or not is_upstream_failure(e):
+                    raise
+                # Backoff exponentiel, jitter complet : les workers ne retombent pas tous en même temps
+                delay = random.uniform(0, self._retry_backoff_seconds * 2**attempt)
+                attempt += 1
+                logger.info("Snapshot fetch failed (%s), retry %d/%d in %.2fs", type(e).__name__, attempt, self._retries, delay)
+                await asyncio.sleep(delay)
+
+    async def _fetch_once(self) -> Snapshot:
+        # Chaque joueur est projeté dans la table dès qu'il est décodé, puis oublié.
+        # S'il existe un snapshot précédent, seuls les joueurs dont le JSON a changé sont pris en compte.
+        builder: Union[SnapshotBuilder, DeltaBuilder] = SnapshotBuilder()
+        previous = self.snapshot_cache.peek()
+        if self._delta_refresh and previous is not None and previous.stats.fingerprints is not None:
+            builder = DeltaBuilder(previous.stats, previous.derived)
+        mode = "delta" if isinstance(builder, DeltaBuilder) else "full"
+
+        start = time.perf_counter()
+
+        async for batch in self._client.stream_players(fingerprints=True):
+            for fingerprint, player in batch:
+                if isinstance(player, dict):
+                    builder.add_player(player, fingerprint)
+            # Laisse la main aux requêtes en cours entre deux lots
+            await asyncio.sleep(0)
+        fetched_at = time.time()
+        _FETCH_SECONDS.observe(time.perf_counter() - start)
+
+        # Finalisation (maxima, records, catalogue, ou application des deltas) hors de la boucle asyncio
+        self._version += 1
+        start = time.perf_counter()
+        stats, derived = await asyncio.to_thread(builder.build, self._version)
+        _BUILD_SECONDS.observe(time.perf_counter() - start, mode)
+        snapshot = Snapshot(stats=stats, derived=derived, fetched_at=fetched_at)
+        self.snapshot_cache.set(snapshot)
+
+        for listener in self._listeners:
+            listener(snapshot)
+        return snapshot
+
+    def _schedule_refresh(self) -> None:
+        if self._flights.in_flight("players"):
+            return
+        task = asyncio.ensure_future(self._refresh_quietly())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _refresh_quietly(self) -> None:
+        try:
+            await self.refresh()
+        except CircuitOpenError:
+            logger.debug("Background refresh skipped, upstream circuit is open")
+        except (httpx.HTTPError, ValueError):
+            logger.warning("Background refresh failed, serving stale snapshot", exc_info=True)
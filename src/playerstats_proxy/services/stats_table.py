@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left
+from functools import cached_property
+from typing import Any, Dict, Hashable, Iterator, Optional, Tuple
+
+
+StatKey = Tuple[str, str]  # (section, stat_key)
+
+# Borne des valeurs stockées (array "q" = int64 signé)
+MAX_VALUE = 2**63 - 1
+
+
+def coerce_non_negative_int(value: object) -> int:
+    # Convertit en int >= 0, sinon 0
+    try:
+        v = int(value)  # type: ignore[arg-type]
+    except (TypeError, ValueError, OverflowError):
+        return 0
+    if v <= 0:
+        return 0
+    return v if v < MAX_VALUE else MAX_VALUE
+
+
+def get_stats_root(player: dict) -> dict:
+    # Accède au dict "stats" vanilla: player["stats"]["stats"]
+    stats_wrapper = player.get("stats") or {}
+    if not isinstance(stats_wrapper, dict):
+        return {}
+    stats_root = stats_wrapper.get("stats") or {}
+    return stats_root if isinstance(stats_root, dict) else {}
+
+
+class StatColumn:
+    # Colonne creuse : uniquement les joueurs qui possèdent la stat (lignes croissantes)
+    __slots__ = ("rows", "values")
+
+    def __init__(self) -> None:
+        self.rows = array("I")
+        self.values = array("q")
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def get(self, row: int) -> Optional[int]:
+        # Valeur du joueur (None si la stat est absente chez lui)
+        i = bisect_left(self.rows, row)
+        if i < len(self.rows) and self.rows[i] == row:
+            return self.values[i]
+        return None
+
+    def items(self) -> Iterator[Tuple[int, int]]:
+        return zip(self.rows, self.values)
+
+    def total(self) -> int:
+        return sum(self.values)
+
+
+class StatsTable:
+    def __init__(
+        self,
+        uuids: list[str],
+        names: list[str],
+        sections: Dict[str, Dict[str, StatColumn]],
+        fingerprints: Optional[array] = None,
+    ) -> None:
+        # Table joueurs (une ligne par joueur, dans l'ordre upstream)
+        self.uuids = uuids
+        self.names = names
+
+        # section -> stat_key -> colonne (ordre d'apparition conservé)
+        self.sections = sections
+
+        # Empreinte du JSON brut de chaque ligne (None si inconnue : pas de refresh incrémental possible)
+        self.fingerprints = fingerprints
+
+        # Classements matérialisés à la demande (voir services.leaderboard)
+        self.leaderboards: Dict[Hashable, Any] = {}
+
+    @property
+    def player_count(self) -> int:
+        return len(self.uuids)
+
+    def is_listed(self, row: int) -> bool:
+        # Les classements ignorent les joueurs sans uuid ou sans nom
+        return bool(self.uuids[row]) and bool(self.names[row])
+
+    def listed_rows(self) -> Iterator[int]:
+        return (row for row in range(len(self.uuids)) if self.uuids[row] and self.names[row])
+
+    @cached_property
+    def uuid_index(self) -> Dict[str, int]:
+        # uuid normalisé -> première ligne correspondante
+        index: Dict[str, int] = {}
+        for row, uuid in enumerate(self.uuids):
+            index.setdefault(uuid.strip().lower(), row)
+        return index
+
+    @cached_property
+    def name_order(self) -> array:
+        # Joueurs listés triés par nom (insensible à la casse), ordre upstream à égalité
+        rows = sorted(self.listed_rows(), key=lambda row: self.names[row].lower())
+        return array("I", rows)
+
+    @cached_property
+    def name_keys(self) -> list[str]:
+        # Noms en minuscules dans l'ordre de name_order : recherche par préfixe en bisect
+        return [self.names[row].lower() for row in self.name_order]
+
+    @cached_property
+    def name_blob(self) -> Tuple[str, array]:
+        # name_keys concaténés (séparateur NUL) + position de début de chacun : recherche de sous-chaîne
+        # avec str.find sur un seul bloc plutôt qu'un test par joueur
+        starts = array("q")
+        offset = 0
+        for key in self.name_keys:
+            starts.append(offset)
+            offset += len(key) + 1
+        return "\0".join(self.name_keys), starts
+
+    @cached_property
+    def uuid_order(self) -> array:
+        # Joueurs listés triés par uuid normalisé, ordre upstream à égalité
+        rows = sorted(self.listed_rows(), key=lambda row: self.uuids[row].strip().lower())
+        return array("I", rows)
+
+    @cached_property
+    def uuid_keys(self) -> list[str]:
+        return [self.uuids[row].strip().lower() for row in self.uuid_order]
+
+    def column(self, section: str, stat_key: str) -> Optional[StatColumn]:
+        return (self.sections.get(section) or {}).get(stat_key)
+
+    def columns(self) -> Iterator[Tuple[StatKey, StatColumn]]:
+        for section, keys in self.sections.items():
+            for stat_key, column in keys.items():
+                yield (section, stat_key), column
+
+    def find_row(self, player_uuid: str) -> Optional[int]:
+        # Recherche par UUID (case-insensitive par sécurité)
+        return self.uuid_index.get(player_uuid.strip().lower())
@@ -1,137 +1,139 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
+from datetime import datetime
+from typing import Optional
 
-from playerstats_proxy.models.schemas import TopEntry, TopResponse
-from playerstats_proxy.models.schemas import SectionTopEntry, SectionTopResponse
+from playerstats_proxy.services.derived_stats import DerivedStats
+from playerstats_proxy.services.leaderboard import PageKey, encode_cursor, section_leaderboard, stat_leaderboard
+from playerstats_proxy.services.stats_table import StatsTable
+from playerstats_proxy.utils.percent import compute_percent
 
 
-def _read_stat_value(player: dict, section: str, stat_key: str) -> int:
-    # Navigation robuste dans la structure du JSON upstream
-    stats_wrapper = player.get("stats") or {}
-    stats_root = stats_wrapper.get("stats") or {}
-    section_map = stats_root.get(section) or {}
-    value = section_map.get(stat_key, 0)
+def _next_cursor(table: StatsTable, page: list[tuple[int, int]], limit: int) -> Optional[str]:
+    # Page pleine : il peut rester des joueurs après le dernier renvoyé
+    if not page or len(page) < max(1, limit):
+        return None
+    row, value = page[-1]
+    return encode_cursor(table, row, value)
 
-    try:
-        value_int = int(value)
-    except (TypeError, ValueError):
-        value_int = 0
 
-    return max(0, value_int)
-
-
-def _compute_percent(value: int, total_value: int) -> float:
-    # Calcule un pourcentage sur le total (0 si total=0)
-    if total_value <= 0:
-        return 0.0
-    return round((value / total_value) * 100.0, 6)
-
-
-def build_top(
-    players: list[dict],
+def build_top_payload(
+    table: StatsTable,
     section: str,
     stat_key: str,
     limit: int,
     include_zeros: bool,
     total_value: int,
-) -> TopResponse:
-    entries: list[TopEntry] = []
-
-    for p in players:
-        name = str(p.get("name") or "")
-        uuid = str(p.get("uuid") or "")
-        if not name or not uuid:
-            continue
-
-        value = _read_stat_value(p, section, stat_key)
-        if value == 0 and not include_zeros:
-            continue
-
+    updated_at: datetime,
+    after: Optional[PageKey] = None,
+) -> dict:
+    # Classement pré-trié du snapshot : on ne construit que les `limit` entrées de la page (schéma TopResponse)
+    board = stat_leaderboard(table, section, stat_key)
+    page = board.page(table, after, limit, include_zeros)
+    entries: list[dict] = []
+
+    for row, value in page:
         entries.append(
-            TopEntry(
-                uuid=uuid,
-                name=name,
-                value=value,
-                section=section,
-                stat_key=stat_key,
-                total_value=total_value,
-                percent_of_total=_compute_percent(value, total_value),
-            )
+            {
+                "uuid": table.uuids[row],
+                "name": table.names[row],
+                "value": value,
+                "section": section,
+                "stat_key": stat_key,
+                "total_value": total_value,
+                "percent_of_total": compute_percent(value, total_value),
+            }
         )
 
-    # Tri décroissant sur la valeur, puis par nom pour stabiliser
-    entries.sort(key=lambda e: (-e.value, e.name.lower()))
-    limited = entries[: max(1, limit)]
-
-    return TopResponse(
-        section=section,
-        stat_key=stat_key,
-        limit=max(1, limit),
-        include_zeros=include_zeros,
-        updated_at=datetime.now(timezone.utc),
-        total_value=max(0, int(total_value)),
-        results=limited,
-    )
-
-def _sum_section_for_player(player: dict, section: str) -> int:
-    # Somme toutes les stats d'une section pour un joueur
-    stats_wrapper = player.get("stats") or {}
-    stats_root = stats_wrapper.get("stats") or {}
-    section_map = stats_root.get(section) or {}
-
-    if not isinstance(section_map, dict):
-        return 0
-
-    total = 0
-    for raw_value in section_map.values():
-        try:
-            v = int(raw_value)
-        except (TypeError, ValueError):
-            v = 0
-        if v > 0:
-            total += v
-    return total
-
-
-def build_section_top(
-    players: list[dict],
+    return {
+        "section": section,
+        "stat_key": stat_key,
+        "limit": max(1, limit),
+        "include_zeros": include_zeros,
+        "updated_at": updated_at,
+        "total_value": max(0, int(total_value)),
+        "results": entries,
+        "next_cursor": _next_cursor(table, page, limit),
+    }
+
+def build_section_top_payload(
+    table: StatsTable,
+    derived: DerivedStats,
     section: str,
     limit: int,
     include_zeros: bool,
     total_value: int,
-) -> SectionTopResponse:
-    entries: list[SectionTopEntry] = []
-
-    for p in players:
-        name = str(p.get("name") or "")
-        uuid = str(p.get("uuid") or "")
-        if not name or not uuid:
-            continue
-
-        value = _sum_section_for_player(p, section)
-        if value == 0 and not include_zeros:
-            continue
-
+    updated_at: datetime,
+    after: Optional[PageKey] = None,
+) -> dict:
+    # Totaux de section par joueur, classés et mis en cache pour le snapshot (schéma SectionTopResponse)
+    board = section_leaderboard(table, derived, section)
+    page = board.page(table, after, limit, include_zeros)
+    entries: list[dict] = []
+
+    for row, value in page:
         entries.append(
-            SectionTopEntry(
-                uuid=uuid,
-                name=name,
-                value=value,
-                section=section,
-                total_value=total_value,
-                percent_of_total=_compute_percent(value, total_value),
-            )
+            {
+                "uuid": table.uuids[row],
+                "name": table.names[row],
+                "value": value,
+                "section": section,
+                "total_value": total_value,
+                "percent_of_total": compute_percent(value, total_value),
+            }
         )
 
-    entries.sort(key=lambda e: (-e.value, e.name.lower()))
-    limited = entries[: max(1, limit)]
-
-    return SectionTopResponse(
-        section=section,
-        limit=max(1, limit),
-        include_zeros=include_zeros,
-        updated_at=datetime.now(timezone.utc),
-        total_value=max(0, int(total_value)),
-        results=limited,
-    )
\ No newline at end of file
+    return {
+        "section": section,
+        "limit": max(1, limit),
+        "include_zeros": include_zeros,
+        "updated_at": updated_at,
+        "total_value": max(0, int(total_value)),
+        "results": entries,
+        "next_cursor": _next_cursor(table, page, limit),
+    }
+
+
+def build_top_batch_payload(
+    table: StatsTable,
+    derived: DerivedStats,
+    queries: list[tuple[str, Optional[str], int, bool]],
+    updated_at: datetime,
+) -> dict:
+    # queries : (section, stat_key ou None pour le total de section, limit, include_zeros), déjà normalisées.
+    # Tout est calculé sur le même snapshot ; une requête répétée n'est construite qu'une fois (schéma TopBatchResponse)
+    built: dict[tuple[str, Optional[str], int, bool], dict] = {}
+    results: list[dict] = []
+
+    for query in queries:
+        payload = built.get(query)
+        if payload is None:
+            section, stat_key, limit, include_zeros = query
+            if stat_key is None:
+                payload = build_section_top_payload(
+                    table=table,
+                    derived=derived,
+                    section=section,
+                    limit=limit,
+                    include_zeros=include_zeros,
+                    total_value=max(0, int(derived.section_sums.get(section, 0))),
+                    updated_at=updated_at,
+                )
+            else:
+                payload = build_top_payload(
+                    table=table,
+                    section=section,
+                    stat_key=stat_key,
+                    limit=limit,
+                    include_zeros=include_zeros,
+                    total_value=max(0, derived.stat_total(section, stat_key)),
+                    updated_at=updated_at,
+                )
+            built[query] = payload
+        results.append(payload)
+
+    return {
+        "count": len(results),
+        "updated_at": updated_at,
+        "results": results,
+    }
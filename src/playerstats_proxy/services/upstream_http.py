@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import logging
+from typing import AsyncIterator, Optional
+
+import httpx
+
+from playerstats_proxy.services.circuit_breaker import UNAVAILABLE_STATUSES, CircuitBreaker, is_upstream_failure
+
+logger = logging.getLogger(__name__)
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    # Corps de réponse qui libère la place dans le sémaphore dès la fin du streaming (erreur comprise)
+    # ou à sa fermeture, une seule fois
+    def __init__(self, stream: httpx.AsyncByteStream, semaphore: asyncio.Semaphore) -> None:
+        self._stream = stream
+        self._semaphore: Optional[asyncio.Semaphore] = semaphore
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        try:
+            async for chunk in self._stream:
+                yield chunk
+        finally:
+            self._release()
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            self._release()
+
+    def _release(self) -> None:
+        if self._semaphore is not None:
+            self._semaphore.release()
+            self._semaphore = None
+
+
+class ConcurrencyLimitedTransport(httpx.AsyncBaseTransport):
+    # Plafonne le nombre de requêtes en cours vers l'upstream, de l'envoi jusqu'à la fermeture de la réponse.
+    # Au-delà, les requêtes attendent (au plus pool_timeout, puis httpx.PoolTimeout).
+    def __init__(self, transport: httpx.AsyncBaseTransport, semaphore: asyncio.Semaphore, pool_timeout: Optional[float]) -> None:
+        self._transport = transport
+        self._semaphore = semaphore
+        self._pool_timeout = pool_timeout
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self._pool_timeout)
+        except asyncio.TimeoutError:
+            raise httpx.PoolTimeout("Too many in-flight upstream requests", request=request) from None
+
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            self._semaphore.release()
+            raise
+
+        response.stream = _ReleasingStream(response.stream, self._semaphore)  # type: ignore[arg-type]
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class _MonitoredStream(httpx.AsyncByteStream):
+    # Corps de réponse dont les erreurs de lecture (timeout en plein streaming...) comptent comme des échecs
+    def __init__(self, stream: httpx.AsyncByteStream, breaker: CircuitBreaker) -> None:
+        self._stream = stream
+        self._breaker = breaker
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        try:
+            async for chunk in self._stream:
+                yield chunk
+        except Exception as e:
+            if is_upstream_failure(e):
+                self._breaker.record_failure()
+            raise
+
+    async def aclose(self) -> None:
+        await self._stream.aclose()
+
+
+class CircuitBreakerTransport(httpx.AsyncBaseTransport):
+    # Coupe court (CircuitOpenError) quand l'upstream enchaîne les échecs, au lieu d'attendre ses timeouts
+    def __init__(self, transport: httpx.AsyncBaseTransport, breaker: CircuitBreaker) -> None:
+        self._transport = transport
+        self._breaker = breaker
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self._breaker.check()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException as e:
+            if isinstance(e, Exception) and is_upstream_failure(e):
+                self._breaker.record_failure()
+            else:
+                self._breaker.release()
+            raise
+
+        if response.status_code in UNAVAILABLE_STATUSES:
+            self._breaker.record_failure()
+        else:
+            self._breaker.record_success()
+        response.stream = _MonitoredStream(response.stream, self._breaker)  # type: ignore[arg-type]
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+def create_upstream_client(
+    timeout: httpx.Timeout,
+    max_connections: int,
+    max_keepalive_connections: int,
+    keepalive_expiry_seconds: float,
+    http2: bool,
+    semaphore: Optional[asyncio.Semaphore],
+    breaker: Optional[CircuitBreaker] = None,
+) -> httpx.AsyncClient:
+    # Un client = un pool de connexions dédié (l'upstream étant un seul hôte, c'est aussi le plafond par hôte)
+    limits = httpx.Limits(
+        max_connections=max_connections or None,
+        max_keepalive_connections=max_keepalive_connections or None,
+        keepalive_expiry=keepalive_expiry_seconds,
+    )
+    if http2 and importlib.util.find_spec("h2") is None:
+        # HTTP/2 demandé sans le paquet h2 (extra "http2") : on reste en HTTP/1.1
+        logger.warning("HTTP/2 requested but the 'h2' package is not installed, using HTTP/1.1")
+        http2 = False
+    transport: httpx.AsyncBaseTransport = httpx.AsyncHTTPTransport(limits=limits, http2=http2)
+
+    if semaphore is not None:
+        transport = ConcurrencyLimitedTransport(transport, semaphore, pool_timeout=timeout.pool)
+    # Le circuit est vérifié avant la file d'attente : circuit ouvert = échec immédiat, sans attendre de place
+    if breaker is not None:
+        transport = CircuitBreakerTransport(transport, breaker)
+    return httpx.AsyncClient(timeout=timeout, transport=transport)
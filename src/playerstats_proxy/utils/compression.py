@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import gzip
+from typing import Dict, Optional, Sequence, Tuple
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dépendance optionnelle (extra "compression")
+    brotli = None  # type: ignore[assignment]
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - dépendance optionnelle (extra "compression")
+    zstandard = None  # type: ignore[assignment]
+
+
+# Compression faite une fois par version de snapshot (et non par requête) : on peut viser un bon ratio
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 6
+ZSTD_LEVEL = 10
+
+
+def _available_encodings() -> Tuple[str, ...]:
+    # Ordre de préférence du serveur, à poids égal côté client : meilleur ratio d'abord
+    encodings = []
+    if brotli is not None:
+        encodings.append("br")
+    if zstandard is not None:
+        encodings.append("zstd")
+    encodings.append("gzip")
+    return tuple(encodings)
+
+
+ENCODINGS = _available_encodings()
+
+
+def _accepted(accept_encoding: str) -> Dict[str, float]:
+    # "br;q=1.0, gzip;q=0.8, *;q=0" -> {"br": 1.0, "gzip": 0.8, "*": 0.0}
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        if name == "x-gzip":
+            name = "gzip"
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name] = q
+    return weights
+
+
+def negotiate(accept_encoding: Optional[str], encodings: Sequence[str] = ENCODINGS) -> Optional[str]:
+    # Encodage à utiliser pour ce client (None = corps non compressé)
+    if not accept_encoding:
+        return None
+    weights = _accepted(accept_encoding)
+    best, best_q = None, 0.0
+    for encoding in encodings:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        # mtime=0 : même corps, mêmes octets compressés (ETag stable entre workers et redémarrages)
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    if encoding == "br" and brotli is not None:
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "zstd" and zstandard is not None:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    raise ValueError(f"Unsupported content encoding: {encoding}")
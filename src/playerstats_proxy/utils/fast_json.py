@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime, timezone
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dépendance optionnelle (extra "fast")
+    orjson = None  # type: ignore[assignment]
+
+# Version minimale de l'extra "fast" (pyproject) : une version plus ancienne est ignorée (stdlib)
+_ORJSON_MIN_VERSION = (3, 9)
+
+
+def _orjson_version() -> tuple:
+    try:
+        return tuple(int(part) for part in orjson.__version__.split(".")[:2])
+    except (AttributeError, ValueError):
+        return (0,)
+
+
+if orjson is not None and _orjson_version() < _ORJSON_MIN_VERSION:
+    orjson = None  # type: ignore[assignment]
+
+
+def _default(value: Any) -> Any:
+    # Même rendu que Pydantic pour les datetimes UTC ("...Z")
+    if isinstance(value, datetime):
+        text = value.isoformat()
+        if value.utcoffset() == timezone.utc.utcoffset(None):
+            text = text[: -len("+00:00")] + "Z"
+        return text
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _stdlib_dumps(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+def dumps(value: Any) -> bytes:
+    # Sérialisation JSON compacte : orjson si installé, sinon json de la stdlib
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, option=orjson.OPT_UTC_Z)
+        except TypeError:
+            # orjson.JSONEncodeError (sous-classe de TypeError) : entier au-delà de 64 bits, etc.
+            # La stdlib sérialise les entiers de taille quelconque, comme Pydantic
+            pass
+    return _stdlib_dumps(value)
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import codecs
+import json
+import re
+
+
+_WS = re.compile(r"[ \t\n\r]*")
+_DELIMITERS = frozenset(" \t\n\r,:]}")
+
+_EXPECTED_OBJECT = "Upstream returned unexpected payload (expected object)."
+_EXPECTED_LIST = "Upstream returned unexpected payload (expected '{key}' list)."
+_INVALID_JSON = "Upstream returned invalid JSON payload."
+
+# États du parseur (niveau racine uniquement, le reste est décodé par le module json en C).
+# _NEXT_KEY / _NEXT_ITEM : après une virgule, une clé / un item est obligatoire (pas de virgule finale)
+_START, _KEY, _NEXT_KEY, _COLON, _VALUE, _AFTER_VALUE, _ITEM, _NEXT_ITEM, _AFTER_ITEM, _DONE = range(10)
+
+
+class JsonArrayStreamParser:
+    # Décode incrémentalement {"<key>": [item, item, ...], ...} : renvoie chaque item complet dès qu'il
+    # est reçu, sans jamais garder le corps entier ni l'arbre complet en mémoire.
+    def __init__(self, key: str, fingerprints: bool = False) -> None:
+        self._key = key
+
+        # Si demandé, chaque item est rendu avec une empreinte de son texte brut : (empreinte, item)
+        self._fingerprints = fingerprints
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+
+        self._buf = ""
+        self._pos = 0
+        self._state = _START
+        self._current_key: str | None = None
+        self._seen_key = False
+
+        # Taille de buffer à atteindre avant de retenter une valeur incomplète (évite un coût quadratique)
+        self._retry_at = 0
+
+    def feed(self, chunk: bytes) -> list:
+        # Le buffer est compacté : seul le reste non consommé est conservé
+        self._retry_at = max(0, self._retry_at - self._pos)
+        self._buf = self._buf[self._pos :] + self._decoder.decode(chunk)
+        self._pos = 0
+        return self._parse(eof=False)
+
+    def close(self) -> list:
+        self._buf = self._buf[self._pos :] + self._decoder.decode(b"", final=True)
+        self._pos = 0
+        self._retry_at = 0
+        items = self._parse(eof=True)
+
+        if self._state == _START:
+            raise ValueError(_EXPECTED_OBJECT)
+        if self._state != _DONE:
+            raise ValueError(_INVALID_JSON)
+        if not self._seen_key:
+            raise ValueError(_EXPECTED_LIST.format(key=self._key))
+        return items
+
+    def _skip_ws(self) -> bool:
+        # True s'il reste au moins un caractère significatif
+        self._pos = _WS.match(self._buf, self._pos).end()
+        return self._pos < len(self._buf)
+
+    def _decode_value(self, eof: bool) -> tuple[bool, object]:
+        # Décode une valeur complète à la position courante (False si il faut plus de données)
+        if not eof and len(self._buf) < self._retry_at:
+            return False, None
+
+        try:
+            value, end = self._json.raw_decode(self._buf, self._pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise ValueError(_INVALID_JSON) from None
+            # Probablement incomplète : on attend que le buffer ait doublé depuis le début de la valeur
+            self._retry_at = len(self._buf) + max(len(self._buf) - self._pos, 1)
+            return False, None
+
+        # Un nombre en fin de buffer peut être tronqué ("12" puis "34", "1." puis "5") : on n'accepte
+        # la valeur que si elle est suivie d'un séparateur
+        if not eof and (end >= len(self._buf) or self._buf[end] not in _DELIMITERS):
+            self._retry_at = len(self._buf) + 1
+            return False, None
+
+        self._retry_at = 0
+        self._pos = end
+        return True, value
+
+    def _parse(self, eof: bool) -> list:
+        items: list = []
+
+        while self._skip_ws():
+            ch = self._buf[self._pos]
+
+            if self._state == _START:
+                if ch != "{":
+                    raise ValueError(_EXPECTED_OBJECT)
+                self._pos += 1
+                self._state = _KEY
+
+            elif self._state in (_KEY, _NEXT_KEY):
+                if ch == "}" and self._state == _KEY:
+                    self._pos += 1
+                    self._state = _DONE
+                    continue
+                if ch != '"':
+                    raise ValueError(_INVALID_JSON)
+                ok, key = self._decode_value(eof)
+                if not ok:
+                    break
+                self._current_key = key  # type: ignore[assignment]
+                self._state = _COLON
+
+            elif self._state == _COLON:
+                if ch != ":":
+                    raise ValueError(_INVALID_JSON)
+                self._pos += 1
+                self._state = _VALUE
+
+            elif self._state == _VALUE:
+                if self._current_key == self._key:
+                    if ch != "[":
+                        raise ValueError(_EXPECTED_LIST.format(key=self._key))
+                    self._seen_key = True
+                    self._pos += 1
+                    self._state = _ITEM
+                    continue
+
+                # Autre clé racine : décodée puis ignorée
+                ok, _ = self._decode_value(eof)
+                if not ok:
+                    break
+                self._state = _AFTER_VALUE
+
+            elif self._state == _AFTER_VALUE:
+                self._pos += 1
+                if ch == ",":
+                    self._state = _NEXT_KEY
+                elif ch == "}":
+                    self._state = _DONE
+                else:
+                    raise ValueError(_INVALID_JSON)
+
+            elif self._state in (_ITEM, _NEXT_ITEM):
+                if ch == "]" and self._state == _ITEM:
+                    self._pos += 1
+                    self._state = _AFTER_VALUE
+                    continue
+                start = self._pos
+                ok, item = self._decode_value(eof)
+                if not ok:
+                    break
+                if self._fingerprints:
+                    # hash() du texte : propre au processus, sert seulement à comparer deux refreshs successifs
+                    items.append((hash(self._buf[start : self._pos]), item))
+                else:
+                    items.append(item)
+                self._state = _AFTER_ITEM
+
+            elif self._state == _AFTER_ITEM:
+                self._pos += 1
+                if ch == ",":
+                    self._state = _NEXT_ITEM
+                elif ch == "]":
+                    self._state = _AFTER_VALUE
+                else:
+                    raise ValueError(_INVALID_JSON)
+
+            else:
+                # Données après la fin de l'objet racine
+                raise ValueError(_INVALID_JSON)
+
+        return items
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Generic, Hashable, Optional, TypeVar
+
+
+V = TypeVar("V")
+
+
+@dataclass
+class _Entry(Generic[V]):
+    value: V
+    size: int
+    expires_at: Optional[float]
+
+
+class LRUCache(Generic[V]):
+    # Cache clé -> valeur, borné en nombre d'entrées et (optionnellement) en octets, avec TTL par entrée
+    def __init__(self, max_entries: int, max_bytes: int = 0) -> None:
+        self._max_entries = max(0, int(max_entries))
+        self._max_bytes = max(0, int(max_bytes))
+        self._items: "OrderedDict[Hashable, _Entry[V]]" = OrderedDict()
+        self._bytes = 0
+
+        # Compteurs exportés sur /metrics (misses inclut les entrées expirées)
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._bytes
+
+    def get(self, key: Hashable) -> Optional[V]:
+        # Renvoie la valeur et la marque comme récemment utilisée (None si absente ou expirée)
+        entry = self._items.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.expires_at is not None and time.time() >= entry.expires_at:
+            self._remove(key)
+            self.misses += 1
+            self.expirations += 1
+            return None
+        self.hits += 1
+        self._items.move_to_end(key)
+        return entry.value
+
+    def set(self, key: Hashable, value: V, size: int = 0, ttl_seconds: Optional[float] = None) -> None:
+        # Stocke la valeur, en évinçant les moins récemment utilisées au-delà de max_entries / max_bytes
+        if self._max_entries <= 0:
+            return
+        if self._max_bytes and size > self._max_bytes:
+            # Plus gros que tout le budget : on ne garde pas (et on n'évince pas tout le reste pour rien)
+            self._remove(key)
+            return
+
+        self._remove(key)
+        expires_at = time.time() + ttl_seconds if ttl_seconds is not None else None
+        self._items[key] = _Entry(value=value, size=size, expires_at=expires_at)
+        self._bytes += size
+
+        while len(self._items) > self._max_entries or (self._max_bytes and self._bytes > self._max_bytes):
+            _, evicted = self._items.popitem(last=False)
+            self._bytes -= evicted.size
+            self.evictions += 1
+
+    def pop(self, key: Hashable) -> None:
+        self._remove(key)
+
+    def clear(self) -> None:
+        self._items.clear()
+        self._bytes = 0
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._items.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import abc
+import math
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+# Registre minimal au format texte Prometheus (0.0.4) : compteurs, histogrammes et métriques calculées
+# à la lecture (gauges/compteurs lus sur l'état courant). Valeurs par processus (un registre par worker).
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = Tuple[str, ...]
+
+# Bornes par défaut (secondes) : du cache chaud (ms) au fetch complet de l'upstream
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Tailles de corps : de 1 Kio à 1 Gio, par puissances de 4
+SIZE_BUCKETS = tuple(float(1024 * 4**i) for i in range(11))
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric(abc.ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    @abc.abstractmethod
+    def samples(self) -> Iterable[str]:
+        # Lignes d'échantillons au format texte (sans HELP/TYPE)
+        ...
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class _HistogramChild:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self, buckets: int) -> None:
+        self.counts = [0] * buckets
+        self.total = 0.0
+        self.count = 0
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._buckets = tuple(sorted(buckets))
+        self._children: Dict[LabelValues, _HistogramChild] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        # Compte par bucket (non cumulé) : cumulé seulement à l'export
+        index = bisect_left(self._buckets, value)
+        with self._lock:
+            child = self._children.get(labels)
+            if child is None:
+                child = self._children[labels] = _HistogramChild(len(self._buckets) + 1)
+            child.counts[index] += 1
+            child.total += value
+            child.count += 1
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            children = sorted((labels, list(child.counts), child.total, child.count) for labels, child in self._children.items())
+        for labels, counts, total, count in children:
+            cumulative = 0
+            for bound, bucket_count in zip(self._buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = _labels(self.labelnames, labels, f'le="{_format_value(bound)}"')
+                yield f"{self.name}_bucket{le} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {_format_value(total)}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {count}"
+
+
+class CallbackMetric(_Metric):
+    # Valeurs lues à chaque export (état d'un cache, âge du snapshot...) : rien à maintenir sur le chemin chaud
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        kind: str,
+        callback: Callable[[], Iterable[Tuple[LabelValues, float]]],
+        labelnames: Sequence[str] = (),
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.kind = kind
+        self._callback = callback
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in self._callback():
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        # Un nom déjà enregistré est remplacé (ex. callbacks ré-enregistrés au redémarrage de l'app)
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(name, lambda: Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._get_or_create(name, lambda: Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> bytes:
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines: List[str] = []
+        for metric in metrics:
+            samples = list(metric.samples())
+            if samples:
+                lines.extend(metric.header())
+                lines.extend(samples)
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+    def _get_or_create(self, name: str, factory: Callable[[], _Metric]):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = factory()
+        return metric
+
+
+# Registre du processus, alimenté par les modules à l'import (comme les loggers)
+REGISTRY = Registry()
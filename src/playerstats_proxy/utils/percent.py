@@ -0,0 +1,8 @@
+from __future__ import annotations
+
+
+def compute_percent(value: int, total_value: int) -> float:
+    # Calcule un pourcentage sur le total (0 si total=0)
+    if total_value <= 0:
+        return 0.0
+    return round((value / total_value) * 100.0, 6)
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import cProfile
+import io
+import pstats
+from typing import Optional, Tuple
+
+try:
+    import pyinstrument
+except ImportError:  # pragma: no cover - dépendance optionnelle (extra "profiling")
+    pyinstrument = None  # type: ignore[assignment]
+
+
+# Profileur d'une requête : pyinstrument (échantillonnage, suit la tâche asyncio de la requête) si installé,
+# sinon cProfile (déterministe, plus lent, et voit tout ce qui tourne sur la boucle pendant la requête)
+BACKEND = "pyinstrument" if pyinstrument is not None else "cprofile"
+
+
+class RequestProfile:
+    def __init__(self, interval_seconds: float) -> None:
+        self._pyinstrument: Optional["pyinstrument.Profiler"] = None
+        self._cprofile: Optional[cProfile.Profile] = None
+        if pyinstrument is not None:
+            self._pyinstrument = pyinstrument.Profiler(interval=interval_seconds, async_mode="enabled")
+        else:
+            self._cprofile = cProfile.Profile()
+
+    def start(self) -> None:
+        if self._pyinstrument is not None:
+            self._pyinstrument.start()
+        else:
+            assert self._cprofile is not None
+            self._cprofile.enable()
+
+    def stop(self) -> None:
+        if self._pyinstrument is not None:
+            self._pyinstrument.stop()
+        else:
+            assert self._cprofile is not None
+            self._cprofile.disable()
+
+    @property
+    def extension(self) -> str:
+        # pyinstrument : page HTML autonome ; cProfile : fichier pstats (snakeviz, python -m pstats)
+        return "html" if self._pyinstrument is not None else "prof"
+
+    def render(self) -> Tuple[bytes, str]:
+        # (corps, media type) renvoyé au client à la place de la réponse profilée
+        if self._pyinstrument is not None:
+            return self._pyinstrument.output_html().encode("utf-8"), "text/html; charset=utf-8"
+
+        assert self._cprofile is not None
+        out = io.StringIO()
+        stats = pstats.Stats(self._cprofile, stream=out)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(60)
+        return out.getvalue().encode("utf-8"), "text/plain; charset=utf-8"
+
+    def save(self, path: str) -> None:
+        # path sans extension : l'extension dépend du backend
+        if self._pyinstrument is not None:
+            with open(f"{path}.{self.extension}", "w", encoding="utf-8") as f:
+                f.write(self._pyinstrument.output_html())
+        else:
+            assert self._cprofile is not None
+            self._cprofile.dump_stats(f"{path}.{self.extension}")
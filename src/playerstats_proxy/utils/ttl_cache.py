@@ -11,6 +11,7 @@ T = TypeVar("T")
 @dataclass
 class _CacheItem(Generic[T]):
     value: T
+    stored_at: float
     expires_at: float
 
 
@@ -19,20 +20,58 @@ class TTLCache(Generic[T]):
         self._ttl_seconds = max(0, int(ttl_seconds))
         self._item: Optional[_CacheItem[T]] = None
 
+        # Compteurs exportés sur /metrics (misses inclut les lectures d'une valeur expirée)
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.stale_hits = 0
+
     def get(self) -> Optional[T]:
         # Renvoie la valeur si encore valide
         if self._item is None:
+            self.misses += 1
             return None
         if time.time() >= self._item.expires_at:
-            self._item = None
+            self.misses += 1
+            self.expirations += 1
+            return None
+        self.hits += 1
+        return self._item.value
+
+    def get_stale(self, max_stale_seconds: float) -> Optional[T]:
+        # Renvoie la valeur même expirée, tant qu'elle n'a pas dépassé l'expiration + max_stale_seconds
+        if self._item is None:
+            return None
+        if time.time() >= self._item.expires_at + max(0.0, max_stale_seconds):
+            return None
+        self.stale_hits += 1
+        return self._item.value
+
+    def peek(self) -> Optional[T]:
+        # Dernière valeur stockée, quelle que soit son ancienneté
+        if self._item is None:
             return None
         return self._item.value
 
-    def set(self, value: T) -> None:
-        # Stocke la valeur avec expiration
+    def age_seconds(self) -> Optional[float]:
+        if self._item is None:
+            return None
+        return max(0.0, time.time() - self._item.stored_at)
+
+    def expires_in(self) -> Optional[float]:
+        # Secondes restantes avant expiration (négatif si déjà expiré)
+        if self._item is None:
+            return None
+        return self._item.expires_at - time.time()
+
+    def set(self, value: T, stored_at: Optional[float] = None) -> None:
+        # Stocke la valeur avec expiration (stored_at : date réelle de la donnée, si elle est plus ancienne)
+        if stored_at is None:
+            stored_at = time.time()
         self._item = _CacheItem(
             value=value,
-            expires_at=time.time() + self._ttl_seconds,
+            stored_at=stored_at,
+            expires_at=stored_at + self._ttl_seconds,
         )
 
     def clear(self) -> None:
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import asyncio
+import types
+
+import httpx
+import pytest
+
+from playerstats_proxy.services import circuit_breaker
+from playerstats_proxy.services.circuit_breaker import CircuitBreaker, CircuitOpenError, is_upstream_failure
+from playerstats_proxy.services.upstream_http import CircuitBreakerTransport
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> _Clock:
+    clock = _Clock()
+    monkeypatch.setattr(circuit_breaker, "time", types.SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+def _fail(breaker: CircuitBreaker, times: int) -> None:
+    for _ in range(times):
+        breaker.check()
+        breaker.record_failure()
+
+
+def test_opens_after_consecutive_failures(clock: _Clock) -> None:
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=10)
+    _fail(breaker, 2)
+    breaker.check()
+    breaker.record_success()  # un succès remet le compteur à zéro
+    _fail(breaker, 2)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    _fail(breaker, 1)
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError) as exc_info:
+        breaker.check()
+    assert exc_info.value.retry_after == pytest.approx(10)
+
+
+def test_half_open_allows_a_single_probe(clock: _Clock) -> None:
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=10)
+    _fail(breaker, 1)
+    clock.now += 4
+    assert breaker.retry_after() == pytest.approx(6)
+
+    clock.now += 6
+    breaker.check()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.check()
+    breaker.check()
+
+
+def test_failed_probe_reopens(clock: _Clock) -> None:
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=10)
+    _fail(breaker, 2)
+    clock.now += 10
+    breaker.check()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.retry_after() == pytest.approx(10)
+
+
+def test_released_probe_can_be_retried(clock: _Clock) -> None:
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=10)
+    _fail(breaker, 1)
+    clock.now += 10
+    breaker.check()
+    breaker.release()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.check()
+
+
+def test_zero_threshold_disables_the_circuit(clock: _Clock) -> None:
+    breaker = CircuitBreaker(failure_threshold=0, reset_seconds=10)
+    _fail(breaker, 100)
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.check()
+
+
+def test_upstream_failure_classification() -> None:
+    request = httpx.Request("GET", "http://upstream/moss/players")
+
+    def status_error(code: int) -> httpx.HTTPStatusError:
+        return httpx.HTTPStatusError("error", request=request, response=httpx.Response(code, request=request))
+
+    assert is_upstream_failure(httpx.ConnectError("refused"))
+    assert is_upstream_failure(httpx.ReadTimeout("slow"))
+    assert is_upstream_failure(status_error(503))
+    assert not is_upstream_failure(status_error(404))
+    assert not is_upstream_failure(httpx.PoolTimeout("queue full"))
+    assert not is_upstream_failure(CircuitOpenError(5))
+    assert not is_upstream_failure(ValueError("bad payload"))
+
+
+class _Upstream(httpx.AsyncBaseTransport):
+    def __init__(self) -> None:
+        self.statuses = []
+        self.calls = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        status = self.statuses.pop(0)
+        if status == "timeout":
+            raise httpx.ConnectTimeout("timeout", request=request)
+        return httpx.Response(status, stream=httpx.ByteStream(b"{}"))
+
+
+def test_transport_short_circuits_when_open(clock: _Clock) -> None:
+    upstream = _Upstream()
+    upstream.statuses = [503, "timeout", 200]
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=10)
+
+    async def scenario() -> None:
+        async with httpx.AsyncClient(transport=CircuitBreakerTransport(upstream, breaker)) as client:
+            assert (await client.get("http://upstream/a")).status_code == 503
+            with pytest.raises(httpx.ConnectTimeout):
+                await client.get("http://upstream/a")
+            assert breaker.state == CircuitBreaker.OPEN
+
+            # Circuit ouvert : échec immédiat, l'upstream n'est pas contacté
+            with pytest.raises(CircuitOpenError):
+                await client.get("http://upstream/a")
+            assert upstream.calls == 2
+
+            clock.now += 10
+            assert (await client.get("http://upstream/a")).status_code == 200
+            assert breaker.state == CircuitBreaker.CLOSED
+
+    asyncio.run(scenario())
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import importlib
+import sys
+from datetime import datetime, timezone
+
+import pytest
+
+from playerstats_proxy.api.responses import _serialize
+from playerstats_proxy.core.config import Settings
+from playerstats_proxy.models.schemas import AggregateStatsResponse
+from playerstats_proxy.services.aggregate_service import build_aggregate_payload
+from playerstats_proxy.utils import fast_json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dépendance optionnelle (extra "fast")
+    orjson = None  # type: ignore[assignment]
+
+UPDATED_AT = datetime(2026, 10, 17, 12, 0, 5, 250000, tzinfo=timezone.utc)
+
+
+def _payload(total: int) -> dict:
+    aggregate = {"minecraft:custom": {"play_time": total, "jump": 12}, "minecraft:mined": {"stone": 3}}
+    return build_aggregate_payload(aggregate, players_count=2, min_value=0, limit_per_section=0, updated_at=UPDATED_AT)
+
+
+def _serialize_both(payload: dict) -> tuple:
+    settings = dict(upstream_base_url="http://upstream")
+    fast = _serialize(AggregateStatsResponse, payload, Settings(**settings, fast_json_responses=True))
+    validated = _serialize(AggregateStatsResponse, payload, Settings(**settings, fast_json_responses=False))
+    return fast, validated
+
+
+@pytest.fixture(params=["stdlib", "orjson"])
+def encoder(request, monkeypatch):
+    # Les deux encodeurs du chemin rapide ; orjson forcé même si la version installée est sous le minimum
+    if request.param == "orjson":
+        if orjson is None:
+            pytest.skip("orjson not installed")
+        monkeypatch.setattr(fast_json, "orjson", orjson)
+    else:
+        monkeypatch.setattr(fast_json, "orjson", None)
+    return request.param
+
+
+@pytest.mark.parametrize("total", [5, 2**63 - 1, 2**64, 2**65 + 7], ids=["small", "int64", "uint64+1", "huge"])
+def test_fast_path_matches_pydantic(encoder: str, total: int) -> None:
+    fast, validated = _serialize_both(_payload(total))
+    assert fast == validated
+
+
+def test_dumps_falls_back_on_integer_overflow(encoder: str) -> None:
+    assert fast_json.dumps({"total": 2**70, "name": "é"}) == ('{"total":%d,"name":"é"}' % 2**70).encode("utf-8")
+
+
+def test_old_orjson_is_ignored(monkeypatch) -> None:
+    # orjson plus ancien que le minimum de l'extra "fast" : json de la stdlib
+    class _OldOrjson:
+        __version__ = "3.8.3"
+
+    monkeypatch.setitem(sys.modules, "orjson", _OldOrjson)
+    try:
+        importlib.reload(fast_json)
+        assert fast_json.orjson is None
+    finally:
+        monkeypatch.undo()
+        importlib.reload(fast_json)
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import sqlite3
+from typing import Dict, List, Tuple
+
+import pytest
+
+from playerstats_proxy.services.history_store import KIND_SECTION, KIND_STAT, HistoryStore
+from playerstats_proxy.services.snapshot_builder import build_snapshot_data
+from playerstats_proxy.services.snapshot_store import Snapshot
+
+T0 = 1_700_000_000.0
+HOUR = 3600.0
+MINED = "minecraft:mined"
+CUSTOM = "minecraft:custom"
+
+State = Dict[str, Dict[str, Dict[str, int]]]  # uuid -> section -> stat_key -> valeur
+
+
+def _snapshot(state: State, taken_at: float, version: int) -> Snapshot:
+    players = [{"uuid": uuid, "name": f"name-{uuid}", "stats": {"stats": sections}} for uuid, sections in state.items()]
+    table, derived = build_snapshot_data(players, version=version)
+    return Snapshot(stats=table, derived=derived, fetched_at=taken_at)
+
+
+def _value(state: State, uuid: str, kind: str, section: str, stat_key: str) -> int:
+    sections = state.get(uuid, {})
+    if kind == KIND_SECTION:
+        return sum(sections.get(section, {}).values())
+    return sections.get(section, {}).get(stat_key, 0)
+
+
+def _expected(base: State, end: State, kind: str, section: str, stat_key: str) -> List[Tuple[int, str]]:
+    deltas = [(_value(end, uuid, kind, section, stat_key) - _value(base, uuid, kind, section, stat_key), uuid) for uuid in end]
+    return sorted(entry for entry in deltas if entry[0] > 0)
+
+
+def _store(path: str, **overrides) -> HistoryStore:
+    settings = dict(interval_seconds=300, retention_seconds=0, downsample_after_seconds=0, downsample_interval_seconds=0)
+    settings.update(overrides)
+    store = HistoryStore(path, **settings)
+    store.open()
+    return store
+
+
+def _simulate(store: HistoryStore, steps: int, step_seconds: float, seed: int = 1) -> Dict[float, State]:
+    # Quelques joueurs progressent à chaque snapshot, un nouveau joueur arrive en cours de route
+    rnd = random.Random(seed)
+    state: State = {f"uuid-{i}": {MINED: {"stone": i}, CUSTOM: {"jump": 0}} for i in range(8)}
+    states: Dict[float, State] = {}
+    for step in range(steps):
+        for uuid in rnd.sample(sorted(state), 3):
+            section = rnd.choice([MINED, CUSTOM])
+            key = rnd.choice(["stone", "jump", "dirt"])
+            state[uuid].setdefault(section, {})[key] = state[uuid].get(section, {}).get(key, 0) + rnd.randint(1, 50)
+        if step == steps // 2:
+            state["uuid-new"] = {MINED: {"stone": 500}}
+        taken_at = T0 + step * step_seconds
+        states[taken_at] = {uuid: {s: dict(keys) for s, keys in sections.items()} for uuid, sections in state.items()}
+        store._record(_snapshot(state, taken_at, step + 1))
+    return states
+
+
+SERIES = [(KIND_STAT, MINED, "stone"), (KIND_STAT, CUSTOM, "jump"), (KIND_STAT, MINED, "dirt"), (KIND_SECTION, MINED, "")]
+
+
+def _check_windows(store: HistoryStore, states: Dict[float, State], windows: List[float]) -> None:
+    end = states[max(states)]
+
+    async def scenario() -> None:
+        for window in windows:
+            for series in SERIES:
+                since, until, entries = await store.window_top(series, window)
+                assert until == max(states)
+                assert sorted((delta, uuid) for delta, uuid, _ in entries) == _expected(states[since], end, *series)
+                assert [delta for delta, _, _ in entries] == sorted((delta for delta, _, _ in entries), reverse=True)
+
+    asyncio.run(scenario())
+
+
+def _kept(path: str) -> List[float]:
+    with sqlite3.connect(path) as db:
+        return [row[0] for row in db.execute("SELECT taken_at FROM snapshots ORDER BY id")]
+
+
+def test_windows_match_snapshot_differences(tmp_path) -> None:
+    path = str(tmp_path / "history.sqlite3")
+    store = _store(path)
+    states = _simulate(store, steps=40, step_seconds=300)
+    _check_windows(store, states, [300, 900, HOUR, 2 * HOUR, 30 * 24 * HOUR])
+
+    # Base = dernier snapshot au début de la fenêtre (compté depuis le dernier snapshot)
+    since, until, _ = asyncio.run(store.window_top(SERIES[0], HOUR))
+    assert until - since == HOUR
+    store.close()
+
+
+def test_only_changed_values_are_written(tmp_path) -> None:
+    path = str(tmp_path / "history.sqlite3")
+    store = _store(path)
+    state: State = {"uuid-0": {MINED: {"stone": 1}}, "uuid-1": {MINED: {"stone": 2}}}
+    store._record(_snapshot(state, T0, 1))
+    store._record(_snapshot(state, T0 + 300, 2))
+    state["uuid-1"][MINED]["stone"] = 3
+    store._record(_snapshot(state, T0 + 600, 3))
+    store.close()
+
+    with sqlite3.connect(path) as db:
+        # 2 joueurs x (stat + total de section) au premier snapshot, puis 2 valeurs changées
+        assert db.execute("SELECT COUNT(*) FROM stat_values").fetchone()[0] == 6
+
+
+def test_unknown_series_and_empty_history(tmp_path) -> None:
+    store = _store(str(tmp_path / "history.sqlite3"))
+    assert asyncio.run(store.window_top(SERIES[0], HOUR)) == (None, None, [])
+    _simulate(store, steps=3, step_seconds=300)
+    _, _, entries = asyncio.run(store.window_top((KIND_STAT, MINED, "missing"), HOUR))
+    assert entries == []
+    store.close()
+
+
+def test_downsampling_and_retention_keep_values_exact(tmp_path) -> None:
+    path = str(tmp_path / "history.sqlite3")
+    store = _store(path, retention_seconds=20 * HOUR, downsample_after_seconds=4 * HOUR, downsample_interval_seconds=HOUR)
+    states = _simulate(store, steps=30 * 6, step_seconds=600)  # 30 h, un snapshot toutes les 10 min
+    now = max(states)
+
+    kept = _kept(path)
+    assert len(kept) < len(states)
+    assert min(kept) >= now - 20 * HOUR - 600
+    recent = [taken_at for taken_at in states if taken_at >= now - 4 * HOUR]
+    assert set(recent) <= set(kept)
+    old = [taken_at for taken_at in kept if taken_at < now - 4 * HOUR - HOUR]
+    assert len({int(taken_at // HOUR) for taken_at in old}) == len(old)
+
+    # Valeur à chaque snapshot restant inchangée : fenêtres exactes quelle que soit la base retenue
+    _check_windows(store, states, [600, HOUR, 3 * HOUR, 5 * HOUR, 9 * HOUR, 16 * HOUR, 40 * HOUR])
+    store.close()
+
+
+def test_reopen_continues_from_stored_values(tmp_path) -> None:
+    path = str(tmp_path / "history.sqlite3")
+    store = _store(path)
+    states = _simulate(store, steps=10, step_seconds=300)
+    store.close()
+
+    reopened = _store(path)
+    last = dict(states[max(states)])
+    last["uuid-0"] = {MINED: {"stone": 10_000}, CUSTOM: {"jump": 0}}
+    taken_at = max(states) + 300
+    reopened._record(_snapshot(last, taken_at, 99))
+    states[taken_at] = last
+
+    _, _, entries = asyncio.run(reopened.window_top((KIND_STAT, MINED, "stone"), 300))
+    assert [(delta, uuid) for delta, uuid, _ in entries] == [(10_000 - states[taken_at - 300]["uuid-0"][MINED]["stone"], "uuid-0")]
+    reopened.close()
+
+
+def test_record_respects_interval(tmp_path) -> None:
+    path = str(tmp_path / "history.sqlite3")
+    store = _store(path, interval_seconds=600)
+    state: State = {"uuid-0": {MINED: {"stone": 1}}}
+
+    async def scenario() -> None:
+        for offset in (0, 300, 599, 600, 1500):
+            await store.record(_snapshot(state, T0 + offset, 1))
+
+    asyncio.run(scenario())
+    assert _kept(path) == [T0, T0 + 600, T0 + 1500]
+    store.close()
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import json
+from typing import List
+
+import pytest
+
+from playerstats_proxy.utils.json_stream import JsonArrayStreamParser
+
+PLAYERS = [
+    {"uuid": "uuid-0", "name": "Zoé", "stats": {"stats": {"minecraft:custom": {"minecraft:jump": 12345678901234}}}},
+    {"uuid": "uuid-1", "name": "Ål", "stats": {"stats": {}}},
+    {"uuid": "uuid-2", "name": "bob", "ratio": 1.5e-3, "tags": ["a", "]", "}"], "flag": True, "none": None},
+]
+BODY = json.dumps({"server": {"name": "moss", "players": [1, 2]}, "players": PLAYERS, "count": 3}, ensure_ascii=False).encode("utf-8")
+
+
+def _parse(body: bytes, size: int, key: str = "players") -> List[object]:
+    parser = JsonArrayStreamParser(key)
+    items: List[object] = []
+    for i in range(0, len(body), size):
+        items += parser.feed(body[i : i + size])
+    items += parser.close()
+    return items
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, len(BODY)])
+def test_any_chunk_size_gives_the_same_items(size: int) -> None:
+    # Découpe arbitraire : au milieu d'un nombre, d'une chaîne, d'un caractère UTF-8 multi-octets
+    assert _parse(BODY, size) == PLAYERS
+
+
+def test_every_split_position() -> None:
+    for split in range(1, len(BODY)):
+        parser = JsonArrayStreamParser("players")
+        items = parser.feed(BODY[:split]) + parser.feed(BODY[split:]) + parser.close()
+        assert items == PLAYERS, split
+
+
+def test_items_are_returned_as_soon_as_complete() -> None:
+    parser = JsonArrayStreamParser("players")
+    first = json.dumps(PLAYERS[0]).encode("utf-8")
+    assert parser.feed(b'{"players": [' + first) == []  # fin de l'item pas encore confirmée
+    assert parser.feed(b", ") == [PLAYERS[0]]
+
+
+def test_whitespace_and_empty_list() -> None:
+    assert _parse(b' \n{ "players" : [ ] }\r\n', 1) == []
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        b"[]",
+        b'"players"',
+        b"",
+        b'{"other": []}',
+        b'{"players": {"uuid": "x"}}',
+        b'{"players": [{"uuid": "x"}',
+        b'{"players": [{"uuid": "x"} {"uuid": "y"}]}',
+        b'{"players": [{"uuid": x}]}',
+        b'{"players": []} trailing',
+        b'{"players" []}',
+        b'{players: []}',
+        b'{"players": [1.]}',
+    ],
+)
+def test_malformed_payloads_are_rejected(body: bytes) -> None:
+    with pytest.raises(ValueError):
+        _parse(body, 3)
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        b'{"players": [{"uuid": "x"},]}',
+        b'{"players": [,]}',
+        b'{"players": [{"uuid": "x"},,{"uuid": "y"}]}',
+        b'{"players": [], }',
+        b'{"server": 1, "players": [{"uuid": "x"}] ,}',
+    ],
+)
+@pytest.mark.parametrize("size", [1, 4, 1000])
+def test_trailing_commas_are_rejected_like_json_loads(body: bytes, size: int) -> None:
+    with pytest.raises(ValueError):
+        json.loads(body)
+    with pytest.raises(ValueError):
+        _parse(body, size)
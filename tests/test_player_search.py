@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import random
+from datetime import datetime, timezone
+from typing import List, Optional
+
+import pytest
+
+from playerstats_proxy.services.player_search import (
+    build_player_search_payload,
+    decode_search_cursor,
+    encode_search_cursor,
+)
+from playerstats_proxy.services.snapshot_builder import build_snapshot_data
+from playerstats_proxy.services.stats_table import StatsTable
+
+UPDATED_AT = datetime(2026, 10, 17, tzinfo=timezone.utc)
+NAMES = ["Steve", "steve", "Stevie", "Alex", "alexis", "Émile", "bob", "Bobby", "xSteveX", "Al", "", "Zed"]
+
+
+def _table(count: int = 120, seed: int = 3) -> StatsTable:
+    rnd = random.Random(seed)
+    players = [
+        {"uuid": f"{rnd.choice('0a1bF')}{i:04x}-uuid" if i % 37 else "", "name": rnd.choice(NAMES) + rnd.choice(["", "", str(i % 7)])}
+        for i in range(count)
+    ]
+    table, _ = build_snapshot_data(players, version=1)
+    return table
+
+
+def _expected(table: StatsTable, query: str, substring: bool, uuid_prefix: str) -> List[str]:
+    # Oracle : filtre naïf sur les joueurs listés, même ordre de tri que les index
+    rows = [row for row in range(len(table.uuids)) if table.uuids[row] and table.names[row]]
+    if uuid_prefix:
+        rows = [row for row in rows if table.uuids[row].lower().startswith(uuid_prefix)]
+        rows.sort(key=lambda row: (table.uuids[row].lower(), row))
+    else:
+        rows.sort(key=lambda row: (table.names[row].lower(), row))
+    if query:
+        rows = [
+            row
+            for row in rows
+            if (query in table.names[row].lower() if substring else table.names[row].lower().startswith(query))
+        ]
+    return [table.uuids[row] for row in rows]
+
+
+def _search_all(table: StatsTable, query: str, substring: bool, uuid_prefix: str, limit: int) -> List[str]:
+    # Parcourt toutes les pages en suivant next_cursor
+    found: List[str] = []
+    cursor: Optional[str] = None
+    while True:
+        after = decode_search_cursor(table, cursor) if cursor else None
+        page = build_player_search_payload(table, query, substring, uuid_prefix, after, limit, UPDATED_AT)
+        assert page["count"] == len(page["players"]) <= limit
+        found += [player["uuid"] for player in page["players"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return found
+        assert page["count"] == limit
+
+
+@pytest.mark.parametrize(
+    "query, substring, uuid_prefix",
+    [
+        ("", False, ""),
+        ("st", False, ""),
+        ("steve", False, ""),
+        ("é", False, ""),
+        ("nobody", False, ""),
+        ("eve", True, ""),
+        ("b", True, ""),
+        ("", False, "a"),
+        ("", False, "f0"),
+        ("al", False, "0"),
+        ("e", True, "b"),
+    ],
+)
+@pytest.mark.parametrize("limit", [1, 3, 50, 500])
+def test_pages_match_naive_filter(query: str, substring: bool, uuid_prefix: str, limit: int) -> None:
+    table = _table()
+    assert _search_all(table, query, substring, uuid_prefix, limit) == _expected(table, query, substring, uuid_prefix)
+
+
+def test_no_cursor_when_page_is_exactly_full() -> None:
+    table = _table()
+    total = len(_expected(table, "st", False, ""))
+    page = build_player_search_payload(table, "st", False, "", None, total, UPDATED_AT)
+    assert page["count"] == total
+    assert page["next_cursor"] is None
+
+
+def test_cursor_survives_player_removal() -> None:
+    table = _table()
+    first = build_player_search_payload(table, "", False, "", None, 10, UPDATED_AT)
+    after = decode_search_cursor(table, first["next_cursor"])
+
+    # Dernier joueur de la page absent du snapshot suivant : la page suivante reprend au même endroit
+    key, _ = after
+    gone = decode_search_cursor(table, encode_search_cursor(key, "missing-uuid"))
+    second = build_player_search_payload(table, "", False, "", gone, 10, UPDATED_AT)
+    expected = _expected(table, "", False, "")
+    start = next(i for i, uuid in enumerate(expected) if table.names[table.find_row(uuid)].lower() == key)
+    assert [player["uuid"] for player in second["players"]] == expected[start : start + 10]
+
+
+@pytest.mark.parametrize("cursor", ["", "!!!", "bm90IGpzb24", "WzEsMl0"])
+def test_invalid_cursor(cursor: str) -> None:
+    with pytest.raises(ValueError):
+        decode_search_cursor(_table(), cursor)
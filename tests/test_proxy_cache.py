@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import asyncio
+import types
+from typing import List, Optional
+
+import httpx
+import pytest
+
+from playerstats_proxy.services.proxy_cache import CachedResponse, ProxyCache, parse_cache_rules
+from playerstats_proxy.services.reverse_proxy import ReverseProxy
+from playerstats_proxy.utils import lru_cache
+from playerstats_proxy.utils.lru_cache import LRUCache
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1_000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> _Clock:
+    clock = _Clock()
+    monkeypatch.setattr(lru_cache, "time", types.SimpleNamespace(time=clock.time))
+    return clock
+
+
+def _cache(rules: str = "/moss/player/*=30,/server/info", max_body_bytes: int = 1 << 20) -> ProxyCache:
+    return ProxyCache(parse_cache_rules(rules, 10.0), max_entries=10, max_bytes=1 << 20, max_body_bytes=max_body_bytes)
+
+
+# LRUCache
+
+
+def test_lru_evicts_least_recently_used() -> None:
+    cache: LRUCache[str] = LRUCache(max_entries=2)
+    cache.set("a", "A")
+    cache.set("b", "B")
+    assert cache.get("a") == "A"
+    cache.set("c", "C")
+    assert cache.get("b") is None
+    assert cache.get("a") == "A" and cache.get("c") == "C"
+
+
+def test_lru_byte_budget() -> None:
+    cache: LRUCache[str] = LRUCache(max_entries=10, max_bytes=100)
+    cache.set("a", "A", size=60)
+    cache.set("b", "B", size=30)
+    cache.set("c", "C", size=30)
+    assert cache.get("a") is None
+    assert cache.total_bytes == 60
+
+    # Plus gros que tout le budget : ni stocké, ni éviction des autres
+    cache.set("huge", "H", size=101)
+    assert cache.get("huge") is None
+    assert cache.get("b") == "B" and cache.get("c") == "C"
+
+    # Remplacement d'une clé : l'ancienne taille est rendue
+    cache.set("b", "B2", size=10)
+    assert cache.total_bytes == 40
+
+
+def test_lru_ttl_expiry(clock: _Clock) -> None:
+    cache: LRUCache[str] = LRUCache(max_entries=10)
+    cache.set("short", "S", ttl_seconds=5)
+    cache.set("forever", "F")
+    clock.now += 4.9
+    assert cache.get("short") == "S"
+    clock.now += 0.1
+    assert cache.get("short") is None
+    assert len(cache) == 1
+    assert cache.get("forever") == "F"
+
+
+# Règles et Cache-Control
+
+
+def test_parse_rules_and_first_match() -> None:
+    cache = _cache("/moss/player/*=30, /server/info ,/moss/*=5")
+    assert [(rule.pattern, rule.ttl_seconds) for rule in cache._rules] == [
+        ("/moss/player/*", 30.0),
+        ("/server/info", 10.0),
+        ("/moss/*", 5.0),
+    ]
+    assert cache.rule_ttl("/moss/player/abc") == 30.0
+    assert cache.rule_ttl("/moss/other") == 5.0
+    assert cache.rule_ttl("/server/info/x") is None
+    assert not _cache("").enabled
+
+
+@pytest.mark.parametrize(
+    "headers",
+    [{"authorization": "Bearer x"}, {"cookie": "a=b"}, {"cache-control": "no-cache"}, {"cache-control": "max-age=0, no-store"}],
+)
+def test_request_bypass(headers: dict) -> None:
+    assert _cache().bypass(headers)
+
+
+def test_request_without_bypass() -> None:
+    assert not _cache().bypass({"cache-control": "max-age=60", "accept": "application/json"})
+
+
+@pytest.mark.parametrize(
+    "status, headers, expected",
+    [
+        (200, {}, 30.0),
+        (200, {"cache-control": "max-age=12"}, 12.0),
+        (200, {"cache-control": "max-age=12, s-maxage=40"}, 40.0),
+        (200, {"cache-control": 'public, max-age="7"'}, 7.0),
+        (200, {"cache-control": "max-age=0"}, None),
+        (200, {"cache-control": "max-age=abc"}, 30.0),
+        (200, {"cache-control": "no-store"}, None),
+        (200, {"cache-control": "No-Cache"}, None),
+        (200, {"cache-control": "private, max-age=60"}, None),
+        (200, {"set-cookie": "a=b"}, None),
+        (200, {"vary": "Accept-Encoding"}, 30.0),
+        (200, {"vary": "Accept-Encoding, Cookie"}, None),
+        (404, {"cache-control": "max-age=60"}, None),
+    ],
+)
+def test_response_ttl(status: int, headers: dict, expected: Optional[float]) -> None:
+    assert _cache().response_ttl(status, headers, 30.0) == expected
+
+
+def test_key_varies_on_accept_encoding() -> None:
+    cache = _cache()
+    assert cache.key("/p", "a=1", {"accept-encoding": "gzip"}) != cache.key("/p", "a=1", {})
+    assert cache.key("/p", "a=1", {}) != cache.key("/p", "a=2", {})
+
+
+def test_store_respects_ttl(clock: _Clock) -> None:
+    cache = _cache()
+    key = cache.key("/server/info", "", {})
+    cache.store(key, CachedResponse(status_code=200, headers={}, body=b"{}"), ttl_seconds=10)
+    assert cache.get(key) is not None
+    clock.now += 10
+    assert cache.get(key) is None
+
+
+# Reverse proxy avec cache
+
+
+class _Upstream(httpx.AsyncBaseTransport):
+    def __init__(self, headers: dict, body: bytes = b'{"ok":true}') -> None:
+        self.headers = headers
+        self.body = body
+        self.calls: List[str] = []
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.calls.append(request.method)
+        return httpx.Response(200, headers=self.headers, stream=httpx.ByteStream(self.body))
+
+
+async def _read(response) -> bytes:
+    if hasattr(response, "body_iterator"):
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        if response.background is not None:
+            await response.background()
+        return body
+    return response.body
+
+
+def _requests(upstream: _Upstream, cache: ProxyCache, calls: list) -> list:
+    async def scenario() -> list:
+        out = []
+        async with httpx.AsyncClient(transport=upstream) as client:
+            proxy = ReverseProxy(http_client=client, base_url="http://upstream", cache=cache)
+            for method, path, headers in calls:
+                response = await proxy.forward(method, path, "", headers, b"")
+                out.append((response.headers.get("x-cache"), await _read(response)))
+        return out
+
+    return asyncio.run(scenario())
+
+
+def test_proxy_serves_hits_and_head_from_cache() -> None:
+    upstream = _Upstream({"content-type": "application/json", "cache-control": "max-age=60"})
+    results = _requests(
+        upstream,
+        _cache(),
+        [("GET", "/moss/player/a", {}), ("GET", "/moss/player/a", {}), ("HEAD", "/moss/player/a", {})],
+    )
+    assert [hit for hit, _ in results] == ["MISS", "HIT", "HIT"]
+    assert results[1][1] == b'{"ok":true}'
+    assert upstream.calls == ["GET"]
+
+
+def test_proxy_does_not_cache_uncacheable_paths_or_responses() -> None:
+    upstream = _Upstream({"cache-control": "no-store"})
+    results = _requests(upstream, _cache(), [("GET", "/moss/player/a", {})] * 2 + [("GET", "/other", {})] * 2)
+    assert [hit for hit, _ in results] == [None] * 4
+    assert upstream.calls == ["GET"] * 4
+
+
+def test_proxy_bypass_and_large_bodies_stream_through() -> None:
+    upstream = _Upstream({"cache-control": "max-age=60"}, body=b"x" * 100)
+    results = _requests(
+        upstream,
+        _cache(max_body_bytes=50),
+        [("GET", "/moss/player/a", {}), ("GET", "/moss/player/a", {"authorization": "t"})],
+    )
+    assert results == [(None, b"x" * 100), (None, b"x" * 100)]
+    assert upstream.calls == ["GET", "GET"]
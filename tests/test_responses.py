@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import pytest
+from starlette.requests import Request
+
+from playerstats_proxy.api.responses import snapshot_response
+from playerstats_proxy.core.config import Settings
+from playerstats_proxy.models.schemas import StatsSectionsResponse
+from playerstats_proxy.services.snapshot_builder import build_snapshot_data
+from playerstats_proxy.services.snapshot_store import Snapshot
+from playerstats_proxy.utils.lru_cache import LRUCache
+
+SETTINGS = Settings(upstream_base_url="http://upstream", response_compression=False)
+
+
+def _snapshot() -> Snapshot:
+    players = [{"uuid": "uuid-0", "name": "p0", "stats": {"stats": {"minecraft:custom": {"a": 1}}}}]
+    table, derived = build_snapshot_data(players, version=1)
+    return Snapshot(stats=table, derived=derived, fetched_at=1_700_000_000.0)
+
+
+def _respond(app: SimpleNamespace, snapshot: Snapshot, method: str, headers: dict):
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": "/moss/stats/sections",
+        "query_string": b"",
+        "headers": [(name.encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()],
+        "app": app,
+    }
+
+    def build() -> dict:
+        sections = sorted(snapshot.derived.catalogue)
+        return {"count": len(sections), "updated_at": snapshot.updated_at, "sections": sections}
+
+    return snapshot_response(Request(scope), ("sections",), StatsSectionsResponse, build, SETTINGS, snapshot)
+
+
+@pytest.fixture
+def app() -> SimpleNamespace:
+    return SimpleNamespace(state=SimpleNamespace(response_cache=LRUCache(max_entries=10)))
+
+
+@pytest.mark.parametrize("method", ["GET", "HEAD"])
+def test_matching_etag_gives_304(app: SimpleNamespace, method: str) -> None:
+    snapshot = _snapshot()
+    etag = _respond(app, snapshot, "GET", {}).headers["etag"]
+    response = _respond(app, snapshot, method, {"if-none-match": etag})
+    assert response.status_code == 304
+    assert response.body == b""
+
+
+def test_post_ignores_if_none_match(app: SimpleNamespace) -> None:
+    snapshot = _snapshot()
+    first = _respond(app, snapshot, "POST", {})
+    response = _respond(app, snapshot, "POST", {"if-none-match": first.headers["etag"]})
+    assert response.status_code == 200
+    assert response.body == first.body
+
+
+def test_stale_etag_gives_body(app: SimpleNamespace) -> None:
+    response = _respond(app, _snapshot(), "GET", {"if-none-match": '"stale"'})
+    assert response.status_code == 200
+    assert b"minecraft:custom" in response.body
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+from typing import List, Optional
+
+import httpx
+import pytest
+
+from playerstats_proxy.services.proxy_cache import ProxyCache, parse_cache_rules
+from playerstats_proxy.services.reverse_proxy import ReverseProxy
+
+BODY = b'{"uuid":"uuid-0","name":"p0"}'
+
+
+class _Upstream(httpx.AsyncBaseTransport):
+    # Upstream qui compresse dès que le client l'accepte (corps non lu d'avance, contrairement à MockTransport)
+    def __init__(self) -> None:
+        self.seen: List[Optional[str]] = []
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        accept = request.headers.get("accept-encoding")
+        self.seen.append(accept)
+        headers = {"content-type": "application/json", "cache-control": "max-age=60", "vary": "Accept-Encoding"}
+        if accept and "gzip" in accept:
+            headers["content-encoding"] = "gzip"
+            content = gzip.compress(BODY)
+        else:
+            content = BODY
+        return httpx.Response(200, headers=headers, stream=httpx.ByteStream(content))
+
+
+async def _forward(cache_rules: str, headers: dict) -> tuple:
+    upstream = _Upstream()
+    cache = ProxyCache(parse_cache_rules(cache_rules, 30.0), max_entries=10, max_bytes=1 << 20, max_body_bytes=1 << 20)
+    async with httpx.AsyncClient(transport=upstream) as client:
+        proxy = ReverseProxy(http_client=client, base_url="http://upstream", cache=cache)
+        response = await proxy.forward("GET", "/moss/player/uuid-0", "", headers, b"")
+        if hasattr(response, "body_iterator"):
+            body = b"".join([chunk async for chunk in response.body_iterator])
+            if response.background is not None:
+                await response.background()
+        else:
+            body = response.body
+    return response, body, upstream.seen
+
+
+@pytest.mark.parametrize("cache_rules", ["", "/moss/player/*"], ids=["stream", "cache-fill"])
+def test_client_without_accept_encoding_gets_identity(cache_rules: str) -> None:
+    response, body, seen = asyncio.run(_forward(cache_rules, {"accept": "application/json"}))
+    assert seen == ["identity"]
+    assert "content-encoding" not in response.headers
+    assert body == BODY
+
+
+@pytest.mark.parametrize("cache_rules", ["", "/moss/player/*"], ids=["stream", "cache-fill"])
+def test_client_accept_encoding_is_forwarded(cache_rules: str) -> None:
+    response, body, seen = asyncio.run(_forward(cache_rules, {"accept-encoding": "gzip"}))
+    assert seen == ["gzip"]
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(body) == BODY
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from playerstats_proxy.services import shared_snapshot
+from playerstats_proxy.services.shared_snapshot import SharedSnapshotStore
+
+pytestmark = pytest.mark.skipif(shared_snapshot.fcntl is None, reason="fcntl required")
+
+
+class FakeStore:
+    def __init__(self) -> None:
+        self.refreshes = 0
+
+    async def refresh(self) -> object:
+        self.refreshes += 1
+        return SimpleNamespace(version=self.refreshes)
+
+    def seed(self, snapshot: object) -> None:
+        pass
+
+    def add_listener(self, listener: object) -> None:
+        pass
+
+
+def _shared(directory: Path, store: FakeStore) -> SharedSnapshotStore:
+    return SharedSnapshotStore(store, str(directory), ttl_seconds=60, poll_seconds=0.0, wait_seconds=0.0)
+
+
+def test_leader_refresh_skips_shared_file(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    store = FakeStore()
+    shared = _shared(tmp_path, store)
+    reloads = []
+
+    async def reload() -> None:
+        reloads.append(True)
+
+    monkeypatch.setattr(shared, "_reload", reload)
+
+    async def scenario() -> None:
+        await shared.refresh()
+        assert shared.is_leader
+        assert len(reloads) == 1
+
+        await shared.refresh()
+        await shared.refresh()
+        await shared._poll()
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        shared.close()
+
+    # Seul le tout premier passage (avant d'obtenir le verrou) relit le fichier
+    assert reloads == [True]
+    assert store.refreshes == 3
+
+
+def test_follower_keeps_reloading(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    leader = _shared(tmp_path, FakeStore())
+    follower = _shared(tmp_path, FakeStore())
+    reloads = []
+
+    async def reload() -> None:
+        reloads.append(True)
+        follower._current = SimpleNamespace(version=len(reloads))
+
+    monkeypatch.setattr(follower, "_reload", reload)
+
+    async def scenario() -> None:
+        await leader.refresh()
+        assert leader.is_leader
+        await follower.refresh()
+        await follower.refresh()
+        assert not follower.is_leader
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        leader.close()
+        follower.close()
+
+    assert len(reloads) == 2
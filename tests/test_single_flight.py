@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from playerstats_proxy.utils.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution() -> None:
+    calls = 0
+
+    async def fetch() -> str:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "players"
+
+    async def scenario() -> list:
+        flight: SingleFlight[str] = SingleFlight()
+        results = await asyncio.gather(*(flight.do("players", fetch) for _ in range(10)))
+        assert not flight.in_flight("players")
+        return results
+
+    assert asyncio.run(scenario()) == ["players"] * 10
+    assert calls == 1
+
+
+def test_different_keys_run_separately() -> None:
+    seen = []
+
+    async def scenario() -> None:
+        flight: SingleFlight[str] = SingleFlight()
+
+        async def compute(key: str) -> str:
+            seen.append(key)
+            await asyncio.sleep(0)
+            return key
+
+        assert await asyncio.gather(flight.do("a", lambda: compute("a")), flight.do("b", lambda: compute("b"))) == ["a", "b"]
+
+    asyncio.run(scenario())
+    assert sorted(seen) == ["a", "b"]
+
+
+def test_error_reaches_every_caller_and_is_not_cached() -> None:
+    calls = 0
+
+    async def failing() -> str:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    async def scenario() -> None:
+        flight: SingleFlight[str] = SingleFlight()
+        results = await asyncio.gather(*(flight.do("players", failing) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert calls == 1
+
+        # Appel suivant : nouvelle exécution (l'erreur n'est pas gardée)
+        with pytest.raises(RuntimeError):
+            await flight.do("players", failing)
+        assert calls == 2
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_caller_does_not_cancel_shared_work() -> None:
+    async def scenario() -> None:
+        flight: SingleFlight[str] = SingleFlight()
+        release = asyncio.Event()
+
+        async def slow() -> str:
+            await release.wait()
+            return "done"
+
+        first = asyncio.ensure_future(flight.do("key", slow))
+        second = asyncio.ensure_future(flight.do("key", slow))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await second == "done"
+        assert first.cancelled()
+
+    asyncio.run(scenario())
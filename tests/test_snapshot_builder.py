@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from playerstats_proxy.services.snapshot_builder import build_snapshot_data
+from playerstats_proxy.services.stats_table import MAX_VALUE
+
+
+def _players(values: dict, count: int = 4) -> list:
+    return [{"uuid": f"uuid-{i}", "name": f"p{i}", "stats": {"stats": {"minecraft:custom": dict(values)}}} for i in range(count)]
+
+
+def test_derived_values_in_one_pass() -> None:
+    players = _players({"a": 3, "b": 0}, count=2) + [
+        {"uuid": "uuid-x", "name": "x", "stats": {"stats": {"minecraft:custom": {"a": 5, "b": "bad"}, "minecraft:mined": {}}}}
+    ]
+    table, derived = build_snapshot_data(players, version=3)
+    assert derived.version == 3
+    assert derived.aggregate == {"minecraft:custom": {"a": 11, "b": 0}}
+    assert derived.section_sums == {"minecraft:custom": 11}
+    assert derived.maxima[("minecraft:custom", "a")] == (5, 1)
+    assert derived.maxima[("minecraft:custom", "b")] == (0, 3)
+    assert derived.records.by_row == {2: [("minecraft:custom", "a")]}
+    assert derived.records.zero_max_keys == [("minecraft:custom", "b")]
+    assert list(derived.section_totals["minecraft:custom"].values) == [3, 3, 5]
+    assert derived.catalogue == {"minecraft:custom": ["a", "b"]}
+    assert table.column("minecraft:mined", "a") is None
+
+
+def test_totals_are_clamped_to_int64() -> None:
+    # Valeurs déjà bornées une à une, mais leurs sommes dépasseraient 2**64
+    _, derived = build_snapshot_data(_players({"a": 2**70, "b": MAX_VALUE}), version=1)
+    assert derived.aggregate["minecraft:custom"] == {"a": MAX_VALUE, "b": MAX_VALUE}
+    assert derived.section_sums["minecraft:custom"] == MAX_VALUE
+    assert list(derived.section_totals["minecraft:custom"].values) == [MAX_VALUE] * 4
+    assert derived.maxima[("minecraft:custom", "a")] == (MAX_VALUE, 4)
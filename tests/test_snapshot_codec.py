@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from playerstats_proxy.services.snapshot_builder import build_snapshot_data
+from playerstats_proxy.services.snapshot_codec import read_snapshot, write_snapshot
+from playerstats_proxy.services.snapshot_store import Snapshot
+
+
+def _snapshot() -> Snapshot:
+    players = [
+        {"uuid": f"uuid-{i}", "name": f"p{i}", "stats": {"stats": {"minecraft:custom": {"a": i + 1, "b": 2}}}}
+        for i in range(3)
+    ]
+    table, derived = build_snapshot_data(players, version=7)
+    return Snapshot(stats=table, derived=derived, fetched_at=1_700_000_000.5)
+
+
+def test_round_trip(tmp_path) -> None:
+    snapshot = _snapshot()
+    path = str(tmp_path / "snap.bin")
+    write_snapshot(path, snapshot)
+
+    loaded = read_snapshot(path)
+    assert loaded.version == 7
+    assert loaded.fetched_at == snapshot.fetched_at
+    assert loaded.stats.uuids == snapshot.stats.uuids
+    assert loaded.derived.aggregate == snapshot.derived.aggregate
+    assert list(loaded.stats.column("minecraft:custom", "a").values) == [1, 2, 3]
+
+
+def test_header_totals_above_uint64(tmp_path) -> None:
+    # En-tête en json de la stdlib : des totaux au-delà de 64 bits ne font pas échouer l'écriture
+    snapshot = _snapshot()
+    snapshot.derived.aggregate["minecraft:custom"]["a"] = 2**65 + 3
+    snapshot.derived.section_sums["minecraft:custom"] = 2**66
+    path = str(tmp_path / "snap.bin")
+    write_snapshot(path, snapshot)
+
+    loaded = read_snapshot(path)
+    assert loaded.derived.aggregate["minecraft:custom"]["a"] == 2**65 + 3
+    assert loaded.derived.section_sums["minecraft:custom"] == 2**66
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import json
+import random
+from typing import List
+
+import pytest
+
+from playerstats_proxy.services.snapshot_builder import SnapshotBuilder
+from playerstats_proxy.services.snapshot_delta import DeltaBuilder
+from playerstats_proxy.services.stats_table import MAX_VALUE
+
+SECTIONS = ["minecraft:mined", "minecraft:custom"]
+
+# Valeurs proches de la borne int64 : les totaux dépassent 2**64 si rien ne les borne
+HUGE = [MAX_VALUE, MAX_VALUE - 1, 2**62, 2**63 + 5, 2**70]
+
+
+def _fingerprint(player: dict) -> int:
+    return hash(json.dumps(player, sort_keys=True))
+
+
+def _build(builder, players: List[dict], version: int):
+    for player in players:
+        builder.add_player(player, _fingerprint(player))
+    return builder.build(version)
+
+
+def _view(table, derived) -> dict:
+    return {
+        "columns": {key: (list(c.rows), list(c.values)) for key, c in table.columns()},
+        "section_totals": {s: (list(c.rows), list(c.values)) for s, c in derived.section_totals.items()},
+        "aggregate": derived.aggregate,
+        "section_sums": derived.section_sums,
+        "maxima": derived.maxima,
+        "catalogue": derived.catalogue,
+    }
+
+
+def _player(i: int, rnd: random.Random) -> dict:
+    stats = {
+        section: {f"k{j}": rnd.choice([0, 1, 7, rnd.randint(0, 50), *HUGE]) for j in range(rnd.randint(1, 4))}
+        for section in SECTIONS
+        if rnd.random() < 0.9
+    }
+    return {"uuid": f"uuid-{i}", "name": f"player{i}", "stats": {"stats": stats}}
+
+
+def _mutate(players: List[dict], rnd: random.Random) -> List[dict]:
+    players = json.loads(json.dumps(players))
+    for _ in range(rnd.randint(1, 5)):
+        stats = players[rnd.randrange(len(players))]["stats"]["stats"]
+        if not stats:
+            stats[SECTIONS[0]] = {"k0": 1}
+            continue
+        keys = stats[rnd.choice(list(stats))]
+        key = rnd.choice(list(keys))
+        keys[key] = rnd.choice([0, keys[key] + 3, max(0, keys[key] - 3), *HUGE])
+    if rnd.random() < 0.3:
+        players.append(_player(len(players), rnd))
+    return players
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_delta_matches_full_build_near_int64(seed: int) -> None:
+    rnd = random.Random(seed)
+    players = [_player(i, rnd) for i in range(rnd.randint(2, 12))]
+    previous = _build(SnapshotBuilder(), players, 1)
+
+    for version in range(2, 8):
+        players = _mutate(players, rnd)
+        patched = _build(DeltaBuilder(*previous), players, version)
+        assert _view(*patched) == _view(*_build(SnapshotBuilder(), players, version))
+        previous = patched
+
+
+def _custom_players(a: int, b: int) -> List[dict]:
+    return [{"uuid": f"uuid-{i}", "name": f"p{i}", "stats": {"stats": {"minecraft:custom": {"a": a, "b": b}}}} for i in range(4)]
+
+
+def test_saturated_totals_recover_exactly() -> None:
+    previous = _build(SnapshotBuilder(), _custom_players(2**70, MAX_VALUE), 1)
+    assert previous[1].section_sums["minecraft:custom"] == MAX_VALUE
+
+    # Retour sous la borne : le total exact est recalculé depuis la colonne
+    _, patched = _build(DeltaBuilder(*previous), _custom_players(1, 2), 2)
+    assert patched.aggregate["minecraft:custom"] == {"a": 4, "b": 8}
+    assert patched.section_sums["minecraft:custom"] == 12
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+
+from playerstats_proxy.services import snapshot_files
+from playerstats_proxy.services.snapshot_builder import build_snapshot_data
+from playerstats_proxy.services.snapshot_codec import temp_path
+from playerstats_proxy.services.snapshot_files import SnapshotFileWriter, load_snapshot_file
+from playerstats_proxy.services.snapshot_store import Snapshot
+
+
+def _snapshot(version: int) -> Snapshot:
+    players = [{"uuid": "uuid-0", "name": "p0", "stats": {"stats": {"minecraft:custom": {"a": version}}}}]
+    table, derived = build_snapshot_data(players, version=version)
+    return Snapshot(stats=table, derived=derived, fetched_at=1_700_000_000.0)
+
+
+def test_write_failure_is_logged_and_retried(tmp_path, monkeypatch, caplog) -> None:
+    path = str(tmp_path / "snap.bin")
+    real_write = snapshot_files.write_snapshot
+
+    def failing_write(target: str, snapshot: Snapshot) -> None:
+        # Échec qui n'est pas une OSError, après création du fichier temporaire
+        with open(temp_path(target), "wb") as f:
+            f.write(b"partial")
+        raise TypeError("Integer exceeds 64-bit range")
+
+    async def scenario() -> None:
+        writer = SnapshotFileWriter(path)
+        monkeypatch.setattr(snapshot_files, "write_snapshot", failing_write)
+        await writer.write(_snapshot(1))
+
+        assert not os.path.exists(path)
+        assert not os.path.exists(temp_path(path))
+
+        monkeypatch.setattr(snapshot_files, "write_snapshot", real_write)
+        await writer.write(_snapshot(2))
+
+    with caplog.at_level(logging.ERROR, logger=snapshot_files.__name__):
+        asyncio.run(scenario())
+
+    assert any("Could not write snapshot file" in record.message and record.exc_info for record in caplog.records)
+    loaded = load_snapshot_file(path)
+    assert loaded is not None and loaded.version == 2
+
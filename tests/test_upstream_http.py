@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import asyncio
+import types
+from typing import AsyncIterator
+
+import httpx
+import pytest
+
+from playerstats_proxy.services import circuit_breaker
+from playerstats_proxy.services.circuit_breaker import CircuitBreaker
+from playerstats_proxy.services.upstream_http import CircuitBreakerTransport, ConcurrencyLimitedTransport
+
+
+class _BrokenStream(httpx.AsyncByteStream):
+    # Corps coupé après le premier morceau (timeout en plein streaming)
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        yield b'{"players": ['
+        raise httpx.ReadTimeout("timeout")
+
+    async def aclose(self) -> None:
+        pass
+
+
+class _Upstream(httpx.AsyncBaseTransport):
+    def __init__(self, broken: bool) -> None:
+        self.broken = broken
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        stream = _BrokenStream() if self.broken else httpx.ByteStream(b"{}")
+        return httpx.Response(200, stream=stream)
+
+
+async def _read(response: httpx.Response) -> None:
+    # Lecture directe du corps, sans aclose() : seule la fin de l'itération doit libérer les places
+    async for _ in response.stream:
+        pass
+
+
+@pytest.mark.parametrize("broken", [False, True])
+def test_slot_released_when_body_is_consumed(broken: bool) -> None:
+    semaphore = asyncio.Semaphore(1)
+    transport = ConcurrencyLimitedTransport(_Upstream(broken), semaphore, pool_timeout=0.1)
+
+    async def scenario() -> None:
+        response = await transport.handle_async_request(httpx.Request("GET", "http://upstream/a"))
+        assert semaphore.locked()
+        if broken:
+            with pytest.raises(httpx.ReadTimeout):
+                await _read(response)
+        else:
+            await _read(response)
+        assert not semaphore.locked()
+
+        # Fermeture après coup : pas de double libération
+        await response.aclose()
+        await semaphore.acquire()
+        assert semaphore.locked()
+
+    asyncio.run(scenario())
+
+
+def test_broken_probe_body_does_not_block_the_circuit(monkeypatch: pytest.MonkeyPatch) -> None:
+    now = [100.0]
+    monkeypatch.setattr(circuit_breaker, "time", types.SimpleNamespace(monotonic=lambda: now[0]))
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=10)
+    breaker.record_failure()
+    now[0] += 10
+
+    upstream = _Upstream(broken=True)
+    transport = CircuitBreakerTransport(upstream, breaker)
+
+    async def scenario() -> None:
+        # Requête test dont le corps échoue : le circuit se rouvre au lieu de rester bloqué en half_open
+        response = await transport.handle_async_request(httpx.Request("GET", "http://upstream/a"))
+        with pytest.raises(httpx.ReadTimeout):
+            await _read(response)
+        assert breaker.state == CircuitBreaker.OPEN
+
+        now[0] += 10
+        upstream.broken = False
+        response = await transport.handle_async_request(httpx.Request("GET", "http://upstream/a"))
+        await _read(response)
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    asyncio.run(scenario())